@@ -0,0 +1,41 @@
+"""Add wallet balance ledger
+
+Revision ID: 3345cee15681
+Revises: 13f81af2fb81
+Create Date: 2026-10-18 09:12:41.203518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3345cee15681'
+down_revision: Union[str, None] = '13f81af2fb81'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('wallets', sa.Column('confirmed_balance_btc', sa.Numeric(precision=18, scale=8), nullable=False, server_default='0'))
+    op.add_column('wallets', sa.Column('pending_balance_btc', sa.Numeric(precision=18, scale=8), nullable=False, server_default='0'))
+
+    # Backfill running totals from existing transactions
+    op.execute("""
+        UPDATE wallets SET
+            confirmed_balance_btc = (
+                SELECT COALESCE(SUM(t.amount_btc), 0) FROM transactions t
+                WHERE t.wallet_id = wallets.id AND t.status = 'confirmed'
+            ),
+            pending_balance_btc = (
+                SELECT COALESCE(SUM(t.amount_btc), 0) FROM transactions t
+                WHERE t.wallet_id = wallets.id AND t.status != 'confirmed'
+            )
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('wallets', 'pending_balance_btc')
+    op.drop_column('wallets', 'confirmed_balance_btc')
@@ -0,0 +1,31 @@
+"""Add address index counters
+
+Revision ID: 5d2c8e71b4a9
+Revises: a0a74989be60
+Create Date: 2026-10-18 14:02:41.338120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2c8e71b4a9'
+down_revision: Union[str, None] = 'a0a74989be60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'address_index_counters',
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('next_index', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('address_index_counters')
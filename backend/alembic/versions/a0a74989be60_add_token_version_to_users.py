@@ -0,0 +1,26 @@
+"""Add token version to users
+
+Revision ID: a0a74989be60
+Revises: f960f998107f
+Create Date: 2026-10-18 13:26:07.914452
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a0a74989be60'
+down_revision: Union[str, None] = 'f960f998107f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,28 @@
+"""Add webhook event leases
+
+Revision ID: a4d7e2c91b38
+Revises: f2c6a8d41e97
+Create Date: 2026-10-18 19:04:37.215604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d7e2c91b38'
+down_revision: Union[str, None] = 'f2c6a8d41e97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('webhook_events', sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_webhook_events_address_id', 'webhook_events', ['address', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_webhook_events_address_id', table_name='webhook_events')
+    op.drop_column('webhook_events', 'claimed_at')
@@ -0,0 +1,50 @@
+"""Unique pending invoice per address
+
+Revision ID: b7e41f0c9d26
+Revises: 5d2c8e71b4a9
+Create Date: 2026-10-18 14:37:19.604882
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e41f0c9d26'
+down_revision: Union[str, None] = '5d2c8e71b4a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Invoices used to share the user's single address. Those still pending
+    # stay open (the webhook pays the oldest matching one first) and are
+    # left out of the uniqueness check; new invoices get their own address.
+    op.add_column(
+        'invoices',
+        sa.Column('shared_address', sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+    op.execute(
+        """
+        UPDATE invoices SET shared_address = true
+        WHERE status = 'pending'
+          AND EXISTS (
+              SELECT 1 FROM invoices AS other
+              WHERE other.btc_address = invoices.btc_address
+                AND other.status = 'pending'
+                AND other.id <> invoices.id
+          )
+        """
+    )
+    op.create_index(
+        'uq_invoices_pending_btc_address', 'invoices', ['btc_address'], unique=True,
+        postgresql_where=sa.text("status = 'pending' AND NOT shared_address"),
+        sqlite_where=sa.text("status = 'pending' AND NOT shared_address"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_invoices_pending_btc_address', table_name='invoices')
+    op.drop_column('invoices', 'shared_address')
@@ -0,0 +1,26 @@
+"""Add webhook event retry backoff
+
+Revision ID: b8f3c6d20a75
+Revises: a4d7e2c91b38
+Create Date: 2026-10-18 19:41:12.903518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8f3c6d20a75'
+down_revision: Union[str, None] = 'a4d7e2c91b38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('webhook_events', sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('webhook_events', 'next_attempt_at')
@@ -0,0 +1,26 @@
+"""Add webhook delivery created_at index
+
+Revision ID: c9e2f5a81d37
+Revises: b8f3c6d20a75
+Create Date: 2026-10-18 21:07:45.318260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e2f5a81d37'
+down_revision: Union[str, None] = 'b8f3c6d20a75'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_webhook_deliveries_created_at', 'webhook_deliveries', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_webhook_deliveries_created_at', table_name='webhook_deliveries')
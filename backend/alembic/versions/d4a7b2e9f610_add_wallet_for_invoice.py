@@ -0,0 +1,34 @@
+"""Add wallet for_invoice flag
+
+Revision ID: d4a7b2e9f610
+Revises: c9e2f5a81d37
+Create Date: 2026-10-18 22:41:06.527194
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a7b2e9f610'
+down_revision: Union[str, None] = 'c9e2f5a81d37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('wallets', sa.Column('for_invoice', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+    # Backfill: addresses allocated per invoice are the invoiced wallets other
+    # than the user's first one (which legacy invoices shared)
+    op.execute("""
+        UPDATE wallets SET for_invoice = true
+        WHERE EXISTS (SELECT 1 FROM invoices i WHERE i.wallet_id = wallets.id)
+          AND wallets.id <> (SELECT MIN(w.id) FROM wallets w WHERE w.user_id = wallets.user_id)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('wallets', 'for_invoice')
@@ -0,0 +1,32 @@
+"""Add webhook delivery idempotency keys
+
+Revision ID: d81f4b2a6c53
+Revises: c3a9d5e8f217
+Create Date: 2026-10-18 15:48:33.905172
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f4b2a6c53'
+down_revision: Union[str, None] = 'c3a9d5e8f217'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'webhook_deliveries',
+        sa.Column('tx_hash', sa.String(length=255), nullable=False),
+        sa.Column('confirmations', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('tx_hash', 'confirmations')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('webhook_deliveries')
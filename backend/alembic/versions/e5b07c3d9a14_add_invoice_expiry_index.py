@@ -0,0 +1,26 @@
+"""Add invoice expiry index
+
+Revision ID: e5b07c3d9a14
+Revises: d81f4b2a6c53
+Create Date: 2026-10-18 16:31:47.152036
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b07c3d9a14'
+down_revision: Union[str, None] = 'd81f4b2a6c53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_invoices_status_expires_at', 'invoices', ['status', 'expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_invoices_status_expires_at', table_name='invoices')
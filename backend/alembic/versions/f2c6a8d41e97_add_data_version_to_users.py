@@ -0,0 +1,26 @@
+"""Add data version to users
+
+Revision ID: f2c6a8d41e97
+Revises: e5b07c3d9a14
+Create Date: 2026-10-18 17:12:05.418390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6a8d41e97'
+down_revision: Union[str, None] = 'e5b07c3d9a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('data_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'data_version')
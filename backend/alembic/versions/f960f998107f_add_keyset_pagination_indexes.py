@@ -0,0 +1,28 @@
+"""Add keyset pagination indexes
+
+Revision ID: f960f998107f
+Revises: 3345cee15681
+Create Date: 2026-10-18 11:04:52.618309
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f960f998107f'
+down_revision: Union[str, None] = '3345cee15681'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_invoices_user_id_created_at_id', 'invoices', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_transactions_wallet_id_created_at_id', 'transactions', ['wallet_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_wallet_id_created_at_id', table_name='transactions')
+    op.drop_index('ix_invoices_user_id_created_at_id', table_name='invoices')
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, wallets, invoices, transactions, webhooks
+from app.api.v1.endpoints import auth, wallets, invoices, transactions, webhooks, events
 
 api_router = APIRouter()
 
@@ -9,3 +9,4 @@ api_router.include_router(invoices.router, prefix="/invoices", tags=["invoices"]
 api_router.include_router(transactions.router, prefix="/transactions", tags=["transactions"])
 api_router.include_router(webhooks.router, prefix="/webhooks", tags=["webhooks"])
 
+api_router.include_router(events.router, prefix="/events", tags=["events"])
@@ -0,0 +1,71 @@
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_db
+from app.core.metrics import metrics
+from app.api.v1.dependencies import Principal, get_current_principal
+from app.services.response_cache import response_cache
+from app.services.versioning import get_data_version
+
+# Conditional GET for per-user read endpoints.
+# The ETag is derived from the user's data version (see
+# app/services/versioning.py), which is read *before* the response data: a
+# write committing in between can only make the ETag older than the body,
+# which costs one extra 200 on the next poll but never hides a change.
+#
+# The same version keys the response cache: endpoints call
+# `cached_response` first and return `cache_response(...)` on a miss.
+
+not_modified = metrics.counter("conditional_get_not_modified_total", "Conditional GETs answered with 304")
+
+def make_etag(user_id: int, data_version: int) -> str:
+    """Weak ETag for a user's data version."""
+    return f'W/"{user_id}-{data_version}"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header matches `etag` (weak comparison)."""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+) -> None:
+    """
+    Route dependency: answer 304 when the client's ETag is current.
+
+    Runs before the endpoint, so a match skips the queries and response
+    models entirely. Otherwise the ETag is set on the response.
+    """
+    data_version = await get_data_version(db, current_user.id) or 0
+    etag = make_etag(current_user.id, data_version)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        not_modified.inc()
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    request.state.response_cache_key = response_cache.key(current_user.id, data_version, request)
+
+def _json_response(body: bytes, response: Response) -> Response:
+    return Response(content=body, media_type="application/json", headers=dict(response.headers))
+
+async def cached_response(request: Request, response: Response) -> Optional[Response]:
+    """The cached body for this request (with the conditional headers), or None."""
+    if not response_cache.enabled:
+        return None
+    body = await response_cache.get(request.state.response_cache_key)
+    return _json_response(body, response) if body is not None else None
+
+async def cache_response(request: Request, response: Response, model: BaseModel) -> Response:
+    """Serialize `model` the way FastAPI would, cache the body and return it."""
+    body = JSONResponse(content=model.model_dump(mode="json", by_alias=True)).body
+    if response_cache.enabled:
+        await response_cache.set(request.state.response_cache_key, body)
+    return _json_response(body, response)
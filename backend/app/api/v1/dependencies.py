@@ -1,40 +1,105 @@
-from fastapi import Depends, HTTPException, status
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_session_local, get_db
+from app.core.cache import LRUCache
+from app.core.config import settings
 from app.core.security import decode_access_token
 from app.db import models
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> models.User:
-    """Get current authenticated user from JWT token."""
+# user_id -> current token_version (None if the user no longer exists).
+# Tokens are revoked by bumping users.token_version; a process that has the
+# old version cached keeps accepting them for at most the TTL.
+token_versions = LRUCache(maxsize=10000, ttl=settings.TOKEN_VERSION_CACHE_TTL_SECONDS)
+_MISSING = object()
+
+# "typ" claim: every token is only accepted for its own purpose. Access
+# tokens predate the claim and carry none.
+ACCESS_TOKEN = "access"
+EVENTS_TICKET = "events"
+
+@dataclass(frozen=True)
+class Principal:
+    """Authenticated caller, built from signed JWT claims without loading the user row."""
+    id: int
+    email: Optional[str]
+    name: Optional[str]
+    token_version: int
+
+def _credentials_error(detail: str = "Could not validate credentials") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+async def get_token_version(db: AsyncSession, user_id: int) -> Optional[int]:
+    """Current token version of a user, served from the TTL cache when possible."""
+    version = token_versions.get(user_id, _MISSING)
+    if version is _MISSING:
+        version = await db.scalar(select(models.User.token_version).where(models.User.id == user_id))
+        token_versions.set(user_id, version)
+    return version
+
+async def _authenticate(token: str, db: AsyncSession, token_type: str) -> Principal:
     payload = decode_access_token(token)
-    if payload is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    user_id: int = payload.get("sub")
-    if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    return user
+    if payload is None or payload.get("typ", ACCESS_TOKEN) != token_type:
+        raise _credentials_error()
+
+    try:
+        user_id = int(payload.get("sub"))
+    except (TypeError, ValueError):
+        raise _credentials_error()
+
+    # Tokens issued before versioning carry no "ver" claim and count as version 0
+    token_version = payload.get("ver", 0)
+    current_version = await get_token_version(db, user_id)
+    if current_version is None:
+        raise _credentials_error("User not found")
+    if token_version != current_version:
+        raise _credentials_error("Token has been revoked")
+
+    return Principal(
+        id=user_id,
+        email=payload.get("email"),
+        name=payload.get("name"),
+        token_version=token_version,
+    )
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    """
+    Get the authenticated caller from the JWT claims.
+
+    Only the user's token version is checked against the database, and
+    that lookup is cached, so most requests do not touch the users table.
+    """
+    return await _authenticate(token, db, ACCESS_TOKEN)
+
+async def get_stream_principal(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    ticket: Optional[str] = Query(None, description="Stream ticket from POST /api/events/ticket, for EventSource"),
+) -> Principal:
+    """
+    Authenticate a long-lived streaming request.
 
+    Accepts an access token in the Authorization header or a stream ticket
+    in the `ticket` query parameter (EventSource cannot send headers; a
+    ticket in a logged URL is short-lived and only opens the stream). Uses
+    its own short session so no DB connection is held for the lifetime of
+    the stream.
+    """
+    if not token and not ticket:
+        raise _credentials_error("Not authenticated")
+    async with get_async_session_local()() as db:
+        if ticket:
+            return await _authenticate(ticket, db, EVENTS_TICKET)
+        return await _authenticate(token, db, ACCESS_TOKEN)
@@ -1,13 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
+import logging
 from app.db.database import get_db
 from app.db import models
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.security import password_hasher, PasswordHasherBusy, needs_rehash, create_access_token
 from app.core.config import settings
 from app.api.v1.schemas import UserRegister, UserLogin, Token, UserResponse
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def _hashing_unavailable() -> HTTPException:
+    """503 returned when the password hashing pool is saturated."""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please retry shortly",
+        headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)}
+    )
 
 @router.post(
     "/register", 
@@ -17,10 +28,11 @@ router = APIRouter()
     description="Create a new user account. Password must be at least 8 characters long.",
     responses={
         201: {"description": "User successfully registered"},
-        400: {"description": "Email already registered or validation error"}
+        400: {"description": "Email already registered or validation error"},
+        503: {"description": "Password hashing pool saturated, retry after the Retry-After delay"}
     }
 )
-async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
     """
     Register a new user.
     
@@ -32,7 +44,7 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
     """
     try:
         # Check if user already exists
-        existing_user = db.query(models.User).filter(models.User.email == user_data.email).first()
+        existing_user = await db.scalar(select(models.User).where(models.User.email == user_data.email))
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -57,19 +69,19 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         user = models.User(
             name=user_data.name.strip(),
             email=user_data.email.lower().strip(),
-            password_hash=get_password_hash(user_data.password)
+            password_hash=await password_hasher.hash(user_data.password)
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
         
         return user
     except HTTPException:
         raise
+    except PasswordHasherBusy:
+        raise _hashing_unavailable()
     except Exception as e:
-        print(f"Registration error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Registration error")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Registration failed: {str(e)}"
@@ -82,10 +94,11 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
     description="Authenticate user and receive JWT access token",
     responses={
         200: {"description": "Login successful, returns access token"},
-        401: {"description": "Invalid email or password"}
+        401: {"description": "Invalid email or password"},
+        503: {"description": "Password hashing pool saturated, retry after the Retry-After delay"}
     }
 )
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     """
     Login and get access token.
     
@@ -95,28 +108,16 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
     Returns JWT access token and user information.
     Use the token in Authorization header: `Bearer <access_token>`
     """
-    print(f"[LOGIN] Login attempt for: {credentials.email}")  # Debug log
     try:
         # Normalize email
         email = credentials.email.lower().strip()
-        print(f"[LOGIN] Normalized email: {email}")  # Debug log
         
         # Find user
-        print(f"[LOGIN] Querying database for user...")  # Debug log
         try:
-            # Test database connection first
-            from sqlalchemy import text
-            db.execute(text("SELECT 1"))
-            print(f"[LOGIN] Database connection OK")
-            
-            user = db.query(models.User).filter(models.User.email == email).first()
-            print(f"[LOGIN] User found: {user is not None}")  # Debug log
-            if user:
-                print(f"[LOGIN] User ID: {user.id}, Email: {user.email}, Name: {user.name}")
+            user = await db.scalar(select(models.User).where(models.User.email == email))
+            logger.debug("Login user lookup", extra={"user_found": user is not None, "user_id": user.id if user else None})
         except Exception as db_error:
-            print(f"[LOGIN] Database query error: {str(db_error)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Login database query error")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Database error: {str(db_error)}"
@@ -130,17 +131,30 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
             )
         
         # Verify password
-        if not verify_password(credentials.password, user.password_hash):
+        if not await password_hasher.verify(credentials.password, user.password_hash):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
+        # Transparently rehash when the configured work factor changed
+        if needs_rehash(user.password_hash):
+            try:
+                user.password_hash = await password_hasher.hash(credentials.password)
+                await db.commit()
+            except PasswordHasherBusy:
+                pass  # Keep the old hash, retry on a later login
+        
         # Create access token
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": str(user.id)},
+            data={
+                "sub": str(user.id),
+                "email": user.email,
+                "name": user.name,
+                "ver": user.token_version or 0,
+            },
             expires_delta=access_token_expires
         )
         
@@ -153,7 +167,7 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
             created_at=user.created_at
         )
         
-        print(f"[LOGIN] Login successful for user: {user.email}")  # Debug log
+        logger.info("Login successful", extra={"user_id": user.id})
         
         return {
             "access_token": access_token,
@@ -162,10 +176,10 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
         }
     except HTTPException:
         raise
+    except PasswordHasherBusy:
+        raise _hashing_unavailable()
     except Exception as e:
-        print(f"Login error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Login error")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Login failed: {str(e)}"
@@ -0,0 +1,88 @@
+import asyncio
+import json
+from datetime import timedelta
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from app.api.v1.dependencies import EVENTS_TICKET, Principal, get_current_principal, get_stream_principal
+from app.api.v1.schemas import EventTicket
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.services.events import event_broker
+
+router = APIRouter()
+
+@router.post(
+    "/ticket",
+    response_model=EventTicket,
+    summary="Get a stream ticket",
+    description="Short-lived credential for GET /api/events, or enabled=false if live events are unavailable",
+    responses={
+        200: {"description": "Ticket issued, or enabled=false"},
+        401: {"description": "Authentication required"}
+    }
+)
+async def create_event_ticket(current_user: Principal = Depends(get_current_principal)):
+    """
+    Issue a ticket for the event stream.
+    
+    Browsers pass it as `GET /api/events?ticket=...` (EventSource cannot send
+    an Authorization header). The ticket expires after EVENTS_TICKET_TTL_SECONDS
+    and is not accepted by any other endpoint. Clients get `enabled: false`
+    where streams are not supported (serverless deployments) and should poll.
+    
+    **Requires authentication.**
+    """
+    if not settings.EVENTS_ENABLED:
+        return EventTicket(enabled=False)
+    ticket = create_access_token(
+        data={"sub": str(current_user.id), "ver": current_user.token_version, "typ": EVENTS_TICKET},
+        expires_delta=timedelta(seconds=settings.EVENTS_TICKET_TTL_SECONDS),
+    )
+    return EventTicket(enabled=True, ticket=ticket, expires_in=settings.EVENTS_TICKET_TTL_SECONDS)
+
+@router.get(
+    "",
+    summary="Stream account events",
+    description="Server-sent events for invoice status changes and transaction confirmation updates",
+    responses={
+        200: {"description": "text/event-stream of `invoice` and `transaction` events"},
+        401: {"description": "Authentication required"},
+        503: {"description": "Live events are not available on this deployment"}
+    }
+)
+async def stream_events(current_user: Principal = Depends(get_stream_principal)):
+    """
+    Push invoice and transaction updates as they are committed, instead of polling.
+    
+    Events:
+    - **invoice**: `{"invoice_id", "status"}` (paid, expired)
+    - **transaction**: `{"tx_hash", "status", "confirmations", "invoice_id"}`
+    
+    A comment line is sent every EVENTS_HEARTBEAT_SECONDS to keep proxies from
+    closing idle streams. Browsers pass a ticket from `POST /api/events/ticket`
+    as `?ticket=`.
+    
+    **Requires authentication.**
+    """
+    if not settings.EVENTS_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Live events are not available, poll instead"
+        )
+    
+    async def stream():
+        async with event_broker.subscribe(current_user.id) as queue:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,15 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from decimal import Decimal
 from typing import Optional
 from app.db.database import get_db
+from app.core.config import settings
 from app.db import models
-from app.api.v1.dependencies import get_current_user
-from app.api.v1.schemas import InvoiceCreate, InvoiceResponse, InvoiceListResponse
-from app.services.invoice import create_invoice, get_invoice_qr_data
+from app.api.v1.dependencies import Principal, get_current_principal
+from app.api.v1.schemas import InvoiceBatchCreate, InvoiceCreate, InvoiceResponse, InvoiceListResponse
+from app.api.v1.pagination import count_rows, paginate, wants_total
+from app.api.v1.conditional import cache_response, cached_response, conditional_get, etag_matches
+from app.services.invoice import create_invoice, create_invoices, get_invoice_qr_data
+from app.services import qr
+from app.services.hdwallet import address_pool
+from app.services.rates import RateUnavailable, rate_service
 
 router = APIRouter()
 
+NDJSON_CHUNK_SIZE = 500
+
+async def resolve_amount_btc(invoice_data: InvoiceCreate) -> Optional[Decimal]:
+    """
+    BTC amount of an invoice request, or None if it has neither amount.
+    
+    USD amounts are converted at the cached BTC/USD quote (no network
+    call once a quote is cached); 503 if no recent quote is available.
+    """
+    if not invoice_data.amount_btc and not invoice_data.amount_usd:
+        return None
+    
+    amount_btc = invoice_data.amount_btc
+    if not amount_btc and invoice_data.amount_usd:
+        try:
+            quote = await rate_service.get(timeout=settings.RATE_WAIT_TIMEOUT_SECONDS)
+            amount_btc = quote.usd_to_btc(invoice_data.amount_usd)
+        except RateUnavailable as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e)
+            )
+    return amount_btc
+
+def _invoice_line(invoice) -> str:
+    """One NDJSON line for an invoice row."""
+    return InvoiceResponse(
+        id=invoice.id,
+        btc_address=invoice.btc_address,
+        amount_btc=invoice.amount_btc,
+        amount_usd=invoice.amount_usd,
+        status=invoice.status,
+        description=invoice.description,
+        qr_code_data=get_invoice_qr_data(invoice),
+        expires_at=invoice.expires_at,
+        created_at=invoice.created_at,
+        paid_at=invoice.paid_at
+    ).model_dump_json() + "\n"
+
 @router.post(
     "/create", 
     response_model=InvoiceResponse, 
@@ -19,13 +66,14 @@ router = APIRouter()
     responses={
         201: {"description": "Invoice created successfully"},
         400: {"description": "Invalid request - must provide amount_btc or amount_usd"},
-        401: {"description": "Authentication required"}
+        401: {"description": "Authentication required"},
+        503: {"description": "No recent BTC/USD rate to convert amount_usd"}
     }
 )
 async def create_invoice_endpoint(
     invoice_data: InvoiceCreate,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new invoice.
@@ -39,20 +87,14 @@ async def create_invoice_endpoint(
     
     **Requires authentication.**
     """
-    if not invoice_data.amount_btc and not invoice_data.amount_usd:
+    amount_btc = await resolve_amount_btc(invoice_data)
+    if amount_btc is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Either amount_btc or amount_usd must be provided"
         )
     
-    # If only USD provided, convert to BTC (simplified - use real exchange rate in production)
-    amount_btc = invoice_data.amount_btc
-    if not amount_btc and invoice_data.amount_usd:
-        # Placeholder conversion: 1 BTC = $50,000 (use real API in production)
-        btc_price_usd = 50000
-        amount_btc = Decimal(str(invoice_data.amount_usd)) / Decimal(str(btc_price_usd))
-    
-    invoice = create_invoice(
+    invoice = await create_invoice(
         db=db,
         user_id=current_user.id,
         amount_btc=amount_btc,
@@ -76,22 +118,91 @@ async def create_invoice_endpoint(
         paid_at=invoice.paid_at
     )
 
+@router.post(
+    "/batch",
+    status_code=status.HTTP_201_CREATED,
+    summary="Create invoices in bulk",
+    description="Create many invoices in one request; results are streamed as NDJSON",
+    responses={
+        201: {
+            "description": "Invoices created; one InvoiceResponse JSON object per line, in request order",
+            "content": {"application/x-ndjson": {}}
+        },
+        400: {"description": "Empty or too large batch, or an invoice without amount"},
+        401: {"description": "Authentication required"},
+        503: {"description": "No recent BTC/USD rate to convert amount_usd"}
+    }
+)
+async def create_invoice_batch_endpoint(
+    batch: InvoiceBatchCreate,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Create up to INVOICE_BATCH_MAX_SIZE invoices at once
+    (INVOICE_BATCH_MAX_SIZE_WITHOUT_XPUB when addresses come from BlockCypher,
+    which allows about 3 requests per second).
+    
+    Each item takes the same fields as `POST /api/invoices/create`. The
+    batch is all or nothing: addresses are allocated in bulk and every
+    invoice is inserted in one transaction. The response streams one
+    invoice per line (`application/x-ndjson`) in the order of the request.
+    
+    **Requires authentication.**
+    """
+    max_size = settings.INVOICE_BATCH_MAX_SIZE if address_pool is not None else settings.INVOICE_BATCH_MAX_SIZE_WITHOUT_XPUB
+    if not 0 < len(batch.invoices) <= max_size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch must contain between 1 and {max_size} invoices"
+        )
+    
+    items = []
+    for position, invoice_data in enumerate(batch.invoices):
+        amount_btc = await resolve_amount_btc(invoice_data)
+        if amount_btc is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invoice {position}: either amount_btc or amount_usd must be provided"
+            )
+        items.append({
+            "amount_btc": amount_btc,
+            "amount_usd": invoice_data.amount_usd,
+            "description": invoice_data.description,
+            "expires_in_hours": invoice_data.expires_in_hours,
+        })
+    
+    invoices = await create_invoices(db, current_user.id, items)
+    
+    def lines():
+        # Sent in chunks of NDJSON_CHUNK_SIZE lines rather than one write per invoice
+        for start in range(0, len(invoices), NDJSON_CHUNK_SIZE):
+            yield "".join(_invoice_line(invoice) for invoice in invoices[start:start + NDJSON_CHUNK_SIZE])
+    
+    return StreamingResponse(lines(), status_code=status.HTTP_201_CREATED, media_type="application/x-ndjson")
+
 @router.get(
     "", 
     response_model=InvoiceListResponse,
     summary="List invoices",
     description="Get paginated list of invoices for the authenticated user",
+    dependencies=[Depends(conditional_get)],
     responses={
         200: {"description": "Invoices retrieved successfully"},
+        304: {"description": "Not modified since the ETag in If-None-Match"},
         401: {"description": "Authentication required"}
     }
 )
 async def get_invoices(
+    request: Request,
+    response: Response,
     status_filter: Optional[str] = Query(None, alias="status", description="Filter by status: pending, paid, expired"),
     limit: int = Query(10, ge=1, le=100, description="Number of invoices per page"),
     offset: int = Query(0, ge=0, description="Number of invoices to skip"),
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    include_total: Optional[bool] = Query(None, description="Compute the exact total (default: only without cursor)"),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get list of invoices for the current user.
@@ -100,16 +211,31 @@ async def get_invoices(
     - **status**: Filter by invoice status (pending, paid, expired)
     - **limit**: Number of invoices per page (1-100, default: 10)
     - **offset**: Number of invoices to skip for pagination (default: 0)
+    - **cursor**: Keyset pagination cursor; when set, `offset` is ignored
+    - **include_total**: Whether to count all matching invoices
+    
+    Every page returns `next_cursor` (null on the last page). Following it
+    costs the same at any depth, unlike large offsets.
+    
+    Responses carry a weak ETag; send it back in `If-None-Match` to get
+    304 Not Modified while nothing changed.
     
     **Requires authentication.**
     """
-    query = db.query(models.Invoice).filter(models.Invoice.user_id == current_user.id)
+    cached = await cached_response(request, response)
+    if cached is not None:
+        return cached
+    
+    query = select(models.Invoice).where(models.Invoice.user_id == current_user.id)
     
     if status_filter:
-        query = query.filter(models.Invoice.status == status_filter)
+        query = query.where(models.Invoice.status == status_filter)
     
-    total = query.count()
-    invoices = query.order_by(models.Invoice.created_at.desc()).offset(offset).limit(limit).all()
+    total = await count_rows(db, query) if wants_total(include_total, cursor) else None
+    invoices, next_cursor = await paginate(
+        db, query, models.Invoice.created_at, models.Invoice.id,
+        limit=limit, offset=offset, cursor=cursor, scalars=True
+    )
     
     invoice_responses = []
     for invoice in invoices:
@@ -127,28 +253,31 @@ async def get_invoices(
             paid_at=invoice.paid_at
         ))
     
-    return InvoiceListResponse(
+    return await cache_response(request, response, InvoiceListResponse(
         invoices=invoice_responses,
         total=total,
         limit=limit,
-        offset=offset
-    )
+        offset=0 if cursor else offset,
+        next_cursor=next_cursor
+    ))
 
 @router.get(
     "/{invoice_id}", 
     response_model=InvoiceResponse,
     summary="Get invoice details",
     description="Get detailed information about a specific invoice",
+    dependencies=[Depends(conditional_get)],
     responses={
         200: {"description": "Invoice details retrieved successfully"},
+        304: {"description": "Not modified since the ETag in If-None-Match"},
         401: {"description": "Authentication required"},
         404: {"description": "Invoice not found"}
     }
 )
 async def get_invoice(
     invoice_id: int,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get invoice details by ID.
@@ -160,10 +289,12 @@ async def get_invoice(
     
     **Requires authentication.**
     """
-    invoice = db.query(models.Invoice).filter(
-        models.Invoice.id == invoice_id,
-        models.Invoice.user_id == current_user.id
-    ).first()
+    invoice = await db.scalar(
+        select(models.Invoice).where(
+            models.Invoice.id == invoice_id,
+            models.Invoice.user_id == current_user.id
+        )
+    )
     
     if not invoice:
         raise HTTPException(
@@ -187,3 +318,62 @@ async def get_invoice(
         paid_at=invoice.paid_at
     )
 
+
+@router.get(
+    "/{invoice_id}/qr.{fmt}",
+    response_class=Response,
+    summary="Get invoice QR code",
+    description="Render the invoice's BIP21 payment URI as a PNG or SVG QR code",
+    responses={
+        200: {
+            "description": "QR code image",
+            "content": {"image/png": {}, "image/svg+xml": {}}
+        },
+        304: {"description": "Not modified since the ETag in If-None-Match"},
+        401: {"description": "Authentication required"},
+        404: {"description": "Invoice not found or unsupported format"}
+    }
+)
+async def get_invoice_qr(
+    invoice_id: int,
+    fmt: str,
+    request: Request,
+    size: int = Query(8, ge=1, le=40, description="Pixels per QR module"),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get the QR code of an invoice as `qr.png` or `qr.svg`.
+    
+    Images are cached by (address, amount, size, format). An invoice's
+    address and amount never change, so responses are immutable and carry
+    long-lived cache headers and a strong ETag.
+    
+    **Requires authentication.**
+    """
+    if fmt not in qr.FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unsupported QR format (use png or svg)"
+        )
+    
+    invoice = (await db.execute(
+        select(models.Invoice.btc_address, models.Invoice.amount_btc).where(
+            models.Invoice.id == invoice_id,
+            models.Invoice.user_id == current_user.id
+        )
+    )).first()
+    
+    if not invoice:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Invoice not found"
+        )
+    
+    etag = f'"{qr.QRCache.key(invoice.btc_address, invoice.amount_btc, size, fmt)}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    image = await qr.qr_cache.get(invoice.btc_address, invoice.amount_btc, size, fmt)
+    return Response(content=image, media_type=qr.FORMATS[fmt], headers=headers)
@@ -1,60 +1,84 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from app.db.database import get_db
 from app.db import models
-from app.api.v1.dependencies import get_current_user
+from app.api.v1.dependencies import Principal, get_current_principal
 from app.api.v1.schemas import TransactionResponse, TransactionListResponse
+from app.api.v1.pagination import count_rows, paginate, wants_total
+from app.api.v1.conditional import cache_response, cached_response, conditional_get
 
 router = APIRouter()
 
-@router.get("", response_model=TransactionListResponse)
+@router.get("", response_model=TransactionListResponse, dependencies=[Depends(conditional_get)])
 async def get_transactions(
+    request: Request,
+    response: Response,
     status_filter: Optional[str] = Query(None, alias="status"),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    include_total: Optional[bool] = Query(None),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get transaction history for the current user."""
-    # Get user's wallets
-    wallets = db.query(models.Wallet).filter(models.Wallet.user_id == current_user.id).all()
-    wallet_ids = [w.id for w in wallets]
+    """
+    Get transaction history for the current user.
     
-    if not wallet_ids:
-        return TransactionListResponse(
-            transactions=[],
-            total=0,
-            limit=limit,
-            offset=offset
-        )
+    Supports OFFSET/LIMIT and keyset pagination via `cursor`/`next_cursor`.
+    The exact total is computed by default only when no cursor is given.
+    Answers 304 when `If-None-Match` matches the current ETag.
+    """
+    cached = await cached_response(request, response)
+    if cached is not None:
+        return cached
     
-    # Query transactions
-    query = db.query(models.Transaction).filter(models.Transaction.wallet_id.in_(wallet_ids))
+    # Single joined query projecting only the columns the response needs
+    # (no per-row lazy load of tx.wallet, no separate wallet lookup)
+    query = (
+        select(
+            models.Transaction.id,
+            models.Transaction.tx_hash,
+            models.Transaction.amount_btc,
+            models.Transaction.confirmations,
+            models.Transaction.status,
+            models.Transaction.created_at,
+            models.Transaction.confirmed_at,
+            models.Wallet.btc_address,
+        )
+        .join(models.Wallet, models.Wallet.id == models.Transaction.wallet_id)
+        .where(models.Wallet.user_id == current_user.id)
+    )
     
     if status_filter:
-        query = query.filter(models.Transaction.status == status_filter)
+        query = query.where(models.Transaction.status == status_filter)
     
-    total = query.count()
-    transactions = query.order_by(models.Transaction.created_at.desc()).offset(offset).limit(limit).all()
+    total = await count_rows(db, query) if wants_total(include_total, cursor) else None
+    rows, next_cursor = await paginate(
+        db, query, models.Transaction.created_at, models.Transaction.id,
+        limit=limit, offset=offset, cursor=cursor
+    )
     
-    transaction_responses = []
-    for tx in transactions:
-        transaction_responses.append(TransactionResponse(
-            id=tx.id,
-            tx_hash=tx.tx_hash,
-            amount_btc=tx.amount_btc,
-            confirmations=tx.confirmations,
-            status=tx.status,
-            btc_address=tx.wallet.btc_address,
-            created_at=tx.created_at,
-            confirmed_at=tx.confirmed_at
-        ))
+    transaction_responses = [
+        TransactionResponse(
+            id=row.id,
+            tx_hash=row.tx_hash,
+            amount_btc=row.amount_btc,
+            confirmations=row.confirmations or 0,
+            status=row.status,
+            btc_address=row.btc_address,
+            created_at=row.created_at,
+            confirmed_at=row.confirmed_at
+        )
+        for row in rows
+    ]
     
-    return TransactionListResponse(
+    return await cache_response(request, response, TransactionListResponse(
         transactions=transaction_responses,
         total=total,
         limit=limit,
-        offset=offset
-    )
+        offset=0 if cursor else offset,
+        next_cursor=next_cursor
+    ))
 
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from decimal import Decimal
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db
 from app.db import models
-from app.api.v1.dependencies import get_current_user
+from app.api.v1.dependencies import Principal, get_current_principal
 from app.api.v1.schemas import WalletResponse, WalletBalance
-from app.services.blockchain import blockchain_service
-from app.core.config import settings
+from app.api.v1.conditional import cache_response, cached_response, conditional_get
+from app.services.hdwallet import allocate_address
+from app.services.balance import get_address_balances, get_invoice_address_totals, summarize_balances
+from app.services.versioning import bump_data_versions
 
 router = APIRouter()
 
@@ -21,34 +23,41 @@ router = APIRouter()
     }
 )
 async def generate_wallet_address(
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Generate a new BTC receiving address.
     
     If the user already has a wallet, returns the existing wallet address.
-    Otherwise, generates a new Bitcoin address using BlockCypher API.
+    Otherwise, derives a new Bitcoin address from the configured xpub
+    (or generates one with the BlockCypher API if no xpub is set).
     
     **Requires authentication.**
     """
-    # Check if user already has a wallet
-    existing_wallet = db.query(models.Wallet).filter(models.Wallet.user_id == current_user.id).first()
+    # Check if user already has a wallet (invoice addresses don't count)
+    existing_wallet = await db.scalar(
+        select(models.Wallet)
+        .where(models.Wallet.user_id == current_user.id, models.Wallet.for_invoice.is_(False))
+        .order_by(models.Wallet.id)
+        .limit(1)
+    )
     if existing_wallet:
         return existing_wallet
     
-    # Generate new address
-    address_data = blockchain_service.generate_address()
+    # Allocate a new address
+    address_index, address = await allocate_address()
     
     wallet = models.Wallet(
         user_id=current_user.id,
-        btc_address=address_data["address"],
-        address_index=0
+        btc_address=address,
+        address_index=address_index
     )
     
     db.add(wallet)
-    db.commit()
-    db.refresh(wallet)
+    await bump_data_versions(db, [current_user.id])
+    await db.commit()
+    await db.refresh(wallet)
     
     return wallet
 
@@ -57,14 +66,18 @@ async def generate_wallet_address(
     response_model=WalletBalance,
     summary="Get wallet balance",
     description="Get total balance, confirmed balance, pending balance, and address details",
+    dependencies=[Depends(conditional_get)],
     responses={
         200: {"description": "Wallet balance retrieved successfully"},
+        304: {"description": "Not modified since the ETag in If-None-Match"},
         401: {"description": "Authentication required"}
     }
 )
 async def get_wallet_balance(
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get wallet balance and transaction summary.
@@ -74,60 +87,18 @@ async def get_wallet_balance(
     - **confirmed_balance_btc**: Balance with required confirmations
     - **pending_balance_btc**: Balance pending confirmation
     - **total_received_btc**: Total amount ever received
-    - **addresses**: List of addresses with their balances
+    - **addresses**: List of the user's own addresses with their balances
+    - **invoice_balance_btc** / **invoice_address_count**: Aggregate over the
+      per-invoice addresses (included in the totals, not listed)
     
     **Requires authentication.**
     """
-    wallets = db.query(models.Wallet).filter(models.Wallet.user_id == current_user.id).all()
-    
-    if not wallets:
-        return {
-            "total_balance_btc": "0",
-            "confirmed_balance_btc": "0",
-            "pending_balance_btc": "0",
-            "total_received_btc": "0",
-            "addresses": []
-        }
-    
-    total_balance = Decimal("0")
-    confirmed_balance = Decimal("0")
-    pending_balance = Decimal("0")
-    total_received = Decimal("0")
-    address_balances = []
-    
-    for wallet in wallets:
-        # Get transactions for this wallet
-        transactions = db.query(models.Transaction).filter(
-            models.Transaction.wallet_id == wallet.id
-        ).all()
-        
-        wallet_balance = Decimal("0")
-        wallet_confirmed = Decimal("0")
-        wallet_pending = Decimal("0")
-        
-        for tx in transactions:
-            total_received += tx.amount_btc
-            wallet_balance += tx.amount_btc
-            
-            if tx.confirmations >= settings.MIN_CONFIRMATIONS:
-                wallet_confirmed += tx.amount_btc
-                confirmed_balance += tx.amount_btc
-            else:
-                wallet_pending += tx.amount_btc
-                pending_balance += tx.amount_btc
-        
-        total_balance += wallet_balance
-        
-        address_balances.append({
-            "address": wallet.btc_address,
-            "balance": str(wallet_balance)
-        })
+    cached = await cached_response(request, response)
+    if cached is not None:
+        return cached
     
-    return {
-        "total_balance_btc": str(total_balance),
-        "confirmed_balance_btc": str(confirmed_balance),
-        "pending_balance_btc": str(pending_balance),
-        "total_received_btc": str(total_received),
-        "addresses": address_balances
-    }
-
+    address_balances = await get_address_balances(db, current_user.id)
+    invoice_totals = await get_invoice_address_totals(db, current_user.id)
+    return await cache_response(
+        request, response, WalletBalance(**summarize_balances(address_balances, invoice_totals))
+    )
@@ -0,0 +1,91 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Keyset (cursor) pagination over `(created_at, id)`, newest first.
+# The cursor is an opaque url-safe token encoding the last row of a page;
+# the next page is everything strictly "older" than it, which the composite
+# `(owner, created_at, id)` indexes can seek to directly at any depth.
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode the position of a row as an opaque cursor."""
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by `encode_cursor`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def _timestamp_key(db: AsyncSession):
+    """
+    Wrap timestamps for ordering and seeking.
+
+    SQLite stores timestamps as text in more than one format (server
+    defaults have no fractional part, bound values do), so compare them
+    through julianday() there. Other databases compare them as is.
+    """
+    if db.bind.dialect.name == "sqlite":
+        return func.julianday
+    return lambda value: value
+
+async def count_rows(db: AsyncSession, query) -> int:
+    """Count the rows a select would return."""
+    return await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+
+async def paginate(
+    db: AsyncSession,
+    query,
+    created_at_column,
+    id_column,
+    limit: int,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    scalars: bool = False,
+):
+    """
+    Fetch one page of `query` ordered by `(created_at, id)` descending.
+
+    Uses keyset pagination when `cursor` is given (and ignores `offset`),
+    OFFSET/LIMIT otherwise. Pass `scalars=True` for single-entity selects.
+    Returns `(rows, next_cursor)`; `next_cursor` is None on the last page.
+    """
+    timestamp = _timestamp_key(db)
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(timestamp(created_at_column), id_column)
+            < tuple_(timestamp(cursor_created_at), cursor_id)
+        )
+        offset = 0
+
+    query = query.order_by(timestamp(created_at_column).desc(), id_column.desc())
+    if offset:
+        query = query.offset(offset)
+
+    # Fetch one extra row to know whether there is a next page
+    result = await db.execute(query.limit(limit + 1))
+    rows = result.scalars().all() if scalars else result.all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.id)
+
+def wants_total(include_total: Optional[bool], cursor: Optional[str]) -> bool:
+    """Exact totals are computed by default for offset pages and are opt-in for cursor pages."""
+    if include_total is None:
+        return cursor is None
+    return include_total
@@ -46,6 +46,11 @@ class Token(BaseModel):
     token_type: str
     user: UserResponse
 
+class EventTicket(BaseModel):
+    enabled: bool  # False: live events are not available on this deployment, keep polling
+    ticket: Optional[str] = None
+    expires_in: Optional[int] = None  # Seconds
+
 # Wallet Schemas
 class WalletResponse(BaseModel):
     id: int
@@ -65,6 +70,8 @@ class WalletBalance(BaseModel):
     pending_balance_btc: str
     total_received_btc: str
     addresses: list[AddressBalance]
+    invoice_balance_btc: str
+    invoice_address_count: int
 
 # Invoice Schemas
 class InvoiceCreate(BaseModel):
@@ -83,6 +90,20 @@ class InvoiceCreate(BaseModel):
             }
         }
 
+class InvoiceBatchCreate(BaseModel):
+    """Bulk invoice creation schema (up to INVOICE_BATCH_MAX_SIZE invoices)."""
+    invoices: list[InvoiceCreate]
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "invoices": [
+                    {"amount_usd": 100.0, "description": "Subscription - March"},
+                    {"amount_btc": 0.0025, "description": "Consulting", "expires_in_hours": 48}
+                ]
+            }
+        }
+
 class InvoiceResponse(BaseModel):
     id: int
     btc_address: str
@@ -100,9 +121,10 @@ class InvoiceResponse(BaseModel):
 
 class InvoiceListResponse(BaseModel):
     invoices: list[InvoiceResponse]
-    total: int
+    total: Optional[int] = None  # Omitted unless requested on cursor pages
     limit: int
     offset: int
+    next_cursor: Optional[str] = None
 
 # Transaction Schemas
 class TransactionResponse(BaseModel):
@@ -120,7 +142,8 @@ class TransactionResponse(BaseModel):
 
 class TransactionListResponse(BaseModel):
     transactions: list[TransactionResponse]
-    total: int
+    total: Optional[int] = None  # Omitted unless requested on cursor pages
     limit: int
     offset: int
+    next_cursor: Optional[str] = None
 
@@ -2,30 +2,125 @@ from pydantic_settings import BaseSettings
 from typing import List, Union
 from pydantic import field_validator
 import json
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 class Settings(BaseSettings):
     # Database - allow empty for development (will use SQLite if not set)
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./vertex_wallet.db")
+    # Connection pooling (see app/db/pool.py): serverless, long-running or pgbouncer; empty = serverless on Vercel
+    DB_POOL_PROFILE: str = os.getenv("DB_POOL_PROFILE", "")
+    DB_POOL_SIZE: int = 10  # Per process; size (size + overflow) * workers below Postgres max_connections
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 10.0  # Wait for a free connection before failing
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_STATEMENT_TIMEOUT_MS: int = 30000  # long-running profile; 0 = no timeout
     
     # JWT - generate a default for development if not set
     SECRET_KEY: str = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production-min-32-chars")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    TOKEN_VERSION_CACHE_TTL_SECONDS: int = 30  # How long a revoked token may still be accepted by another worker
+    
+    # Password hashing (bcrypt runs on a bounded thread pool, see app/core/security.py)
+    BCRYPT_ROUNDS: int = 12  # Changing this rehashes passwords transparently on next login
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 32  # Waiting calls beyond this get 503 + Retry-After
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 2
     
     # Blockchain API - allow empty for development
     BLOCKCYPHER_API_KEY: str = os.getenv("BLOCKCYPHER_API_KEY", "dev-api-key")
     BLOCKCHAIN_NETWORK: str = "test3"  # test3 for testnet, main for mainnet
     WEBHOOK_SECRET: str = os.getenv("WEBHOOK_SECRET", "dev-webhook-secret")
+    BLOCKCYPHER_BASE_URL: str = "https://api.blockcypher.com/v1/btc"  # Point at fixtures/fake_blockcypher.py for offline tests
+    BLOCKCYPHER_TIMEOUT_SECONDS: float = 10.0
+    BLOCKCYPHER_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    BLOCKCYPHER_MAX_CONNECTIONS: int = 20
+    BLOCKCYPHER_MAX_RETRIES: int = 3  # Retries on 429/5xx and transport errors
+    BLOCKCYPHER_BACKOFF_BASE_SECONDS: float = 0.5
+    BLOCKCYPHER_BACKOFF_MAX_SECONDS: float = 8.0
+    BLOCKCYPHER_RATE_LIMIT_PER_SECOND: float = 3.0  # Free plan: 3 requests/s
+    BLOCKCYPHER_RATE_LIMIT_BURST: int = 3
+    TX_CACHE_SIZE: int = 10000  # Transactions kept in memory (see app/services/tx_cache.py)
+    TX_CACHE_PENDING_TTL_SECONDS: float = 30.0  # Until RECOMMENDED_CONFIRMATIONS; final transactions never expire
+    TX_CACHE_ADDRESS_TTL_SECONDS: float = 30.0
+    TX_CACHE_PATH: str = os.getenv("TX_CACHE_PATH", "")  # SQLite file for the on-disk tier; empty = memory only
+    
+    # Webhook ingestion: "sync" processes inline, "queue" stores the payload, returns 202 and processes in the background
+    WEBHOOK_INGEST_MODE: str = os.getenv("WEBHOOK_INGEST_MODE", "sync")
+    WEBHOOK_QUEUE_WORKERS: int = 4
+    WEBHOOK_QUEUE_BATCH_SIZE: int = 200  # Events claimed per dispatcher round
+    WEBHOOK_QUEUE_POLL_INTERVAL_SECONDS: float = 1.0
+    WEBHOOK_MAX_ATTEMPTS: int = 8  # With the backoff below, an event is retried for about an hour
+    WEBHOOK_RETRY_BASE_SECONDS: float = 30.0  # Delay after the first failure, doubled per attempt
+    WEBHOOK_RETRY_MAX_SECONDS: float = 3600.0
+    WEBHOOK_LEASE_SECONDS: int = 300  # Claimed events not finished within this are taken over by another dispatcher
+    WEBHOOK_EVENT_RETENTION_DAYS: int = 7  # Finished (done/failed) queue events, with their payloads, are deleted after this
+    WEBHOOK_DELIVERY_RETENTION_HOURS: int = 24  # Idempotency keys; keys of transactions past MIN_CONFIRMATIONS go sooner
+    WEBHOOK_RETENTION_INTERVAL_SECONDS: int = 3600
+    WEBHOOK_RETENTION_BATCH_SIZE: int = 1000  # Rows deleted per transaction
+    WEBHOOK_DEDUP_CACHE_SIZE: int = 10000  # Recently seen (tx_hash, confirmations) deliveries per process
+    WEBHOOK_DEDUP_TTL_SECONDS: int = 3600
+    
+    # HD wallet - account-level xpub/zpub (m/84'/coin'/account'); empty = generate addresses via BlockCypher
+    HD_XPUB: str = os.getenv("HD_XPUB", "")
+    HD_ADDRESS_POOL_SIZE: int = 20  # Addresses reserved per refill; see AddressPool for the gap limit this implies
+    HD_ADDRESS_POOL_LOW_WATERMARK: int = 5  # Refill in the background below this many
+    
+    # Server-sent events (GET /api/events, see app/services/events.py)
+    EVENTS_ENABLED: bool = not os.getenv("VERCEL")  # Serverless functions cannot hold a stream open; clients poll instead
+    EVENTS_BACKEND: str = os.getenv("EVENTS_BACKEND", "memory")  # memory (single worker) or postgres (LISTEN/NOTIFY)
+    EVENTS_CHANNEL: str = "vertex_events"
+    EVENTS_QUEUE_SIZE: int = 100  # Per stream; the oldest events are dropped for slow clients
+    EVENTS_HEARTBEAT_SECONDS: int = 15
+    EVENTS_TICKET_TTL_SECONDS: int = 60  # Lifetime of the stream ticket passed in the URL
+    
+    # Per-user response cache for the polled read endpoints (see app/services/response_cache.py)
+    RESPONSE_CACHE_BACKEND: str = os.getenv("RESPONSE_CACHE_BACKEND", "memory")  # memory, redis or none
+    RESPONSE_CACHE_REDIS_URL: str = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+    RESPONSE_CACHE_SIZE: int = 10000  # Entries per process (memory backend)
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
     
     # Server
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
     CORS_ORIGINS: Union[str, List[str]] = os.getenv("CORS_ORIGINS", "http://localhost:5173")
     
+    # Logging (see app/core/logging.py)
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")  # json or text
+    LOG_DEBUG_SAMPLE_RATE: float = 0.01  # Fraction of requests whose DEBUG records are kept
+    LOG_REQUESTS: bool = True  # One access line per request
+    LOG_QUEUE: bool = not os.getenv("VERCEL")  # Write from a background thread; off on serverless, which may freeze it
+    LOG_QUEUE_SIZE: int = 10000  # Records beyond this are dropped rather than blocking requests
+    
     # Bitcoin
     MIN_CONFIRMATIONS: int = 1
     RECOMMENDED_CONFIRMATIONS: int = 6
     
+    # Background jobs (app/services/scheduler.py)
+    SCHEDULER_ENABLED: bool = not os.getenv("VERCEL")
+    CONFIRMATION_POLL_INTERVAL_SECONDS: int = 60  # Chain tip polls; confirmations are only recomputed on a new block
+    CONFIRMATION_BACKFILL_LIMIT: int = 50  # Unmined pending transactions re-checked for a block height per new block
+    INVOICE_SWEEP_INTERVAL_SECONDS: int = 60
+    INVOICE_SWEEP_BATCH_SIZE: int = 500  # Invoices expired per transaction
+    INVOICE_SWEEP_MAX_BATCHES: int = 20  # Per sweep; the rest waits for the next run
+    
+    # Invoices
+    INVOICE_BATCH_MAX_SIZE: int = 5000  # Invoices per POST /api/invoices/batch
+    INVOICE_BATCH_MAX_SIZE_WITHOUT_XPUB: int = 10  # Without HD_XPUB every address is a rate-limited BlockCypher call
+    # BTC/USD rate for amount_usd invoices (see app/services/rates.py)
+    RATE_SOURCE_URL: str = os.getenv("RATE_SOURCE_URL", "https://api.coinbase.com/v2/prices/BTC-USD/spot")
+    RATE_SOURCE_FILE: str = os.getenv("RATE_SOURCE_FILE", "")  # JSON file stand-in (fixtures/btc_usd_rate.json); overrides the URL
+    RATE_SOURCE_TIMEOUT_SECONDS: float = 5.0
+    RATE_REFRESH_INTERVAL_SECONDS: int = 60
+    RATE_MAX_STALENESS_SECONDS: int = 600  # Older quotes are not used; USD invoices fail with 503 instead
+    RATE_WAIT_TIMEOUT_SECONDS: float = 3.0  # Wait for a quote when none is cached (cold start) before the 503
+    # QR images (GET /api/invoices/{id}/qr.png|svg, see app/services/qr.py)
+    QR_CACHE_SIZE: int = 2000  # Rendered images kept in memory
+    QR_CACHE_DIR: str = os.getenv("QR_CACHE_DIR", "")  # Directory for the on-disk cache; empty = memory only
+    
     @field_validator('CORS_ORIGINS', mode='before')
     @classmethod
     def parse_cors_origins(cls, v):
@@ -83,11 +178,11 @@ class Settings(BaseSettings):
         if errors and os.getenv("ENVIRONMENT", "development") == "development":
             # Check if using default dev values
             if self.SECRET_KEY == "dev-secret-key-change-in-production-min-32-chars":
-                print("⚠️ Using default SECRET_KEY for development. Change in production!")
+                logger.warning("Using default SECRET_KEY for development. Change in production!")
             if self.BLOCKCYPHER_API_KEY == "dev-api-key":
-                print("⚠️ Using default BLOCKCYPHER_API_KEY for development. Set real API key in production!")
+                logger.warning("Using default BLOCKCYPHER_API_KEY for development. Set real API key in production!")
             if self.WEBHOOK_SECRET == "dev-webhook-secret":
-                print("⚠️ Using default WEBHOOK_SECRET for development. Change in production!")
+                logger.warning("Using default WEBHOOK_SECRET for development. Change in production!")
             # Don't raise error in development, just warn
             return
         
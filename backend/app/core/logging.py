@@ -0,0 +1,207 @@
+"""
+Structured logging for the API and background jobs.
+
+`configure_logging()` installs one handler on the root logger:
+
+- records are handed to a bounded queue and written to stderr by a
+  background thread (QueueListener), so a request never waits on log I/O.
+  When the queue is full, records are dropped and counted in
+  log_records_dropped_total instead of blocking;
+- every record carries the id of the request it was logged in
+  (`request_id_var`, set by RequestIdMiddleware from X-Request-ID);
+- DEBUG records are sampled per request (LOG_DEBUG_SAMPLE_RATE): a sampled
+  request keeps all its debug lines, the others keep none;
+- LOG_FORMAT=json writes one JSON object per line, with `extra=` fields as
+  keys; LOG_FORMAT=text is meant for local development.
+
+Use `logging.getLogger(__name__)` as usual and pass data as fields:
+    logger.info("Invoice paid", extra={"invoice_id": invoice.id})
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import time
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from app.core.config import settings
+from app.core.metrics import metrics
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+_dropped = metrics.counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "request_id"}
+
+class RequestContextFilter(logging.Filter):
+    """Adds the current request id to the record (runs in the calling thread)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+class DebugSampler(logging.Filter):
+    """Keeps a `rate` fraction of DEBUG records, decided once per request id."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.threshold = int(max(0.0, min(1.0, rate)) * 0xFFFFFFFF)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            return zlib.crc32(request_id.encode()) <= self.threshold
+        return random.random() * 0xFFFFFFFF <= self.threshold
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = record.stack_info
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = "-"
+        return super().format(record)
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback now: args and exc_info may not
+        # survive until the listener thread formats the record
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _dropped.inc()
+
+_listener: Optional[QueueListener] = None
+_configured = False
+
+def configure_logging() -> None:
+    """Install the root handler per the LOG_* settings. Safe to call more than once."""
+    global _listener, _configured
+    if _configured:
+        return
+    _configured = True
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+
+    if settings.LOG_QUEUE:
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+        _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+    else:
+        handler = output
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(DebugSampler(settings.LOG_DEBUG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread (registered with atexit)."""
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
+
+access_logger = logging.getLogger("app.access")
+
+class RequestIdMiddleware:
+    """
+    Assigns each HTTP request an id and logs one access line per request.
+
+    The id is taken from a well-formed incoming X-Request-ID header (so it
+    can be correlated with a proxy or client) or generated, stored in
+    `request_id_var` and echoed in the X-Request-ID response header.
+    """
+
+    HEADER = b"x-request-id"
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == self.HEADER:
+                if 0 < len(value) <= 128 and value.isascii() and value.decode().isprintable():
+                    request_id = value.decode()
+                break
+        request_id = request_id or uuid.uuid4().hex
+        # Not reset afterwards: each request runs in its own task (and so its
+        # own context), and the outermost 500 handler still needs the id
+        request_id_var.set(request_id)
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", []), (self.HEADER, request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            if settings.LOG_REQUESTS:
+                access_logger.info(
+                    "%s %s %d", scope["method"], scope["path"], status_code,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status_code,
+                        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                    },
+                )
@@ -0,0 +1,109 @@
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+# Minimal in-process metrics registry, exposed as JSON on GET /metrics.
+# Values are per worker process; scrape every worker to aggregate.
+
+class Counter:
+    """Monotonically increasing count."""
+
+    def __init__(self, description: str = ""):
+        self.description = description
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+class Gauge:
+    """Value that can go up and down (queue depth, pool usage...)."""
+
+    def __init__(self, description: str = ""):
+        self.description = description
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = value
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def snapshot(self):
+        return self.value
+
+class Histogram:
+    """Count/sum/max of observations plus percentiles over a window of recent samples."""
+
+    def __init__(self, description: str = "", window: int = 1024):
+        self.description = description
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+            self._samples.append(value)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(pct / 100 * len(samples)))
+        return samples[index]
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "max": round(self.max, 6),
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+        }
+
+class MetricsRegistry:
+    """Get-or-create registry of named metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str, factory, description: str):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory(description)
+            return metric
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        return self._get(name, Counter, description)
+
+    def gauge(self, name: str, description: str = "") -> Gauge:
+        return self._get(name, Gauge, description)
+
+    def histogram(self, name: str, description: str = "") -> Histogram:
+        return self._get(name, Histogram, description)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            items = sorted(self._metrics.items())
+        return {name: metric.snapshot() for name, metric in items}
+
+metrics = MetricsRegistry()
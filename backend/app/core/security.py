@@ -1,16 +1,27 @@
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-import bcrypt
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import asyncio
+import threading
+import time
 from app.core.config import settings
+from app.core.metrics import metrics
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# jose, passlib and bcrypt are imported on first use: they are only needed
+# once a request authenticates, not to start the app (cold start)
+
+@lru_cache(maxsize=None)
+def _pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash."""
+    import bcrypt
+
     try:
-        return pwd_context.verify(plain_password, hashed_password)
+        return _pwd_context().verify(plain_password, hashed_password)
     except Exception:
         # Fallback to direct bcrypt if passlib fails
         try:
@@ -22,23 +33,108 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     """Hash a password."""
+    import bcrypt
+
     # Use direct bcrypt to avoid passlib compatibility issues
     try:
         password_bytes = password.encode('utf-8')
         if len(password_bytes) > 72:
             raise ValueError("Password is too long (max 72 bytes)")
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
         hash_bytes = bcrypt.hashpw(password_bytes, salt)
         return hash_bytes.decode('utf-8')
     except Exception as e:
         # Fallback to passlib if direct bcrypt fails
         try:
-            return pwd_context.hash(password)
+            return _pwd_context().hash(password)
         except Exception:
             raise ValueError(f"Failed to hash password: {str(e)}")
 
+def needs_rehash(hashed_password: str) -> bool:
+    """Whether a bcrypt hash was made with a different work factor than configured."""
+    try:
+        # Format: $2b$<cost>$<salt+hash>
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing pool is saturated."""
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated, size-limited thread pool.
+
+    bcrypt costs ~250 ms of CPU per call and releases the GIL while hashing,
+    so a small pool keeps it off the event loop. At most `max_queue` calls
+    may wait for a worker; beyond that calls fail fast with
+    `PasswordHasherBusy` so the API can answer 503 + Retry-After instead of
+    letting a login burst queue up unboundedly.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._queue_depth = metrics.gauge("password_hash_queue_depth", "Calls waiting for a bcrypt worker")
+        self._in_flight = metrics.gauge("password_hash_in_flight", "Calls queued or running")
+        self._rejected = metrics.counter("password_hash_rejected_total", "Calls rejected because the pool was saturated")
+        self._wait = metrics.histogram("password_hash_wait_seconds", "Time spent waiting for a bcrypt worker")
+        self._duration = metrics.histogram("password_hash_duration_seconds", "bcrypt CPU time per call")
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def _update_gauges(self) -> None:
+        self._in_flight.set(self._pending)
+        self._queue_depth.set(max(0, self._pending - self.workers))
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._rejected.inc()
+                raise PasswordHasherBusy()
+            self._pending += 1
+            self._update_gauges()
+
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            self._wait.observe(started - submitted)
+            try:
+                return fn(*args)
+            finally:
+                self._duration.observe(time.perf_counter() - started)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), task)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._update_gauges()
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against a hash on the worker pool."""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password on the worker pool."""
+        return await self._run(get_password_hash, password)
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -51,6 +147,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 def decode_access_token(token: str) -> Optional[dict]:
     """Decode and verify a JWT token."""
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         return payload
@@ -1,40 +1,35 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.pool import engine_options
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 # Lazy initialization to prevent cold-start crashes in Vercel
 _engine = None
 _SessionLocal = None
+_async_engine = None
+_AsyncSessionLocal = None
 
 def get_engine():
     """Lazy initialization of database engine."""
     global _engine
     if _engine is None:
+        # Pool sizing, pre-ping, recycling and timeouts per DB_POOL_PROFILE (see app/db/pool.py)
+        engine_kwargs = engine_options(make_url(settings.DATABASE_URL), is_async=False)
+
         # Support SQLite for local development
-        connect_args = {}
         if settings.DATABASE_URL and settings.DATABASE_URL.startswith("sqlite"):
-            connect_args = {"check_same_thread": False}
-
-        # For Vercel/serverless, use connection pooling
-        engine_kwargs = {
-            "connect_args": connect_args,
-            "pool_pre_ping": True,  # Verify connections before using
-            "pool_recycle": 300,    # Recycle connections after 5 minutes
-        }
-
-        # In production/serverless, disable connection pooling issues
-        if os.getenv("VERCEL") or os.getenv("ENVIRONMENT") == "production":
-            # For serverless, use NullPool to avoid connection pooling issues
-            from sqlalchemy.pool import NullPool
-            engine_kwargs["poolclass"] = NullPool
-            engine_kwargs.pop("pool_pre_ping", None)
-            engine_kwargs.pop("pool_recycle", None)
+            engine_kwargs.setdefault("connect_args", {})["check_same_thread"] = False
 
         # Create engine with error handling
         db_url_preview = settings.DATABASE_URL[:20] if len(settings.DATABASE_URL) > 20 else settings.DATABASE_URL
-        print(f"[DB] Initializing database engine: {db_url_preview}...")  # Don't print full URL for security
+        logger.info("Initializing database engine", extra={"database_url": f"{db_url_preview}..."})  # Never log the full URL
 
         try:
             _engine = create_engine(settings.DATABASE_URL, **engine_kwargs)
@@ -43,16 +38,14 @@ def get_engine():
             if not os.getenv("VERCEL"):
                 try:
                     with _engine.connect() as conn:
-                        print("[DB] Database connection successful!")
+                        logger.info("Database connection successful")
                 except Exception as e:
-                    print(f"[DB] Database connection warning: {str(e)}")
+                    logger.warning("Database connection warning: %s", e)
                     # Don't raise in development, just warn
                     if os.getenv("ENVIRONMENT") == "production" and not os.getenv("VERCEL"):
                         raise
         except Exception as e:
-            print(f"[DB] Database engine creation error: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Database engine creation error: %s", e)
             # In serverless, don't fail at import time
             if not os.getenv("VERCEL"):
                 raise
@@ -84,20 +77,70 @@ class _LazySessionLocal:
 engine = _LazyEngine()
 SessionLocal = _LazySessionLocal()
 
-# Initialize on first import for non-Vercel environments (for scripts)
-if not os.getenv("VERCEL"):
-    _ = get_engine()  # Initialize engine
-    _ = get_session_local()  # Initialize SessionLocal
+# Engines are created on first use (first request, or first use of
+# `engine`/`SessionLocal` in scripts), never at import time
 
 Base = declarative_base()
 
-def get_db():
-    """Dependency for getting database session."""
-    # Use lazy initialization
-    session_local = get_session_local()
-    db = session_local()
-    try:
+# Async drivers used by the API: asyncpg for Postgres, aiosqlite for dev.
+# Scripts and Alembic keep using the synchronous engine above.
+_ASYNC_DRIVERS = {
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def get_async_database_url():
+    """Translate DATABASE_URL to its async driver, returning (url, connect_args)."""
+    url = make_url(settings.DATABASE_URL)
+    connect_args = {}
+    drivername = _ASYNC_DRIVERS.get(url.drivername, url.drivername)
+
+    if drivername == "postgresql+asyncpg":
+        # asyncpg does not understand libpq-only query parameters
+        query = dict(url.query)
+        sslmode = query.pop("sslmode", None)
+        query.pop("channel_binding", None)
+        if sslmode and sslmode != "disable":
+            connect_args["ssl"] = sslmode
+        url = url.set(query=query)
+
+    return url.set(drivername=drivername), connect_args
+
+def get_async_engine():
+    """Lazy initialization of the async database engine."""
+    global _async_engine
+    if _async_engine is None:
+        url, connect_args = get_async_database_url()
+        engine_kwargs = engine_options(url, is_async=True)
+        engine_kwargs["connect_args"] = {**engine_kwargs.get("connect_args", {}), **connect_args}
+
+        _async_engine = create_async_engine(url, **engine_kwargs)
+    return _async_engine
+
+def get_async_session_local():
+    """Lazy initialization of the async sessionmaker."""
+    global _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        _AsyncSessionLocal = async_sessionmaker(
+            bind=get_async_engine(),
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+    return _AsyncSessionLocal
+
+async def dispose_async_engine():
+    """Close pooled async connections (on application shutdown)."""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _AsyncSessionLocal = None
+
+async def get_db():
+    """Dependency for getting an async database session."""
+    async with get_async_session_local()() as db:
         yield db
-    finally:
-        db.close()
 
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, DateTime, Text, Boolean, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import false, func, text
 from app.db.database import Base
 
 class User(Base):
@@ -10,6 +10,8 @@ class User(Base):
     name = Column(String(255), nullable=False)  # Full name
     email = Column(String(255), unique=True, index=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")  # Bump to revoke issued tokens
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped by writes to the user's invoices, transactions or wallets (ETags)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -24,6 +26,10 @@ class Wallet(Base):
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     btc_address = Column(String(255), unique=True, nullable=False, index=True)
     address_index = Column(Integer, nullable=False, default=0)
+    for_invoice = Column(Boolean, nullable=False, default=False, server_default=false())  # Allocated for a single invoice; not listed as a user address
+    # Running totals maintained by the webhook path (see app/services/balance.py)
+    confirmed_balance_btc = Column(Numeric(18, 8), nullable=False, default=0, server_default="0")
+    pending_balance_btc = Column(Numeric(18, 8), nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -41,6 +47,7 @@ class Invoice(Base):
     amount_btc = Column(Numeric(18, 8), nullable=False)
     amount_usd = Column(Numeric(10, 2))
     status = Column(String(50), nullable=False, default="pending", index=True)  # pending, paid, expired, cancelled
+    shared_address = Column(Boolean, nullable=False, default=False, server_default=false())  # Issued before per-invoice addresses; may share its address
     description = Column(Text)
     expires_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -50,6 +57,23 @@ class Invoice(Base):
     user = relationship("User", back_populates="invoices")
     wallet = relationship("Wallet", back_populates="invoices")
     transaction = relationship("Transaction", back_populates="invoice", uselist=False)
+    
+    __table_args__ = (
+        # Keyset pagination of a user's invoices
+        Index("ix_invoices_user_id_created_at_id", "user_id", "created_at", "id"),
+        # Expiry sweeper: overdue pending invoices, oldest first
+        Index("ix_invoices_status_expires_at", "status", "expires_at"),
+        # Every invoice gets its own derived address; at most one open invoice per
+        # address (except legacy shared-address ones), so the webhook resolves
+        # address -> invoice with one index probe
+        Index(
+            "uq_invoices_pending_btc_address",
+            "btc_address",
+            unique=True,
+            postgresql_where=text("status = 'pending' AND NOT shared_address"),
+            sqlite_where=text("status = 'pending' AND NOT shared_address"),
+        ),
+    )
 
 class Transaction(Base):
     __tablename__ = "transactions"
@@ -66,6 +90,56 @@ class Transaction(Base):
     confirmed_at = Column(DateTime(timezone=True))
     
     # Relationships
-    wallet = relationship("Wallet", back_populates="transactions")
+    # Listing endpoints join and project wallet columns explicitly; raising on
+    # an implicit per-row lazy load keeps N+1 queries from creeping back in.
+    wallet = relationship("Wallet", back_populates="transactions", lazy="raise_on_sql")
     invoice = relationship("Invoice", back_populates="transaction")
+    
+    __table_args__ = (
+        # Keyset pagination of a wallet's transactions
+        Index("ix_transactions_wallet_id_created_at_id", "wallet_id", "created_at", "id"),
+    )
+
+
+class AddressIndexCounter(Base):
+    """Next unreserved derivation index per xpub (see app/services/hdwallet.py)."""
+    __tablename__ = "address_index_counters"
+    
+    key = Column(String(64), primary_key=True)  # xpub fingerprint
+    next_index = Column(Integer, nullable=False)
+
+class WebhookEvent(Base):
+    """Raw webhook payload awaiting background processing (WEBHOOK_INGEST_MODE=queue)."""
+    __tablename__ = "webhook_events"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    address = Column(String(255), nullable=False)
+    tx_hash = Column(String(255), nullable=False)
+    payload = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default="queued")  # queued, processing, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    result = Column(Text)
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    claimed_at = Column(DateTime(timezone=True))  # Start of the dispatcher's lease while processing
+    next_attempt_at = Column(DateTime(timezone=True))  # Retry backoff of a failed event; NULL = now
+    processed_at = Column(DateTime(timezone=True))
+    
+    __table_args__ = (
+        # Dispatcher polls the oldest queued events
+        Index("ix_webhook_events_status_id", "status", "id"),
+        # Earlier unfinished events of the same address hold back later ones
+        Index("ix_webhook_events_address_id", "address", "id"),
+    )
 
+class WebhookDelivery(Base):
+    """Idempotency key of an applied webhook delivery; BlockCypher sends one per confirmation."""
+    __tablename__ = "webhook_deliveries"
+    
+    tx_hash = Column(String(255), primary_key=True)
+    confirmations = Column(Integer, primary_key=True, autoincrement=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # Retention job deletes keys past WEBHOOK_DELIVERY_RETENTION_HOURS
+        Index("ix_webhook_deliveries_created_at", "created_at"),
+    )
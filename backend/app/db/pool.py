@@ -0,0 +1,128 @@
+"""
+Connection pool profiles (DB_POOL_PROFILE).
+
+- "serverless": NullPool, one connection per checkout. For Vercel-style
+  deployments where a process may be frozen between requests; the
+  database (or its pooler) does the pooling.
+- "long-running": QueuePool sized by DB_POOL_SIZE / DB_MAX_OVERFLOW, with
+  pre-ping, recycling and LIFO reuse (idle extras get recycled). For
+  uvicorn/gunicorn workers.
+- "pgbouncer": the long-running pool in front of PgBouncer in transaction
+  mode. Prepared statements don't survive a server connection switch, so
+  asyncpg's statement cache is disabled and statement names are unique.
+
+Postgres statement timeouts (DB_STATEMENT_TIMEOUT_MS) are sent as a
+startup parameter in the long-running profile only: poolers commonly reject
+unknown startup parameters, so behind one set it on the database role
+instead (ALTER ROLE ... SET statement_timeout = ...).
+
+The async engine's pools are instrumented: checkout wait (including
+connecting), connections checked out, saturation and pool timeouts are
+exported as metrics.
+"""
+import os
+import time
+from typing import Optional
+from uuid import uuid4
+from sqlalchemy import event, exc
+from sqlalchemy.engine import URL
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from app.core.config import settings
+from app.core.metrics import metrics
+
+PROFILES = ("serverless", "long-running", "pgbouncer")
+
+checkout_seconds = metrics.histogram("db_pool_checkout_seconds", "Time to get a connection from the pool (incl. connecting)")
+checked_out = metrics.gauge("db_pool_checked_out", "Connections currently checked out")
+saturation = metrics.gauge("db_pool_saturation", "Checked out / (pool size + max overflow)")
+pool_timeouts = metrics.counter("db_pool_timeouts_total", "Checkouts that timed out waiting for a connection")
+
+class _InstrumentedPool:
+    """Mixin recording checkout wait and usage of the pool it is mixed into."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # recreate() (engine.dispose()) passes the old pool's dispatch, which
+        # already carries these listeners
+        if kwargs.get("_dispatch") is None:
+            event.listen(self, "checkout", self._on_checkout)
+            event.listen(self, "checkin", self._on_checkin)
+
+    def _capacity(self) -> Optional[int]:
+        return None
+
+    def _update_usage(self, delta: int) -> None:
+        checked_out.inc(delta)
+        capacity = self._capacity()
+        if capacity:
+            saturation.set(round(checked_out.value / capacity, 4))
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        self._update_usage(1)
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        self._update_usage(-1)
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            pool_timeouts.inc()
+            raise
+        finally:
+            checkout_seconds.observe(time.perf_counter() - started)
+
+# Log under SQLAlchemy's own pool logger names (not app.db.pool), so the
+# "sqlalchemy" log level applies to these pools too
+class InstrumentedAsyncQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    _sqla_logger_namespace = "sqlalchemy.pool.impl.AsyncAdaptedQueuePool"
+
+    def _capacity(self) -> Optional[int]:
+        return self.size() + max(self._max_overflow, 0)
+
+class InstrumentedNullPool(_InstrumentedPool, NullPool):
+    _sqla_logger_namespace = "sqlalchemy.pool.impl.NullPool"
+
+def pool_profile() -> str:
+    """Configured profile; defaults to serverless on Vercel, long-running elsewhere."""
+    profile = settings.DB_POOL_PROFILE or ("serverless" if os.getenv("VERCEL") else "long-running")
+    if profile not in PROFILES:
+        raise ValueError(f"DB_POOL_PROFILE must be one of {', '.join(PROFILES)}, not {profile!r}")
+    return profile
+
+def engine_options(url: URL, is_async: bool, profile: Optional[str] = None) -> dict:
+    """create_engine/create_async_engine keyword arguments for a pool profile."""
+    profile = profile or pool_profile()
+    options = {}
+    connect_args = {}
+
+    if profile == "serverless":
+        options["poolclass"] = InstrumentedNullPool if is_async else NullPool
+    elif url.get_backend_name() != "sqlite" or url.database not in (None, "", ":memory:"):
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool if is_async else QueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            pool_pre_ping=True,
+            pool_use_lifo=True,
+        )
+
+    if url.get_backend_name() == "postgresql":
+        driver = url.get_driver_name()
+        if profile == "long-running" and settings.DB_STATEMENT_TIMEOUT_MS:
+            timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+            if driver == "asyncpg":
+                connect_args["server_settings"] = {"statement_timeout": timeout}
+            else:
+                connect_args["options"] = f"-c statement_timeout={timeout}"
+        if profile == "pgbouncer" and driver == "asyncpg":
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
@@ -3,8 +3,21 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.core.config import settings
 from app.api.v1.api import api_router
+from app.db.database import dispose_async_engine
+from app.db.pool import pool_profile
+from app.services.blockchain import blockchain_service
+from app.services.hdwallet import address_pool
+from app.services.webhook import webhook_queue
+from app.services.scheduler import start_scheduler, shutdown_scheduler
+from app.services.events import event_broker
+from app.services.rates import rate_service
+from app.core.metrics import metrics
+from app.core.logging import RequestIdMiddleware, configure_logging, request_id_var
+import logging
 import os
-import traceback
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
 # Validate settings before starting app
 # In development, allow missing settings (they might be in .env file)
@@ -13,11 +26,10 @@ try:
 except ValueError as e:
     if os.getenv("VERCEL"):
         # In Vercel, log the error but don't fail (environment variables should be set)
-        print(f"⚠️ Configuration warning: {e}")
+        logger.warning("Configuration warning: %s", e)
     elif os.getenv("ENVIRONMENT", "development") == "development":
         # In development, just warn but don't fail
-        print(f"⚠️ Configuration warning: {e}")
-        print("⚠️ Some features may not work until all environment variables are set.")
+        logger.warning("Configuration warning: %s. Some features may not work until all environment variables are set.", e)
     else:
         raise
 
@@ -61,16 +73,18 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Request ids and access log (see app/core/logging.py)
+app.add_middleware(RequestIdMiddleware)
 
 # Global exception handler to catch all errors and return proper CORS headers
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler to ensure CORS headers are always sent."""
-    print(f"[ERROR] Unhandled exception: {str(exc)}")
-    print(traceback.format_exc())
+    logger.error("Unhandled exception", exc_info=exc, extra={"method": request.method, "path": request.url.path})
     
     # Get origin from request headers
     origin = request.headers.get("origin")
+    cors_origins = settings.cors_origins_list
     # If origin is in allowed list, use it; otherwise use first allowed origin or wildcard
     allowed_origin = origin if origin and origin in cors_origins else (cors_origins[0] if cors_origins else "*")
     
@@ -85,12 +99,42 @@ async def global_exception_handler(request: Request, exc: Exception):
             "Access-Control-Allow-Credentials": "true",
             "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS, PATCH",
             "Access-Control-Allow-Headers": "*",
+            "X-Request-ID": request_id_var.get() or "",
         }
     )
 
 # Include API routes
 app.include_router(api_router, prefix="/api")
 
+@app.on_event("startup")
+async def startup():
+    # Serverless instances are short-lived: don't spend the cold start on an
+    # HTTP round trip, the first request needing a quote fetches it
+    # (rate_service.get); HD indexes are likewise reserved on first use
+    if pool_profile() != "serverless":
+        try:
+            await rate_service.refresh()
+        except Exception as e:
+            logger.warning("Could not fetch BTC/USD rate: %s", e)
+    if settings.WEBHOOK_INGEST_MODE == "queue":
+        await webhook_queue.start()
+    start_scheduler()
+    await event_broker.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    shutdown_scheduler()
+    await event_broker.stop()
+    await webhook_queue.stop()
+    await blockchain_service.aclose()
+    if address_pool is not None:
+        # Unused reserved indexes would otherwise become gaps in the wallet
+        try:
+            await address_pool.release()
+        except Exception as e:
+            logger.warning("Could not release HD address indexes: %s", e)
+    await dispose_async_engine()
+
 @app.get("/")
 def root():
     return {"status": "ok"}
@@ -99,6 +143,11 @@ def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def get_metrics():
+    """In-process metrics of this worker."""
+    return metrics.snapshot()
+
 @app.post("/api/test")
 async def test_endpoint():
     """Test endpoint to verify backend is responding."""
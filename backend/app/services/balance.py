@@ -0,0 +1,191 @@
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, case, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import models
+from app.services.versioning import bump_data_versions
+
+# Per-wallet running totals (`Wallet.confirmed_balance_btc` / `pending_balance_btc`)
+# are maintained by the webhook path in the same DB transaction that inserts or
+# confirms a `Transaction`, so balance reads cost O(addresses), not O(transactions).
+# A transaction counts as confirmed once its status is "confirmed".
+
+def _is_confirmed():
+    return models.Transaction.status == "confirmed"
+
+async def get_address_balances(db: AsyncSession, user_id: int) -> List[Dict]:
+    """
+    Get total, confirmed and pending balances for every address of a user from the ledger.
+
+    Per-invoice addresses are left out (one per invoice, so the list would grow
+    without bound); see `get_invoice_address_totals`.
+    """
+    wallet = models.Wallet
+    result = await db.execute(
+        select(wallet.btc_address, wallet.confirmed_balance_btc, wallet.pending_balance_btc)
+        .where(wallet.user_id == user_id, wallet.for_invoice.is_(False))
+        .order_by(wallet.id)
+    )
+    rows = result.all()
+
+    return [
+        {
+            "address": row.btc_address,
+            "total": Decimal(row.confirmed_balance_btc) + Decimal(row.pending_balance_btc),
+            "confirmed": Decimal(row.confirmed_balance_btc),
+            "pending": Decimal(row.pending_balance_btc),
+        }
+        for row in rows
+    ]
+
+async def get_invoice_address_totals(db: AsyncSession, user_id: int) -> Dict:
+    """Confirmed and pending balance summed over a user's per-invoice addresses, and their count."""
+    wallet = models.Wallet
+    row = (await db.execute(
+        select(
+            func.coalesce(func.sum(wallet.confirmed_balance_btc), 0).label("confirmed"),
+            func.coalesce(func.sum(wallet.pending_balance_btc), 0).label("pending"),
+            func.count().label("count"),
+        )
+        .where(wallet.user_id == user_id, wallet.for_invoice.is_(True))
+    )).one()
+
+    return {
+        "confirmed": Decimal(row.confirmed),
+        "pending": Decimal(row.pending),
+        "count": row.count,
+    }
+
+async def compute_address_balances(db: AsyncSession, user_id: Optional[int] = None) -> List[Dict]:
+    """
+    Compute balances per address straight from the transactions table.
+
+    Runs a single grouped aggregate query. Used to reconcile the ledger;
+    pass `user_id` to restrict it to one user's addresses.
+    """
+    tx = models.Transaction
+    is_confirmed = _is_confirmed()
+
+    query = (
+        select(
+            models.Wallet.id,
+            models.Wallet.btc_address,
+            func.coalesce(func.sum(case((is_confirmed, tx.amount_btc), else_=0)), 0).label("confirmed"),
+            func.coalesce(func.sum(case((is_confirmed, 0), else_=tx.amount_btc)), 0).label("pending"),
+        )
+        .outerjoin(tx, tx.wallet_id == models.Wallet.id)
+        .group_by(models.Wallet.id, models.Wallet.btc_address)
+        .order_by(models.Wallet.id)
+    )
+    if user_id is not None:
+        query = query.where(models.Wallet.user_id == user_id)
+    result = await db.execute(query)
+
+    return [
+        {
+            "wallet_id": row.id,
+            "address": row.btc_address,
+            "total": Decimal(row.confirmed) + Decimal(row.pending),
+            "confirmed": Decimal(row.confirmed),
+            "pending": Decimal(row.pending),
+        }
+        for row in result.all()
+    ]
+
+def _format_btc(amount: Decimal) -> str:
+    """Render a BTC amount in plain notation (never `0E-8`)."""
+    return format(amount, "f")
+
+def summarize_balances(address_balances: List[Dict], invoice_totals: Optional[Dict] = None) -> Dict:
+    """
+    Build the `WalletBalance` payload from per-address balances.
+
+    `invoice_totals` (from `get_invoice_address_totals`) is added to the
+    totals and reported on its own instead of address by address.
+    """
+    invoice_totals = invoice_totals or {"confirmed": Decimal("0"), "pending": Decimal("0"), "count": 0}
+    invoice_balance = invoice_totals["confirmed"] + invoice_totals["pending"]
+    confirmed_balance = sum((a["confirmed"] for a in address_balances), invoice_totals["confirmed"])
+    pending_balance = sum((a["pending"] for a in address_balances), invoice_totals["pending"])
+    total_balance = confirmed_balance + pending_balance
+
+    return {
+        "total_balance_btc": _format_btc(total_balance),
+        "confirmed_balance_btc": _format_btc(confirmed_balance),
+        "pending_balance_btc": _format_btc(pending_balance),
+        "total_received_btc": _format_btc(total_balance),
+        "addresses": [
+            {"address": a["address"], "balance": _format_btc(a["total"])}
+            for a in address_balances
+        ],
+        "invoice_balance_btc": _format_btc(invoice_balance),
+        "invoice_address_count": invoice_totals["count"],
+    }
+
+async def credit_wallet(db: AsyncSession, wallet_id: int, amount_btc: Decimal, confirmed: bool) -> None:
+    """Add a newly recorded transaction to the wallet's running totals."""
+    column = models.Wallet.confirmed_balance_btc if confirmed else models.Wallet.pending_balance_btc
+    await db.execute(
+        update(models.Wallet)
+        .where(models.Wallet.id == wallet_id)
+        .values({column: column + amount_btc})
+    )
+
+async def confirm_wallet_amount(db: AsyncSession, wallet_id: int, amount_btc: Decimal) -> None:
+    """Move a transaction's amount from pending to confirmed in the wallet's running totals."""
+    await db.execute(
+        update(models.Wallet)
+        .where(models.Wallet.id == wallet_id)
+        .values(
+            pending_balance_btc=models.Wallet.pending_balance_btc - amount_btc,
+            confirmed_balance_btc=models.Wallet.confirmed_balance_btc + amount_btc,
+        )
+    )
+
+async def apply_wallet_deltas(db: AsyncSession, deltas: Dict[int, Tuple[Decimal, Decimal]]) -> None:
+    """Add `(confirmed_delta, pending_delta)` to many wallets in one executemany UPDATE."""
+    if not deltas:
+        return
+    wallets = models.Wallet.__table__
+    await db.execute(
+        update(wallets)
+        .where(wallets.c.id == bindparam("b_wallet_id"))
+        .values(
+            confirmed_balance_btc=wallets.c.confirmed_balance_btc + bindparam("b_confirmed"),
+            pending_balance_btc=wallets.c.pending_balance_btc + bindparam("b_pending"),
+        ),
+        [
+            {"b_wallet_id": wallet_id, "b_confirmed": confirmed, "b_pending": pending}
+            for wallet_id, (confirmed, pending) in sorted(deltas.items())  # Fixed lock order
+        ],
+    )
+
+async def rebuild_balances(db: AsyncSession) -> int:
+    """
+    Rebuild every wallet's running totals from the transactions table.
+
+    A single set-based UPDATE with correlated sums, limited to wallets whose
+    totals are off. Their users' data versions are bumped, so cached
+    responses and ETags show the corrected balances. Does not commit.
+    Returns the number of wallets corrected.
+    """
+    tx = models.Transaction
+
+    def _sum(confirmed: bool):
+        condition = _is_confirmed() if confirmed else ~_is_confirmed()
+        return (
+            select(func.coalesce(func.sum(tx.amount_btc), 0))
+            .where(tx.wallet_id == models.Wallet.id, condition)
+            .scalar_subquery()
+        )
+
+    confirmed, pending = _sum(confirmed=True), _sum(confirmed=False)
+    user_ids = (await db.scalars(
+        update(models.Wallet)
+        .where(or_(models.Wallet.confirmed_balance_btc != confirmed, models.Wallet.pending_balance_btc != pending))
+        .values(confirmed_balance_btc=confirmed, pending_balance_btc=pending)
+        .returning(models.Wallet.user_id)
+        .execution_options(synchronize_session=False)
+    )).all()
+    await bump_data_versions(db, user_ids)
+    return len(user_ids)
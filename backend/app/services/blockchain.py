@@ -1,102 +1,205 @@
-import requests
-from typing import Optional, Dict, List
+import asyncio
+import random
+import time
+from typing import TYPE_CHECKING, Optional, Dict, List
 from decimal import Decimal
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.tx_cache import tx_cache
+
+if TYPE_CHECKING:
+    import httpx
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """
+    Client-side token-bucket rate limiter.
+
+    Allows bursts of up to `capacity` requests and a sustained `rate`
+    requests per second; callers wait in `acquire()` until a token is free.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """Take one token, sleeping as needed. Returns the time waited in seconds."""
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
 
 class BlockCypherService:
-    """Service for interacting with BlockCypher API."""
-    
-    BASE_URL = "https://api.blockcypher.com/v1/btc"
-    
+    """
+    Async client for the BlockCypher API.
+
+    Keeps a persistent keep-alive connection pool, applies configurable
+    timeouts, rate-limits itself with a token bucket sized to the plan and
+    retries 429/5xx responses and transport errors with jittered
+    exponential backoff.
+    """
+
     def __init__(self):
         self.api_key = settings.BLOCKCYPHER_API_KEY
         self.network = settings.BLOCKCHAIN_NETWORK
-        self.base_url = f"{self.BASE_URL}/{self.network}"
-    
+        self.base_url = f"{settings.BLOCKCYPHER_BASE_URL.rstrip('/')}/{self.network}"
+        self.max_retries = settings.BLOCKCYPHER_MAX_RETRIES
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._rate_limiter = TokenBucket(
+            rate=settings.BLOCKCYPHER_RATE_LIMIT_PER_SECOND,
+            capacity=settings.BLOCKCYPHER_RATE_LIMIT_BURST,
+        )
+        self._requests = metrics.counter("blockcypher_requests_total", "HTTP requests sent to BlockCypher")
+        self._retries = metrics.counter("blockcypher_retries_total", "Retried BlockCypher requests")
+        self._latency = metrics.histogram("blockcypher_request_seconds", "BlockCypher request latency")
+        self._throttled = metrics.histogram("blockcypher_rate_limit_wait_seconds", "Time spent waiting on the client-side rate limiter")
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        """Lazily create the shared, pooled HTTP client."""
+        if self._client is None:
+            # Imported here to keep httpx (and httpcore's async backends) off the cold start path
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self._get_headers(),
+                timeout=httpx.Timeout(
+                    settings.BLOCKCYPHER_TIMEOUT_SECONDS,
+                    connect=settings.BLOCKCYPHER_CONNECT_TIMEOUT_SECONDS,
+                ),
+                limits=httpx.Limits(
+                    max_connections=settings.BLOCKCYPHER_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.BLOCKCYPHER_MAX_CONNECTIONS,
+                ),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close pooled connections (on application shutdown)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
     def _get_headers(self) -> dict:
-        """Get request headers with API key."""
+        """Get request headers."""
         return {
             "Content-Type": "application/json"
         }
-    
-    def _get_url(self, endpoint: str) -> str:
-        """Build full API URL."""
-        url = f"{self.base_url}/{endpoint}"
-        if self.api_key:
-            url += f"?token={self.api_key}"
-        return url
-    
-    def generate_address(self) -> Dict[str, str]:
+
+    def _get_params(self) -> dict:
+        """Query parameters sent with every request (API token)."""
+        return {"token": self.api_key} if self.api_key else {}
+
+    def _backoff(self, attempt: int, response: Optional["httpx.Response"] = None) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After on 429."""
+        if response is not None and response.status_code == 429:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), settings.BLOCKCYPHER_BACKOFF_MAX_SECONDS)
+        ceiling = min(
+            settings.BLOCKCYPHER_BACKOFF_MAX_SECONDS,
+            settings.BLOCKCYPHER_BACKOFF_BASE_SECONDS * (2 ** attempt),
+        )
+        return random.uniform(0, ceiling)
+
+    async def _request(self, method: str, endpoint: str, json: Optional[dict] = None) -> Dict:
+        """Send a request with rate limiting and retries; returns the decoded JSON body."""
+        import httpx
+
+        client = self._get_client()
+        attempt = 0
+        while True:
+            self._throttled.observe(await self._rate_limiter.acquire())
+            self._requests.inc()
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, endpoint, params=self._get_params(), json=json)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+                response = None
+            finally:
+                self._latency.observe(time.perf_counter() - started)
+
+            if response is not None and response.status_code not in RETRYABLE_STATUS_CODES:
+                response.raise_for_status()
+                return response.json()
+            if attempt >= self.max_retries:
+                response.raise_for_status()
+
+            await asyncio.sleep(self._backoff(attempt, response))
+            attempt += 1
+            self._retries.inc()
+
+    async def generate_address(self) -> Dict[str, str]:
         """
         Generate a new Bitcoin address.
         Note: In production, use HD wallet or external key management.
         For MVP, we use BlockCypher's address generation.
         """
-        response = requests.post(
-            f"{self.base_url}/addrs",
-            headers=self._get_headers(),
-            json={}
-        )
-        response.raise_for_status()
-        data = response.json()
-        
+        data = await self._request("POST", "/addrs", json={})
+
         return {
             "address": data["address"],
             "private": data.get("private", ""),  # WARNING: Only for testnet MVP
             "public": data.get("public", ""),
             "wif": data.get("wif", "")
         }
-    
-    def get_address_info(self, address: str) -> Dict:
+
+    async def get_chain_tip(self) -> int:
+        """Current block height of the chain."""
+        data = await self._request("GET", "")
+        return data["height"]
+
+    async def get_address_info(self, address: str) -> Dict:
         """Get address information including balance."""
-        response = requests.get(
-            self._get_url(f"addrs/{address}/balance"),
-            headers=self._get_headers()
-        )
-        response.raise_for_status()
-        return response.json()
-    
-    def get_address_transactions(self, address: str) -> List[Dict]:
-        """Get all transactions for an address."""
-        response = requests.get(
-            self._get_url(f"addrs/{address}/full"),
-            headers=self._get_headers()
-        )
-        response.raise_for_status()
-        data = response.json()
-        return data.get("txs", [])
-    
-    def get_transaction(self, tx_hash: str) -> Dict:
-        """Get transaction details by hash."""
-        response = requests.get(
-            self._get_url(f"txs/{tx_hash}"),
-            headers=self._get_headers()
-        )
-        response.raise_for_status()
-        return response.json()
-    
-    def create_webhook(self, address: str, webhook_url: str) -> Dict:
+        return await self._request("GET", f"/addrs/{address}/balance")
+
+    async def get_address_transactions(self, address: str) -> List[Dict]:
+        """Get all transactions for an address (cached, see app/services/tx_cache.py)."""
+        txs = tx_cache.get_address(address)
+        if txs is None:
+            data = await self._request("GET", f"/addrs/{address}/full")
+            txs = data.get("txs", [])
+            await tx_cache.put_address(address, txs)
+        return txs
+
+    async def get_transaction(self, tx_hash: str) -> Dict:
+        """Get transaction details by hash (cached, see app/services/tx_cache.py)."""
+        tx = await tx_cache.get(tx_hash)
+        if tx is None:
+            tx = await self._request("GET", f"/txs/{tx_hash}")
+            await tx_cache.put(tx)
+        return tx
+
+    async def create_webhook(self, address: str, webhook_url: str) -> Dict:
         """Create a webhook for address transactions."""
         payload = {
             "event": "tx-confirmation",
             "address": address,
             "url": webhook_url
         }
-        response = requests.post(
-            f"{self.base_url}/hooks",
-            headers=self._get_headers(),
-            json=payload
-        )
-        response.raise_for_status()
-        return response.json()
-    
+        return await self._request("POST", "/hooks", json=payload)
+
     def satoshi_to_btc(self, satoshi: int) -> Decimal:
         """Convert satoshi to BTC."""
         return Decimal(satoshi) / Decimal(100000000)
-    
+
     def btc_to_satoshi(self, btc: Decimal) -> int:
         """Convert BTC to satoshi."""
         return int(btc * Decimal(100000000))
 
 blockchain_service = BlockCypherService()
-
@@ -0,0 +1,130 @@
+"""
+Block-driven confirmation tracking.
+
+Instead of asking BlockCypher about every pending transaction, the tracker
+polls the chain tip once per interval and, when a new block has arrived,
+recomputes `confirmations = tip - block_height + 1` for all pending
+transactions in one set-based UPDATE, promoting those that reach
+MIN_CONFIRMATIONS to "confirmed" and moving their amounts from pending to
+confirmed in the wallet ledger (same DB transaction).
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional
+from sqlalchemy import case, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db import models
+from app.db.database import get_async_session_local
+from app.services.balance import apply_wallet_deltas
+from app.services.blockchain import blockchain_service
+from app.services.events import event_broker, transaction_event
+from app.services.versioning import bump_data_versions
+
+logger = logging.getLogger(__name__)
+
+async def update_confirmations(db: AsyncSession, tip_height: int) -> List:
+    """
+    Recompute confirmations of pending, mined transactions for a chain tip.
+
+    Does not commit. Returns the updated rows (tx_hash, wallet_id,
+    amount_btc, confirmations, status, invoice_id).
+    """
+    tx = models.Transaction
+    confirmations = tip_height - tx.block_height + 1
+    promote = confirmations >= settings.MIN_CONFIRMATIONS
+    now = datetime.utcnow()
+
+    result = await db.execute(
+        update(tx)
+        .where(tx.status == "pending", tx.block_height > 0, tx.block_height <= tip_height)
+        .values(
+            confirmations=confirmations,
+            status=case((promote, "confirmed"), else_=tx.status),
+            confirmed_at=case((promote, now), else_=tx.confirmed_at),
+        )
+        .returning(tx.tx_hash, tx.wallet_id, tx.amount_btc, tx.confirmations, tx.status, tx.invoice_id)
+        .execution_options(synchronize_session=False)
+    )
+
+    # Rows were all pending before the UPDATE, so "confirmed" ones were promoted by it
+    rows = result.all()
+    deltas = defaultdict(lambda: (Decimal(0), Decimal(0)))
+    for row in rows:
+        if row.status == "confirmed":
+            confirmed, pending = deltas[row.wallet_id]
+            deltas[row.wallet_id] = (confirmed + row.amount_btc, pending - row.amount_btc)
+    await apply_wallet_deltas(db, deltas)
+    return rows
+
+async def backfill_block_heights(db: AsyncSession, limit: int) -> int:
+    """
+    Record the block height of pending transactions that were first seen unmined.
+
+    One (cached) lookup per transaction, only until it has a height. Does not
+    commit. Returns the number of transactions updated.
+    """
+    tx = models.Transaction
+    rows = (await db.execute(
+        select(tx.id, tx.tx_hash)
+        .where(tx.status == "pending", or_(tx.block_height.is_(None), tx.block_height <= 0))
+        .order_by(tx.id)
+        .limit(limit)
+    )).all()
+
+    updated = 0
+    for row in rows:
+        try:
+            details = await blockchain_service.get_transaction(row.tx_hash)
+        except Exception as e:
+            logger.warning("Could not look up %s: %s", row.tx_hash, e)
+            continue
+        block_height = details.get("block_height") or -1
+        if block_height > 0:
+            await db.execute(update(tx).where(tx.id == row.id).values(block_height=block_height))
+            updated += 1
+    return updated
+
+class ConfirmationTracker:
+    """Polls the chain tip and updates confirmations once per new block."""
+
+    def __init__(self):
+        self.tip_height: Optional[int] = None
+        self._tip = metrics.gauge("chain_tip_height", "Last chain tip height seen by the confirmation tracker")
+        self._promoted = metrics.counter("confirmations_promoted_total", "Transactions promoted to confirmed by the tracker")
+        self._duration = metrics.histogram("confirmation_update_seconds", "Time to apply a new chain tip")
+
+    async def poll(self) -> None:
+        tip_height = await blockchain_service.get_chain_tip()
+        if tip_height == self.tip_height:
+            return
+
+        started = time.perf_counter()
+        async with get_async_session_local()() as db:
+            await backfill_block_heights(db, settings.CONFIRMATION_BACKFILL_LIMIT)
+            updated = await update_confirmations(db, tip_height)
+            owners = dict((await db.execute(
+                select(models.Wallet.id, models.Wallet.user_id)
+                .where(models.Wallet.id.in_({row.wallet_id for row in updated}))
+            )).all()) if updated else {}
+            await bump_data_versions(db, owners.values())
+            await db.commit()
+
+        for row in updated:
+            await event_broker.publish(owners[row.wallet_id], transaction_event(
+                row.tx_hash, row.status, row.confirmations, row.invoice_id
+            ))
+        promoted = sum(1 for row in updated if row.status == "confirmed")
+
+        self.tip_height = tip_height
+        self._tip.set(tip_height)
+        self._promoted.inc(promoted)
+        self._duration.observe(time.perf_counter() - started)
+        if promoted:
+            logger.info("Block %s: %d transactions confirmed", tip_height, promoted)
+
+confirmation_tracker = ConfirmationTracker()
@@ -0,0 +1,167 @@
+"""
+Per-user event fan-out for the SSE endpoint (GET /api/events).
+
+Writers (webhook processing, confirmation tracker, invoice sweeper) call
+`event_broker.publish(user_id, event)` after committing. The broker hands
+the event to its backend, which delivers it to every subscribed stream of
+that user:
+
+- "memory" (default): delivered in this process only. Fine for a single
+  worker.
+- "postgres": sent with pg_notify on EVENTS_CHANNEL; every process LISTENs
+  on a dedicated connection and fans out to its own subscribers, so
+  clients get events no matter which worker committed them.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+from sqlalchemy import func, select
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.database import get_async_engine
+
+logger = logging.getLogger(__name__)
+
+class InProcessBackend:
+    """Delivers events to subscribers of this process."""
+
+    def __init__(self, broker: "EventBroker"):
+        self.broker = broker
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def publish(self, user_id: int, event: Dict) -> None:
+        self.broker.deliver(user_id, event)
+
+class PostgresNotifyBackend:
+    """Publishes with pg_notify and LISTENs for events from every process."""
+
+    RECONNECT_SECONDS = 5
+
+    def __init__(self, broker: "EventBroker", channel: str):
+        self.broker = broker
+        self.channel = channel
+        self._connection = None
+        self._driver = None
+        self._supervisor: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._supervisor = asyncio.create_task(self._listen_forever())
+
+    async def stop(self) -> None:
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            await asyncio.gather(self._supervisor, return_exceptions=True)
+        await self._close()
+
+    async def publish(self, user_id: int, event: Dict) -> None:
+        payload = json.dumps({"user_id": user_id, "event": event}, default=str)
+        async with get_async_engine().connect() as conn:
+            await conn.execute(select(func.pg_notify(self.channel, payload)))
+            await conn.commit()
+
+    async def _listen_forever(self) -> None:
+        # Keep one LISTEN connection open; reconnect if it drops
+        while True:
+            try:
+                if self._connection is None:
+                    self._connection = await get_async_engine().connect()
+                    raw = await self._connection.get_raw_connection()
+                    await raw.driver_connection.add_listener(self.channel, self._on_notify)
+                    self._driver = raw.driver_connection
+                elif self._driver.is_closed():
+                    logger.warning("Event listener connection closed, reconnecting")
+                    await self._close()
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Event listener failed: %s", e)
+                await self._close()
+            await asyncio.sleep(self.RECONNECT_SECONDS)
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            message = json.loads(payload)
+            self.broker.deliver(message["user_id"], message["event"])
+        except (ValueError, KeyError) as e:
+            logger.warning("Ignoring malformed event notification: %s", e)
+
+    async def _close(self) -> None:
+        if self._connection is not None:
+            try:
+                await self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+            self._driver = None
+
+class EventBroker:
+    """Bounded per-subscriber queues, fanned out by user id."""
+
+    def __init__(self, backend: str, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        if backend == "postgres":
+            self.backend = PostgresNotifyBackend(self, settings.EVENTS_CHANNEL)
+        else:
+            self.backend = InProcessBackend(self)
+        self._streams = metrics.gauge("event_streams_open", "Open SSE event streams")
+        self._published = metrics.counter("events_published_total", "Events published")
+        self._dropped = metrics.counter("events_dropped_total", "Events dropped for slow subscribers")
+
+    async def start(self) -> None:
+        await self.backend.start()
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[user_id].add(queue)
+        self._streams.inc()
+        try:
+            yield queue
+        finally:
+            self._streams.dec()
+            self._subscribers[user_id].discard(queue)
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+    def deliver(self, user_id: int, event: Dict) -> None:
+        """Put an event on every local queue of the user, dropping the oldest if a queue is full."""
+        for queue in self._subscribers.get(user_id, ()):
+            if queue.full():
+                queue.get_nowait()
+                self._dropped.inc()
+            queue.put_nowait(event)
+
+    async def publish(self, user_id: int, event: Dict) -> None:
+        """Publish after the change is committed. Never raises: events are best effort."""
+        try:
+            await self.backend.publish(user_id, event)
+            self._published.inc()
+        except Exception as e:
+            logger.warning("Could not publish %s event: %s", event.get("type"), e)
+
+def invoice_event(invoice_id: int, status: str) -> Dict:
+    return {"type": "invoice", "invoice_id": invoice_id, "status": status}
+
+def transaction_event(tx_hash: str, status: str, confirmations: int, invoice_id: Optional[int] = None) -> Dict:
+    return {
+        "type": "transaction",
+        "tx_hash": tx_hash,
+        "status": status,
+        "confirmations": confirmations,
+        "invoice_id": invoice_id,
+    }
+
+event_broker = EventBroker(backend=settings.EVENTS_BACKEND, queue_size=settings.EVENTS_QUEUE_SIZE)
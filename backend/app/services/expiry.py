@@ -0,0 +1,78 @@
+"""
+Invoice expiry.
+
+Pending invoices past their expires_at are moved to "expired" by a
+scheduled sweep, in bounded batches of short transactions, so a backlog of
+overdue invoices never holds one long transaction open.
+"""
+import logging
+import time
+from datetime import datetime
+from typing import List
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db import models
+from app.db.database import get_async_session_local
+from app.services.events import event_broker, invoice_event
+from app.services.versioning import bump_data_versions
+
+logger = logging.getLogger(__name__)
+
+sweep_expired = metrics.counter("invoice_sweep_expired_total", "Invoices moved to expired by the sweeper")
+sweep_last_expired = metrics.gauge("invoice_sweep_last_expired", "Invoices expired by the last sweep")
+sweep_duration = metrics.histogram("invoice_sweep_seconds", "Duration of one expiry sweep")
+
+async def expire_overdue_batch(db: AsyncSession, batch_size: int) -> List:
+    """
+    Expire up to `batch_size` overdue pending invoices and commit.
+
+    Rows are picked through ix_invoices_status_expires_at with
+    FOR UPDATE SKIP LOCKED (Postgres), so concurrent sweepers split the work
+    instead of blocking each other. Publishes an "invoice" event per expired
+    invoice and returns the expired `(id, user_id)` rows.
+    """
+    invoice = models.Invoice
+    overdue = (
+        select(invoice.id)
+        .where(invoice.status == "pending", invoice.expires_at < datetime.utcnow())
+        .order_by(invoice.expires_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    ids = (await db.scalars(overdue)).all()
+    if not ids:
+        return []
+    result = await db.execute(
+        update(invoice)
+        .where(invoice.id.in_(ids), invoice.status == "pending")
+        .values(status="expired")
+        .returning(invoice.id, invoice.user_id)
+        .execution_options(synchronize_session=False)
+    )
+    expired = result.all()
+    await bump_data_versions(db, (user_id for _, user_id in expired))
+    await db.commit()
+    for invoice_id, user_id in expired:
+        await event_broker.publish(user_id, invoice_event(invoice_id, "expired"))
+    return expired
+
+async def sweep_expired_invoices() -> int:
+    """Scheduled job: expire overdue invoices in bounded batches. Returns the count."""
+    started = time.perf_counter()
+    expired = 0
+    session_local = get_async_session_local()
+    for _ in range(settings.INVOICE_SWEEP_MAX_BATCHES):
+        async with session_local() as db:
+            batch = await expire_overdue_batch(db, settings.INVOICE_SWEEP_BATCH_SIZE)
+        expired += len(batch)
+        if len(batch) < settings.INVOICE_SWEEP_BATCH_SIZE:
+            break
+
+    sweep_expired.inc(expired)
+    sweep_last_expired.set(expired)
+    sweep_duration.observe(time.perf_counter() - started)
+    if expired:
+        logger.info("Expired %d overdue invoices", expired)
+    return expired
@@ -0,0 +1,446 @@
+"""
+Local HD-wallet (BIP32 / BIP84) receive-address derivation.
+
+Derives native SegWit (P2WPKH, bech32) receive addresses from a configured
+account-level extended public key (xpub/zpub/tpub/vpub at m/84'/coin'/account'),
+so new addresses never need a network call. Only public derivation is done
+here; private keys never touch the server. The network (bc1/tb1 addresses)
+follows the key's version bytes and must match BLOCKCHAIN_NETWORK.
+
+Elliptic-curve math uses libsecp256k1 through `coincurve` when installed and
+falls back to a pure-Python implementation (much slower, fine for dev).
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
+from app.core.metrics import metrics
+
+try:
+    import coincurve
+except ImportError:  # pragma: no cover - optional dependency
+    coincurve = None
+
+logger = logging.getLogger(__name__)
+
+# --- secp256k1 (pure-Python fallback) -------------------------------------
+
+_P = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F
+_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+_G = (
+    0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,
+    0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8,
+)
+
+def _point_add(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a[0] == b[0]:
+        if (a[1] + b[1]) % _P == 0:
+            return None
+        slope = 3 * a[0] * a[0] * pow(2 * a[1], -1, _P)
+    else:
+        slope = (b[1] - a[1]) * pow(b[0] - a[0], -1, _P)
+    x = (slope * slope - a[0] - b[0]) % _P
+    return x, (slope * (a[0] - x) - a[1]) % _P
+
+def _point_mul(k: int, point=_G):
+    result = None
+    while k:
+        if k & 1:
+            result = _point_add(result, point)
+        point = _point_add(point, point)
+        k >>= 1
+    return result
+
+def _decompress(pubkey: bytes):
+    x = int.from_bytes(pubkey[1:], "big")
+    y = pow((pow(x, 3, _P) + 7) % _P, (_P + 1) // 4, _P)
+    if y % 2 != pubkey[0] % 2:
+        y = _P - y
+    return x, y
+
+def _compress(point) -> bytes:
+    return bytes([2 + (point[1] & 1)]) + point[0].to_bytes(32, "big")
+
+def _tweak_add(pubkey: bytes, tweak: bytes) -> bytes:
+    """Return the compressed public key `pubkey + tweak*G`."""
+    if coincurve is not None:
+        return coincurve.PublicKey(pubkey).add(tweak).format(compressed=True)
+    scalar = int.from_bytes(tweak, "big")
+    if scalar >= _N:
+        raise ValueError("Invalid child key tweak")
+    point = _point_add(_decompress(pubkey), _point_mul(scalar))
+    if point is None:
+        raise ValueError("Derived point at infinity")
+    return _compress(point)
+
+# --- hashing & encodings ----------------------------------------------------
+
+def _ripemd160(data: bytes) -> bytes:
+    try:
+        return hashlib.new("ripemd160", data).digest()
+    except ValueError:  # OpenSSL 3 builds without the legacy provider
+        return _ripemd160_py(data)
+
+def _ripemd160_py(data: bytes) -> bytes:
+    """Pure-Python RIPEMD-160."""
+    r1 = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 7, 4, 13, 1, 10, 6, 15, 3, 12, 0, 9, 5, 2, 14, 11, 8,
+          3, 10, 14, 4, 9, 15, 8, 1, 2, 7, 0, 6, 13, 11, 5, 12, 1, 9, 11, 10, 0, 8, 12, 4, 13, 3, 7, 15, 14, 5, 6, 2,
+          4, 0, 5, 9, 7, 12, 2, 10, 14, 1, 3, 8, 11, 6, 15, 13]
+    r2 = [5, 14, 7, 0, 9, 2, 11, 4, 13, 6, 15, 8, 1, 10, 3, 12, 6, 11, 3, 7, 0, 13, 5, 10, 14, 15, 8, 12, 4, 9, 1, 2,
+          15, 5, 1, 3, 7, 14, 6, 9, 11, 8, 12, 2, 10, 0, 4, 13, 8, 6, 4, 1, 3, 11, 15, 0, 5, 12, 2, 13, 9, 7, 10, 14,
+          12, 15, 10, 4, 1, 5, 8, 7, 6, 2, 13, 14, 0, 3, 9, 11]
+    s1 = [11, 14, 15, 12, 5, 8, 7, 9, 11, 13, 14, 15, 6, 7, 9, 8, 7, 6, 8, 13, 11, 9, 7, 15, 7, 12, 15, 9, 11, 7, 13, 12,
+          11, 13, 6, 7, 14, 9, 13, 15, 14, 8, 13, 6, 5, 12, 7, 5, 11, 12, 14, 15, 14, 15, 9, 8, 9, 14, 5, 6, 8, 6, 5, 12,
+          9, 15, 5, 11, 6, 8, 13, 12, 5, 12, 13, 14, 11, 8, 5, 6]
+    s2 = [8, 9, 9, 11, 13, 15, 15, 5, 7, 7, 8, 11, 14, 14, 12, 6, 9, 13, 15, 7, 12, 8, 9, 11, 7, 7, 12, 7, 6, 15, 13, 11,
+          9, 7, 15, 11, 8, 6, 6, 14, 12, 13, 5, 14, 13, 13, 7, 5, 15, 5, 8, 11, 14, 14, 6, 14, 6, 9, 12, 9, 12, 5, 15, 8,
+          8, 5, 12, 9, 12, 5, 14, 6, 8, 13, 6, 5, 15, 13, 11, 11]
+    k1 = [0x00000000, 0x5A827999, 0x6ED9EBA1, 0x8F1BBCDC, 0xA953FD4E]
+    k2 = [0x50A28BE6, 0x5C4DD124, 0x6D703EF3, 0x7A6D76E9, 0x00000000]
+    mask = 0xFFFFFFFF
+
+    def f(j, x, y, z):
+        if j < 16:
+            return x ^ y ^ z
+        if j < 32:
+            return (x & y) | (~x & z)
+        if j < 48:
+            return (x | ~y) ^ z
+        if j < 64:
+            return (x & z) | (y & ~z)
+        return x ^ (y | ~z)
+
+    def rol(x, n):
+        return ((x << n) | (x >> (32 - n))) & mask
+
+    message = data + b"\x80" + b"\x00" * ((55 - len(data)) % 64) + (len(data) * 8).to_bytes(8, "little")
+    h = [0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476, 0xC3D2E1F0]
+    for offset in range(0, len(message), 64):
+        x = [int.from_bytes(message[offset + 4 * i:offset + 4 * i + 4], "little") for i in range(16)]
+        al, bl, cl, dl, el = h
+        ar, br, cr, dr, er = h
+        for j in range(80):
+            t = rol((al + f(j, bl, cl, dl) + x[r1[j]] + k1[j // 16]) & mask, s1[j]) + el
+            al, el, dl, cl, bl = el, dl, rol(cl, 10), bl, t & mask
+            t = rol((ar + f(79 - j, br, cr, dr) + x[r2[j]] + k2[j // 16]) & mask, s2[j]) + er
+            ar, er, dr, cr, br = er, dr, rol(cr, 10), br, t & mask
+        t = (h[1] + cl + dr) & mask
+        h[1] = (h[2] + dl + er) & mask
+        h[2] = (h[3] + el + ar) & mask
+        h[3] = (h[4] + al + br) & mask
+        h[4] = (h[0] + bl + cr) & mask
+        h[0] = t
+    return b"".join(v.to_bytes(4, "little") for v in h)
+
+def hash160(data: bytes) -> bytes:
+    return _ripemd160(hashlib.sha256(data).digest())
+
+_B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+def base58check_decode(value: str) -> bytes:
+    number = 0
+    for char in value:
+        number = number * 58 + _B58_ALPHABET.index(char)
+    raw = number.to_bytes((number.bit_length() + 7) // 8, "big")
+    raw = b"\x00" * (len(value) - len(value.lstrip("1"))) + raw
+    payload, checksum = raw[:-4], raw[-4:]
+    if hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] != checksum:
+        raise ValueError("Invalid base58 checksum")
+    return payload
+
+_BECH32_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+_BECH32_GENERATOR = [0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3]
+
+def _bech32_mask(top: int) -> int:
+    mask = 0
+    for i, generator in enumerate(_BECH32_GENERATOR):
+        if (top >> i) & 1:
+            mask ^= generator
+    return mask
+
+# XOR mask for every possible 5-bit "top" value, so each step is one lookup
+_BECH32_MASKS = [_bech32_mask(top) for top in range(32)]
+
+def _bech32_polymod(values, chk: int = 1) -> int:
+    masks = _BECH32_MASKS
+    for value in values:
+        chk = ((chk & 0x1FFFFFF) << 5 ^ value) ^ masks[chk >> 25]
+    return chk
+
+def _hrp_expand(hrp: str) -> List[int]:
+    return [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp]
+
+def segwit_v0_address(hrp: str, program: bytes) -> str:
+    """Bech32 (BIP173) encoding of a version-0 witness program."""
+    return _segwit_v0_encoder(hrp)(program)
+
+def _segwit_v0_encoder(hrp: str):
+    """Encoder for one HRP, with the HRP and version's checksum state precomputed."""
+    prefix_state = _bech32_polymod([0], _bech32_polymod(_hrp_expand(hrp)))
+    prefix = hrp + "1" + _BECH32_CHARSET[0]
+    charset = _BECH32_CHARSET
+
+    def encode(program: bytes) -> str:
+        # 20-byte program -> 32 five-bit groups
+        number = int.from_bytes(program, "big")
+        bits = len(program) * 8
+        groups = -(-bits // 5)
+        number <<= groups * 5 - bits
+        data = [(number >> (5 * (groups - 1 - i))) & 31 for i in range(groups)]
+        polymod = _bech32_polymod(data + [0] * 6, prefix_state) ^ 1
+        return prefix + "".join([charset[d] for d in data]) + "".join(
+            [charset[(polymod >> 5 * (5 - i)) & 31] for i in range(6)]
+        )
+
+    return encode
+
+# --- BIP32 public derivation ----------------------------------------------
+
+def _ckd_pub(pubkey: bytes, chain_code: bytes, index: int) -> Tuple[bytes, bytes]:
+    """Non-hardened child key derivation (CKDpub)."""
+    digest = hmac.new(chain_code, pubkey + index.to_bytes(4, "big"), hashlib.sha512).digest()
+    return _tweak_add(pubkey, digest[:32]), digest[32:]
+
+# Version bytes of extended public keys (BIP32, SLIP-132) -> network
+_XPUB_NETWORKS = {
+    bytes.fromhex("0488b21e"): "main",  # xpub
+    bytes.fromhex("049d7cb2"): "main",  # ypub
+    bytes.fromhex("04b24746"): "main",  # zpub
+    bytes.fromhex("043587cf"): "test",  # tpub
+    bytes.fromhex("044a5262"): "test",  # upub
+    bytes.fromhex("045f1cf6"): "test",  # vpub
+}
+
+def blockcypher_network(network: str) -> str:
+    """"main" or "test" for a BlockCypher network name (main, test3, ...)."""
+    return "main" if network == "main" else "test"
+
+class HDWallet:
+    """Derives receive addresses from an account-level extended public key."""
+
+    def __init__(self, extended_public_key: str, chain: int = 0):
+        payload = base58check_decode(extended_public_key)
+        if len(payload) != 78 or payload[45] not in (2, 3):
+            raise ValueError("HD_XPUB is not a valid extended public key")
+        self.network = _XPUB_NETWORKS.get(payload[:4])
+        if self.network is None:
+            raise ValueError(f"HD_XPUB has unknown version bytes {payload[:4].hex()}")
+        account_chain_code, account_key = payload[13:45], payload[45:78]
+        self.hrp = "bc" if self.network == "main" else "tb"
+        self._encode = _segwit_v0_encoder(self.hrp)
+        self.fingerprint = hash160(account_key)[:4].hex()
+        # Derive the receive (0) or change (1) chain once; addresses are its children
+        self._key, self._chain_code = _ckd_pub(account_key, account_chain_code, chain)
+        self._parent = coincurve.PublicKey(self._key) if coincurve is not None else None
+
+    def derive_address(self, index: int) -> str:
+        """Address at `chain/index` below the account key."""
+        return self.derive_batch(index, 1)[0]
+
+    def derive_batch(self, start: int, count: int) -> List[str]:
+        """Addresses for indexes [start, start + count)."""
+        addresses = []
+        key, chain_code, parent, encode = self._key, self._chain_code, self._parent, self._encode
+        for index in range(start, start + count):
+            tweak = hmac.new(chain_code, key + index.to_bytes(4, "big"), hashlib.sha512).digest()[:32]
+            if parent is not None:
+                child = parent.add(tweak).format(compressed=True)
+            else:
+                child = _tweak_add(key, tweak)
+            addresses.append(encode(hash160(child)))
+        return addresses
+
+class AddressPool:
+    """
+    Pool of pre-derived receive addresses, refilled on demand.
+
+    Index ranges are reserved atomically in the `address_index_counters`
+    table, so several workers can derive from the same xpub without handing
+    out the same address. A range is only reserved once addresses are
+    needed (never at startup), and `release()` hands the unused tail of the
+    last range back on shutdown when no other worker reserved after it.
+    Indexes a worker held when it stopped otherwise stay unused, so the
+    merchant's wallet should scan with a gap limit of at least
+    (HD_ADDRESS_POOL_SIZE + HD_ADDRESS_POOL_LOW_WATERMARK) x workers.
+
+    With `prefetch` off (serverless, where a frozen instance never shuts
+    down cleanly) nothing is refilled in the background; with a size of 1
+    only the indexes actually used are reserved.
+    """
+
+    def __init__(self, wallet: HDWallet, size: int, low_watermark: int, prefetch: bool = True):
+        self.wallet = wallet
+        self.size = size
+        self.low_watermark = low_watermark
+        self.prefetch = prefetch
+        self._addresses: Deque[Tuple[int, str]] = deque()
+        self._reserved_end: Optional[int] = None  # End of the last range this process reserved
+        self._refill_lock = asyncio.Lock()
+        self._refill_task: Optional[asyncio.Task] = None
+        self._available = metrics.gauge("hd_address_pool_available", "Pre-derived addresses ready to allocate")
+        self._derive_seconds = metrics.histogram("hd_address_pool_refill_seconds", "Time to reserve and derive one batch")
+
+    async def _reserve(self, count: int) -> int:
+        """Atomically reserve `count` indexes; returns the first one."""
+        from app.db.database import get_async_session_local
+        from app.db import models
+
+        counter = models.AddressIndexCounter
+        async with get_async_session_local()() as db:
+            for _ in range(2):
+                next_index = await db.scalar(
+                    update(counter)
+                    .where(counter.key == self.wallet.fingerprint)
+                    .values(next_index=counter.next_index + count)
+                    .returning(counter.next_index)
+                )
+                if next_index is not None:
+                    await db.commit()
+                    self._reserved_end = next_index
+                    return next_index - count
+
+                # First use of this xpub: start after any index already handed out
+                start = await db.scalar(select(func.coalesce(func.max(models.Wallet.address_index) + 1, 0)))
+                db.add(counter(key=self.wallet.fingerprint, next_index=start + count))
+                try:
+                    await db.commit()
+                    self._reserved_end = start + count
+                    return start
+                except IntegrityError:
+                    await db.rollback()  # Another worker created it first; reserve again
+        raise RuntimeError("Could not reserve HD address indexes")
+
+    async def refill(self) -> None:
+        """Reserve and derive one batch if the pool is below its low watermark."""
+        async with self._refill_lock:
+            if len(self._addresses) > self.low_watermark:
+                return
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            start = await self._reserve(self.size)
+            addresses = await asyncio.to_thread(self.wallet.derive_batch, start, self.size)
+            self._addresses.extend(zip(range(start, start + self.size), addresses))
+            self._available.set(len(self._addresses))
+            self._derive_seconds.observe(loop.time() - started)
+
+    async def release(self) -> None:
+        """Hand the unused tail of the last reserved range back (on shutdown)."""
+        from app.db.database import get_async_session_local
+        from app.db import models
+
+        async with self._refill_lock:
+            end = self._reserved_end
+            unused = 0
+            for index, _ in reversed(self._addresses):
+                if end is None or index != end - unused - 1:
+                    break
+                unused += 1
+            if not unused:
+                return
+            counter = models.AddressIndexCounter
+            async with get_async_session_local()() as db:
+                # Only if no other worker reserved after this range
+                released = await db.scalar(
+                    update(counter)
+                    .where(counter.key == self.wallet.fingerprint, counter.next_index == end)
+                    .values(next_index=end - unused)
+                    .returning(counter.next_index)
+                )
+                await db.commit()
+            if released is not None:
+                for _ in range(unused):
+                    self._addresses.pop()
+                self._reserved_end = end - unused
+                self._available.set(len(self._addresses))
+                logger.info("Released %d unused HD address indexes", unused)
+
+    def _schedule_refill(self) -> None:
+        if not self.prefetch:
+            return
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self.refill())
+
+    async def allocate(self) -> Tuple[int, str]:
+        """Take the next unused `(address_index, address)` from the pool."""
+        while not self._addresses:
+            await self.refill()
+        index, address = self._addresses.popleft()
+        self._available.set(len(self._addresses))
+        if len(self._addresses) <= self.low_watermark:
+            self._schedule_refill()
+        return index, address
+
+    async def allocate_many(self, count: int) -> List[Tuple[int, str]]:
+        """
+        Take `count` unused addresses at once.
+
+        Drains what the pool holds, then reserves and derives the shortfall
+        as one dedicated range instead of going through refills.
+        """
+        taken = [self._addresses.popleft() for _ in range(min(count, len(self._addresses)))]
+        shortfall = count - len(taken)
+        if shortfall:
+            start = await self._reserve(shortfall)
+            addresses = await asyncio.to_thread(self.wallet.derive_batch, start, shortfall)
+            taken.extend(zip(range(start, start + shortfall), addresses))
+        self._available.set(len(self._addresses))
+        if len(self._addresses) <= self.low_watermark:
+            self._schedule_refill()
+        return taken
+
+def _build_address_pool() -> Optional[AddressPool]:
+    from app.db.pool import pool_profile
+
+    if not settings.HD_XPUB:
+        return None
+    wallet = HDWallet(settings.HD_XPUB)
+    if wallet.network != blockcypher_network(settings.BLOCKCHAIN_NETWORK):
+        raise ValueError(
+            f"HD_XPUB is a {wallet.network}net key but BLOCKCHAIN_NETWORK is {settings.BLOCKCHAIN_NETWORK!r}"
+        )
+    if pool_profile() == "serverless":
+        # Instances are frozen and discarded without shutdown: reserve only what is used
+        return AddressPool(wallet, size=1, low_watermark=0, prefetch=False)
+    return AddressPool(
+        wallet,
+        size=settings.HD_ADDRESS_POOL_SIZE,
+        low_watermark=settings.HD_ADDRESS_POOL_LOW_WATERMARK,
+    )
+
+# None when no HD_XPUB is configured (addresses then come from BlockCypher)
+address_pool = _build_address_pool()
+
+async def allocate_address() -> Tuple[int, str]:
+    """
+    Get a fresh receive address as `(address_index, address)`.
+
+    Derived locally from HD_XPUB when configured; otherwise falls back to
+    BlockCypher address generation (index 0).
+    """
+    if address_pool is not None:
+        return await address_pool.allocate()
+
+    from app.services.blockchain import blockchain_service
+    address_data = await blockchain_service.generate_address()
+    return 0, address_data["address"]
+
+async def allocate_addresses(count: int) -> List[Tuple[int, str]]:
+    """
+    Get `count` fresh receive addresses as `(address_index, address)` pairs.
+
+    Uses one index reservation when HD_XPUB is configured; the BlockCypher
+    fallback generates them one request at a time (rate limited, about 3/s),
+    so callers keep `count` small without an xpub.
+    """
+    if address_pool is not None:
+        return await address_pool.allocate_many(count)
+    return await asyncio.gather(*(allocate_address() for _ in range(count)))
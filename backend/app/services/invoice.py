@@ -1,32 +1,36 @@
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Optional
-from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import models
-from app.services.blockchain import blockchain_service
+from app.services.hdwallet import allocate_address, allocate_addresses
+from app.services.versioning import bump_data_versions
 
-def create_invoice(
-    db: Session,
+async def create_invoice(
+    db: AsyncSession,
     user_id: int,
     amount_btc: Decimal,
     amount_usd: Optional[float] = None,
     description: Optional[str] = None,
     expires_in_hours: int = 24
 ) -> models.Invoice:
-    """Create a new invoice with a BTC address."""
-    # Get or create a wallet for the user
-    wallet = db.query(models.Wallet).filter(models.Wallet.user_id == user_id).first()
-    
-    if not wallet:
-        # Generate new address
-        address_data = blockchain_service.generate_address()
-        wallet = models.Wallet(
-            user_id=user_id,
-            btc_address=address_data["address"],
-            address_index=0
-        )
-        db.add(wallet)
-        db.flush()
+    """
+    Create a new invoice with its own BTC address.
+
+    Each invoice gets a freshly allocated address (and wallet row), so an
+    incoming payment identifies exactly one invoice.
+    """
+    # Allocate a new address (derived locally when HD_XPUB is configured)
+    address_index, address = await allocate_address()
+    wallet = models.Wallet(
+        user_id=user_id,
+        btc_address=address,
+        address_index=address_index,
+        for_invoice=True
+    )
+    db.add(wallet)
+    await db.flush()
     
     # Create invoice
     expires_at = datetime.utcnow() + timedelta(hours=expires_in_hours)
@@ -43,13 +47,68 @@ def create_invoice(
     )
     
     db.add(invoice)
-    db.commit()
-    db.refresh(invoice)
+    await bump_data_versions(db, [user_id])
+    await db.commit()
+    await db.refresh(invoice)
     
     return invoice
 
+async def create_invoices(db: AsyncSession, user_id: int, items: List[Dict]) -> List:
+    """
+    Create many invoices in one transaction.
+
+    `items` are dicts with the `create_invoice` arguments (amount_btc,
+    amount_usd, description, expires_in_hours). Addresses are allocated in
+    bulk, wallets and invoices are each written with a multi-row
+    INSERT ... RETURNING and committed once. Returns the invoice rows in
+    the order of `items`.
+    """
+    allocated = await allocate_addresses(len(items))
+    # Core statements on the tables: no ORM bulk-insert bookkeeping per row
+    wallet = models.Wallet.__table__
+    wallet_ids = {
+        row.btc_address: row.id
+        for row in await db.execute(
+            insert(wallet).returning(wallet.c.id, wallet.c.btc_address),
+            [
+                {"user_id": user_id, "btc_address": address, "address_index": index, "for_invoice": True}
+                for index, address in allocated
+            ],
+        )
+    }
+    
+    now = datetime.utcnow()
+    invoice = models.Invoice.__table__.c
+    rows = await db.execute(
+        insert(models.Invoice.__table__).returning(
+            invoice.id, invoice.btc_address, invoice.amount_btc, invoice.amount_usd, invoice.status,
+            invoice.description, invoice.expires_at, invoice.created_at, invoice.paid_at,
+        ),
+        [
+            {
+                "user_id": user_id,
+                "wallet_id": wallet_ids[address],
+                "btc_address": address,
+                "amount_btc": item["amount_btc"],
+                "amount_usd": item.get("amount_usd"),
+                "description": item.get("description"),
+                "expires_at": now + timedelta(hours=item.get("expires_in_hours", 24)),
+                "status": "pending",
+            }
+            for (_, address), item in zip(allocated, items)
+        ],
+    )
+    # Addresses are unique, so they map the returned rows back to the input order
+    by_address = {row.btc_address: row for row in rows}
+    await bump_data_versions(db, [user_id])
+    await db.commit()
+    return [by_address[address] for _, address in allocated]
+
+def bip21_uri(address: str, amount_btc: Decimal) -> str:
+    """BIP21 payment URI for an address and amount."""
+    return f"bitcoin:{address}?amount={amount_btc}"
+
 def get_invoice_qr_data(invoice: models.Invoice) -> str:
     """Generate Bitcoin URI for QR code."""
-    amount_str = str(invoice.amount_btc)
-    return f"bitcoin:{invoice.btc_address}?amount={amount_str}"
+    return bip21_uri(invoice.btc_address, invoice.amount_btc)
 
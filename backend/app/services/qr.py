@@ -0,0 +1,110 @@
+"""
+Server-side QR codes for invoice payment URIs.
+
+Rendered images are content-addressed: the cache key is a hash of
+(address, amount, size, format), which fully determines the output. An
+image never changes for a given key, so it is cached in a bounded memory
+LRU and, when QR_CACHE_DIR is set, as a file in that directory (shared by
+the workers on a host and kept across restarts).
+"""
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import time
+from decimal import Decimal
+from typing import Optional
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.invoice import bip21_uri
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+
+def render_qr(data: str, fmt: str, size: int) -> bytes:
+    """Render `data` as a QR code image; `size` is the width of one module in pixels."""
+    # Imported on first render: Pillow is slow to import and most workers never draw a QR
+    import qrcode
+    import qrcode.image.svg
+
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, box_size=size, border=4)
+    qr.add_data(data)
+    qr.make(fit=True)
+    buffer = io.BytesIO()
+    if fmt == "svg":
+        qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+    else:
+        qr.make_image().save(buffer, format="PNG")
+    return buffer.getvalue()
+
+class QRCache:
+    """Memory LRU plus optional directory of rendered images, keyed by content hash."""
+
+    def __init__(self, maxsize: int, directory: str = ""):
+        self._memory = LRUCache(maxsize=maxsize)
+        self.directory: Optional[str] = None
+        if directory:
+            try:
+                os.makedirs(directory, exist_ok=True)
+                self.directory = directory
+            except OSError as e:
+                logger.warning("QR disk cache disabled (%s): %s", directory, e)
+        self._hits = metrics.counter("qr_cache_hits_total", "QR images served from memory")
+        self._disk_hits = metrics.counter("qr_cache_disk_hits_total", "QR images served from the disk cache")
+        self._renders = metrics.counter("qr_renders_total", "QR images rendered")
+        self._render_seconds = metrics.histogram("qr_render_seconds", "Time to render one QR image")
+
+    @staticmethod
+    def key(address: str, amount_btc: Decimal, size: int, fmt: str) -> str:
+        return hashlib.sha256(f"{address}|{amount_btc}|{size}|{fmt}".encode()).hexdigest()
+
+    def _path(self, key: str, fmt: str) -> str:
+        return os.path.join(self.directory, f"{key}.{fmt}")
+
+    def _read(self, key: str, fmt: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key, fmt), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write(self, key: str, fmt: str, image: bytes) -> None:
+        # Write to a temporary file and rename, so readers never see a partial image
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(image)
+            os.replace(tmp_path, self._path(key, fmt))
+        except OSError as e:
+            logger.warning("Could not write QR cache file: %s", e)
+
+    def _load_or_render(self, key: str, address: str, amount_btc: Decimal, size: int, fmt: str) -> bytes:
+        if self.directory:
+            image = self._read(key, fmt)
+            if image is not None:
+                self._disk_hits.inc()
+                return image
+        started = time.perf_counter()
+        image = render_qr(bip21_uri(address, amount_btc), fmt, size)
+        self._render_seconds.observe(time.perf_counter() - started)
+        self._renders.inc()
+        if self.directory:
+            self._write(key, fmt, image)
+        return image
+
+    async def get(self, address: str, amount_btc: Decimal, size: int, fmt: str) -> bytes:
+        """Return the image, rendering it (off the event loop) only on a miss."""
+        key = self.key(address, amount_btc, size, fmt)
+        image = self._memory.get(key)
+        if image is not None:
+            self._hits.inc()
+            return image
+        image = await asyncio.to_thread(self._load_or_render, key, address, amount_btc, size, fmt)
+        self._memory.set(key, image)
+        return image
+
+qr_cache = QRCache(maxsize=settings.QR_CACHE_SIZE, directory=settings.QR_CACHE_DIR)
@@ -0,0 +1,158 @@
+"""
+BTC/USD exchange rate for USD-denominated invoices.
+
+`rate_service` keeps the last quote in memory. Invoice creation reads it
+(`get()`, no I/O while a quote is cached); quotes are fetched in the
+background:
+- by the "rates" scheduler job every RATE_REFRESH_INTERVAL_SECONDS, and at
+  startup;
+- by `current()` itself, which schedules a background refresh once the
+  quote is older than the refresh interval (e.g. on serverless deployments
+  without the scheduler).
+Only when there is no usable quote at all (a cold serverless instance has
+neither startup nor scheduler) does `get()` wait, up to
+RATE_WAIT_TIMEOUT_SECONDS, for the refresh.
+
+Refreshes are single-flight: concurrent callers share the one in-flight
+upstream request. A quote older than RATE_MAX_STALENESS_SECONDS is not
+used; invoice creation then fails with 503 rather than guess a price.
+
+Sources: an HTTP spot price endpoint (RATE_SOURCE_URL, Coinbase format),
+or a local JSON file (RATE_SOURCE_FILE, e.g. fixtures/btc_usd_rate.json)
+as a stand-in for tests and offline development.
+"""
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SATOSHI = Decimal("0.00000001")
+
+class RateUnavailable(Exception):
+    """No exchange rate fresh enough to price an invoice."""
+
+@dataclass(frozen=True)
+class Quote:
+    price_usd: Decimal  # USD per BTC
+    fetched_at: float  # time.monotonic()
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def usd_to_btc(self, amount_usd) -> Decimal:
+        return (Decimal(str(amount_usd)) / self.price_usd).quantize(SATOSHI, rounding=ROUND_HALF_UP)
+
+class HttpRateSource:
+    """Spot price from a Coinbase-style endpoint: {"data": {"amount": "..."}}."""
+
+    def __init__(self, url: str, timeout: float):
+        self.url = url
+        self.timeout = timeout
+
+    async def fetch(self) -> Decimal:
+        import httpx
+
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.get(self.url)
+            response.raise_for_status()
+            return Decimal(str(response.json()["data"]["amount"]))
+
+class FileRateSource:
+    """Price read from a local JSON file: {"price_usd": "..."}."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def fetch(self) -> Decimal:
+        with open(self.path) as f:
+            return Decimal(str(json.load(f)["price_usd"]))
+
+class RateService:
+    """In-memory BTC/USD quote with background, single-flight refresh."""
+
+    def __init__(self, source, refresh_interval: float, max_staleness: float):
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.quote: Optional[Quote] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._price = metrics.gauge("rate_btc_usd", "Last BTC/USD quote")
+        self._refreshes = metrics.counter("rate_refreshes_total", "Exchange rate fetches from the upstream source")
+        self._failures = metrics.counter("rate_refresh_failures_total", "Failed exchange rate fetches")
+
+    async def _fetch(self) -> Quote:
+        self._refreshes.inc()
+        try:
+            price = await self.source.fetch()
+            if price <= 0:
+                raise ValueError(f"invalid price {price}")
+        except Exception as e:
+            self._failures.inc()
+            logger.warning("Could not refresh BTC/USD rate: %s", e)
+            raise
+        self.quote = Quote(price_usd=price, fetched_at=time.monotonic())
+        self._price.set(float(price))
+        return self.quote
+
+    async def refresh(self) -> Quote:
+        """Fetch a new quote, or join the fetch already in flight."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._fetch())
+        return await asyncio.shield(self._refresh_task)
+
+    def _refresh_in_background(self) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._fetch())
+            # Failures are logged and counted in _fetch
+            self._refresh_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    def current(self) -> Quote:
+        """
+        The cached quote, without any I/O.
+
+        Schedules a background refresh when the quote is due. Raises
+        RateUnavailable if there is no quote or it is older than the
+        staleness bound.
+        """
+        quote = self.quote
+        if quote is None or quote.age() >= self.refresh_interval:
+            try:
+                self._refresh_in_background()
+            except RuntimeError:
+                pass  # No running event loop (scripts); nothing to schedule on
+        if quote is None or quote.age() > self.max_staleness:
+            raise RateUnavailable("BTC/USD exchange rate unavailable")
+        return quote
+
+    async def get(self, timeout: float) -> Quote:
+        """
+        `current()`, but without a usable quote wait up to `timeout` seconds
+        for the (single-flight) refresh instead of failing right away.
+        """
+        try:
+            return self.current()
+        except RateUnavailable:
+            pass
+        try:
+            return await asyncio.wait_for(self.refresh(), timeout)
+        except Exception as e:
+            # Timeouts only stop waiting; the shared refresh keeps running
+            raise RateUnavailable("BTC/USD exchange rate unavailable") from e
+
+def _build_source():
+    if settings.RATE_SOURCE_FILE:
+        return FileRateSource(settings.RATE_SOURCE_FILE)
+    return HttpRateSource(settings.RATE_SOURCE_URL, timeout=settings.RATE_SOURCE_TIMEOUT_SECONDS)
+
+rate_service = RateService(
+    _build_source(),
+    refresh_interval=settings.RATE_REFRESH_INTERVAL_SECONDS,
+    max_staleness=settings.RATE_MAX_STALENESS_SECONDS,
+)
@@ -0,0 +1,98 @@
+"""
+Per-user cache of serialized read responses.
+
+Entries are keyed by (user id, data version, path, query parameters). The
+data version is bumped in the same transaction as every write to the user's
+invoices, transactions or balances (see app/services/versioning.py), so a
+write invalidates exactly that user's entries, in every worker, without
+deleting anything: the next request looks up a key that does not exist yet
+and entries for old versions age out of the LRU/TTL.
+
+Backends (RESPONSE_CACHE_BACKEND):
+- "memory": bounded in-process LRU with TTL.
+- "redis": any Redis-compatible server at RESPONSE_CACHE_REDIS_URL, shared
+  by all workers. Needs the `redis` package; falls back to memory without it.
+- "none": disabled.
+"""
+import logging
+from typing import Optional
+from fastapi import Request
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class MemoryBackend:
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, body: bytes) -> None:
+        self._cache.set(key, body)
+
+class RedisBackend:
+    """Redis-compatible backend. Errors are logged and treated as misses."""
+
+    def __init__(self, url: str, ttl: int):
+        import redis.asyncio as redis
+        self._client = redis.from_url(url)
+        self.ttl = ttl
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            return await self._client.get(key)
+        except Exception as e:
+            logger.warning("Response cache read failed: %s", e)
+            return None
+
+    async def set(self, key: str, body: bytes) -> None:
+        try:
+            await self._client.set(key, body, ex=self.ttl)
+        except Exception as e:
+            logger.warning("Response cache write failed: %s", e)
+
+def _make_backend(name: str):
+    if name == "none":
+        return None
+    if name == "redis":
+        try:
+            return RedisBackend(settings.RESPONSE_CACHE_REDIS_URL, settings.RESPONSE_CACHE_TTL_SECONDS)
+        except ImportError:
+            logger.warning("redis package not installed, using the in-process response cache")
+    return MemoryBackend(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL_SECONDS)
+
+class ResponseCache:
+    """Serialized JSON bodies by key, with hit/miss metrics."""
+
+    def __init__(self, backend: str):
+        self.backend = _make_backend(backend)
+        self._hits = metrics.counter("response_cache_hits_total", "Read responses served from the response cache")
+        self._misses = metrics.counter("response_cache_misses_total", "Read responses built from the database")
+        self._hit_ratio = metrics.gauge("response_cache_hit_ratio", "Response cache hits / lookups")
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @staticmethod
+    def key(user_id: int, data_version: int, request: Request) -> str:
+        params = "&".join(f"{name}={value}" for name, value in sorted(request.query_params.multi_items()))
+        return f"resp:{user_id}:{data_version}:{request.url.path}?{params}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        body = await self.backend.get(key)
+        if body is None:
+            self._misses.inc()
+        else:
+            self._hits.inc()
+        lookups = self._hits.value + self._misses.value
+        self._hit_ratio.set(round(self._hits.value / lookups, 4))
+        return body
+
+    async def set(self, key: str, body: bytes) -> None:
+        await self.backend.set(key, body)
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_BACKEND)
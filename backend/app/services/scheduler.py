@@ -0,0 +1,65 @@
+"""
+Background jobs (APScheduler, in the app's event loop).
+
+Every API process runs its own scheduler. The confirmation job is an
+idempotent set-based update, so several processes only repeat work; the
+invoice sweeper claims rows with SKIP LOCKED, so several processes share
+it; the webhook retention job only deletes, so running it twice is harmless.
+Set SCHEDULER_ENABLED=false on serverless deployments.
+"""
+import logging
+from app.core.config import settings
+from app.services.confirmations import confirmation_tracker
+from app.services.expiry import sweep_expired_invoices
+from app.services.rates import rate_service
+from app.services.webhook import purge_webhook_history
+
+logger = logging.getLogger(__name__)
+
+# Created by start_scheduler(), so serverless deployments never import APScheduler
+scheduler = None
+
+def start_scheduler() -> None:
+    global scheduler
+    if not settings.SCHEDULER_ENABLED or (scheduler is not None and scheduler.running):
+        return
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+    scheduler = AsyncIOScheduler(timezone="UTC")
+    scheduler.add_job(
+        confirmation_tracker.poll,
+        "interval",
+        seconds=settings.CONFIRMATION_POLL_INTERVAL_SECONDS,
+        id="confirmations",
+        max_instances=1,
+        coalesce=True,
+    )
+    scheduler.add_job(
+        sweep_expired_invoices,
+        "interval",
+        seconds=settings.INVOICE_SWEEP_INTERVAL_SECONDS,
+        id="invoice_expiry",
+        max_instances=1,
+        coalesce=True,
+    )
+    scheduler.add_job(
+        purge_webhook_history,
+        "interval",
+        seconds=settings.WEBHOOK_RETENTION_INTERVAL_SECONDS,
+        id="webhook_retention",
+        max_instances=1,
+        coalesce=True,
+    )
+    scheduler.add_job(
+        rate_service.refresh,
+        "interval",
+        seconds=settings.RATE_REFRESH_INTERVAL_SECONDS,
+        id="rates",
+        max_instances=1,
+        coalesce=True,
+    )
+    scheduler.start()
+
+def shutdown_scheduler() -> None:
+    if scheduler is not None and scheduler.running:
+        scheduler.shutdown(wait=False)
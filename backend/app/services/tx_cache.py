@@ -0,0 +1,120 @@
+"""
+Content-addressed cache of BlockCypher transaction lookups.
+
+Transactions are keyed by their hash. Once a transaction has
+RECOMMENDED_CONFIRMATIONS it is final: its outputs can no longer change, so
+it is cached without expiry (its `confirmations` field then only means "at
+least that many"). Less confirmed transactions are cached for
+TX_CACHE_PENDING_TTL_SECONDS.
+
+The memory tier is a bounded LRU. Setting TX_CACHE_PATH adds an on-disk
+SQLite tier holding final transactions, shared by the workers on a host and
+kept across restarts, so reprocessing and backfills don't go back to the API.
+Its sqlite3 calls block, so the async cache methods run them in a worker
+thread (`asyncio.to_thread`, like the QR disk cache in app/services/qr.py);
+memory hits never leave the event loop.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+def is_final(tx: Dict) -> bool:
+    return (tx.get("confirmations") or 0) >= settings.RECOMMENDED_CONFIRMATIONS
+
+class DiskTier:
+    """Final transactions in a local SQLite file (hash -> JSON). Blocking; call from a worker thread."""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS transactions (hash TEXT PRIMARY KEY, body TEXT NOT NULL)")
+        self._lock = threading.Lock()
+
+    def get(self, tx_hash: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM transactions WHERE hash = ?", (tx_hash,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_many(self, txs: List[Dict]) -> None:
+        rows = [(tx["hash"], json.dumps(tx, separators=(",", ":"))) for tx in txs]
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO transactions (hash, body) VALUES (?, ?)", rows)
+
+class TransactionCache:
+    """Two-tier cache for `get_transaction` and `get_address_transactions` results."""
+
+    def __init__(self, maxsize: int, pending_ttl: float, address_ttl: float, path: str = ""):
+        self.pending_ttl = pending_ttl
+        self._memory = LRUCache(maxsize=maxsize)
+        # address -> tx hashes; new payments can arrive at any time, so this always expires
+        self._addresses = LRUCache(maxsize=maxsize, ttl=address_ttl)
+        self._disk: Optional[DiskTier] = None
+        if path:
+            try:
+                self._disk = DiskTier(path)
+            except sqlite3.Error as e:
+                logger.warning("Transaction disk cache disabled (%s): %s", path, e)
+        self._hits = metrics.counter("tx_cache_hits_total", "Transaction lookups served from memory")
+        self._disk_hits = metrics.counter("tx_cache_disk_hits_total", "Transaction lookups served from the disk tier")
+        self._misses = metrics.counter("tx_cache_misses_total", "Transaction lookups that went to BlockCypher")
+
+    async def get(self, tx_hash: str) -> Optional[Dict]:
+        tx = self._memory.get(tx_hash)
+        if tx is not None:
+            self._hits.inc()
+            return tx
+        if self._disk is not None:
+            tx = await asyncio.to_thread(self._disk.get, tx_hash)
+            if tx is not None:
+                self._disk_hits.inc()
+                self._memory.set(tx_hash, tx, ttl=None)
+                return tx
+        self._misses.inc()
+        return None
+
+    async def put(self, tx: Dict) -> None:
+        await self.put_many([tx])
+
+    async def put_many(self, txs: List[Dict]) -> None:
+        final = []
+        for tx in txs:
+            tx_hash = tx.get("hash")
+            if not tx_hash:
+                continue
+            if is_final(tx):
+                self._memory.set(tx_hash, tx, ttl=None)
+                final.append(tx)
+            else:
+                self._memory.set(tx_hash, tx, ttl=self.pending_ttl)
+        if final and self._disk is not None:
+            # One worker-thread hop and one executemany for the whole list
+            await asyncio.to_thread(self._disk.put_many, final)
+
+    def get_address(self, address: str) -> Optional[List[Dict]]:
+        """Cached transaction list of an address, if every transaction in it is still cached."""
+        hashes = self._addresses.get(address)
+        if hashes is None:
+            return None
+        txs = [self._memory.get(tx_hash) for tx_hash in hashes]
+        if any(tx is None for tx in txs):
+            return None
+        return txs
+
+    async def put_address(self, address: str, txs: List[Dict]) -> None:
+        await self.put_many(txs)
+        self._addresses.set(address, [tx.get("hash") for tx in txs])
+
+tx_cache = TransactionCache(
+    maxsize=settings.TX_CACHE_SIZE,
+    pending_ttl=settings.TX_CACHE_PENDING_TTL_SECONDS,
+    address_ttl=settings.TX_CACHE_ADDRESS_TTL_SECONDS,
+    path=settings.TX_CACHE_PATH,
+)
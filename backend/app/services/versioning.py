@@ -0,0 +1,33 @@
+"""
+Per-user data version, used for ETags on the read endpoints.
+
+Every write that changes what a user sees in /api/invoices,
+/api/transactions or /api/wallets/balance calls `bump_data_versions` in the
+same DB transaction, so a reader seeing an unchanged `users.data_version`
+knows none of those responses changed.
+"""
+from typing import Iterable, Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import models
+
+async def bump_data_versions(db: AsyncSession, user_ids: Iterable[int]) -> None:
+    """
+    Increment the data version of the given users. Does not commit.
+
+    Call it last before committing: the UPDATE locks the user rows until
+    the transaction ends.
+    """
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    await db.execute(
+        update(models.User)
+        .where(models.User.id.in_(user_ids))
+        .values(data_version=models.User.data_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+async def get_data_version(db: AsyncSession, user_id: int) -> Optional[int]:
+    """Current data version of a user (None if the user does not exist)."""
+    return await db.scalar(select(models.User.data_version).where(models.User.id == user_id))
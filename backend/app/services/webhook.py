@@ -0,0 +1,771 @@
+"""
+Blockchain webhook processing.
+
+`process_event` holds the business logic for one BlockCypher notification
+and is shared by the synchronous endpoint and the queue workers.
+
+In queue ingestion mode (WEBHOOK_INGEST_MODE=queue) the endpoint only
+verifies the signature and appends the raw payload to `webhook_events`;
+`WebhookQueue` then drains that table in batches (`process_batch`: a few
+set-based queries and one commit per batch). If a batch fails, its events
+are retried grouped by address, each group handled by a single worker in
+arrival order, so confirmations for one address never overtake each other.
+
+Every API process runs a dispatcher. Claimed events are leased for
+WEBHOOK_LEASE_SECONDS (`claimed_at`): a process only gives back the events
+it claimed itself, and events of a crashed process are claimed again once
+their lease expires. An event is not claimed while an earlier event of the
+same address is leased, so per-address order holds across processes.
+A failed event is retried with exponential backoff (`next_attempt_at`);
+later events of its address wait for it. Finished events and old delivery
+idempotency keys are deleted by a scheduled job (`purge_webhook_history`).
+"""
+import asyncio
+import json
+import logging
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import and_, bindparam, delete, exists, func, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db import models
+from app.db.database import get_async_session_local
+from app.services.blockchain import blockchain_service
+from app.services.balance import apply_wallet_deltas, credit_wallet, confirm_wallet_amount
+from app.services.events import event_broker, invoice_event, transaction_event
+from app.services.versioning import bump_data_versions
+
+logger = logging.getLogger(__name__)
+
+# (tx_hash, confirmations) of deliveries this process has seen applied.
+# BlockCypher's tx-confirmation hook fires once per confirmation and retries;
+# repeats are answered from here without a DB round trip. Queued deliveries
+# are only added once applied, so a redelivery of one that failed in the
+# queue is still accepted. The webhook_deliveries table is the
+# authoritative check across workers (pruned by purge_webhook_history).
+seen_deliveries = LRUCache(maxsize=settings.WEBHOOK_DEDUP_CACHE_SIZE, ttl=settings.WEBHOOK_DEDUP_TTL_SECONDS)
+duplicate_deliveries = metrics.counter("webhook_duplicate_deliveries_total", "Webhook deliveries skipped as already applied")
+
+DUPLICATE_RESULT = {"status": "duplicate", "message": "Delivery already processed"}
+
+def delivery_key(data: dict) -> Tuple[str, int]:
+    return data.get("hash") or data.get("tx_hash"), int(data.get("confirmations") or 0)
+
+def is_duplicate_delivery(data: dict) -> bool:
+    """True if this process has already seen the same delivery applied."""
+    if delivery_key(data) in seen_deliveries:
+        duplicate_deliveries.inc()
+        return True
+    return False
+
+async def _claim_deliveries(db: AsyncSession, keys: Iterable[Tuple[str, int]]) -> Set[Tuple[str, int]]:
+    """
+    Insert idempotency keys in the caller's transaction; returns the new ones.
+
+    Keys that already exist belong to deliveries another request or worker
+    has committed. Because the insert commits together with the effects, a
+    failed delivery leaves no key behind and can be retried.
+    """
+    rows = [{"tx_hash": tx_hash, "confirmations": confirmations} for tx_hash, confirmations in set(keys)]
+    if not rows:
+        return set()
+    delivery = models.WebhookDelivery
+    result = await db.execute(
+        _insert(db)(delivery).values(rows)
+        .on_conflict_do_nothing()
+        .returning(delivery.tx_hash, delivery.confirmations)
+    )
+    return {(row.tx_hash, row.confirmations) for row in result}
+
+async def _get_tx_details(data: dict, tx_hash: str) -> Dict:
+    """Transaction details with outputs; BlockCypher tx hooks already carry them."""
+    if "outputs" in data:
+        return data
+    try:
+        return await blockchain_service.get_transaction(tx_hash)
+    except Exception:
+        # If we can't get details, still record basic info
+        return {}
+
+def _received_satoshi(tx_details: Dict, address: str) -> int:
+    """Amount received (simplified - sum of outputs to our address)."""
+    return sum(
+        output.get("value", 0)
+        for output in tx_details.get("outputs", [])
+        if address in (output.get("addresses") or [])
+    )
+
+def _matching_invoice(pending_invoices, amount_btc: Decimal):
+    """First (oldest) of the pending invoices whose amount matches the payment, if any."""
+    for invoice in pending_invoices:
+        # Check if amount matches (with small tolerance for fees)
+        if abs(invoice.amount_btc - amount_btc) <= Decimal("0.00001"):
+            return invoice
+    return None
+
+async def process_event(db: AsyncSession, data: dict) -> Dict:
+    """Apply one webhook notification and commit. Returns a status dict."""
+    address = data.get("address")
+    tx_hash = data.get("hash") or data.get("tx_hash")
+    confirmations = data.get("confirmations") or 0
+
+    # Find wallet by address
+    wallet = await db.scalar(select(models.Wallet).where(models.Wallet.btc_address == address))
+    if not wallet:
+        # Address not found in our system - ignore
+        return {"status": "ignored", "message": "Address not found"}
+
+    if not await _claim_deliveries(db, [delivery_key(data)]):
+        duplicate_deliveries.inc()
+        seen_deliveries.set(delivery_key(data), True)
+        return DUPLICATE_RESULT
+
+    # Check if transaction already exists
+    existing_tx = await db.scalar(select(models.Transaction).where(models.Transaction.tx_hash == tx_hash))
+    if existing_tx:
+        # Update confirmations
+        tx_status = existing_tx.status
+        # Never backwards: a late or retried delivery may carry a lower count
+        existing_tx.confirmations = max(existing_tx.confirmations or 0, confirmations)
+        if data.get("block_height"):
+            existing_tx.block_height = data["block_height"]
+        if confirmations >= settings.MIN_CONFIRMATIONS and existing_tx.status == "pending":
+            # Conditional so a concurrent promotion (e.g. the confirmation tracker) isn't counted twice
+            promoted = await db.scalar(
+                update(models.Transaction)
+                .where(models.Transaction.id == existing_tx.id, models.Transaction.status == "pending")
+                .values(status="confirmed", confirmed_at=datetime.utcnow())
+                .returning(models.Transaction.id)
+                .execution_options(synchronize_session=False)
+            )
+            if promoted:
+                await confirm_wallet_amount(db, existing_tx.wallet_id, existing_tx.amount_btc)
+                tx_status = "confirmed"
+        await bump_data_versions(db, [wallet.user_id])
+        await db.commit()
+        seen_deliveries.set(delivery_key(data), True)
+        await event_broker.publish(wallet.user_id, transaction_event(
+            tx_hash, tx_status, existing_tx.confirmations, existing_tx.invoice_id
+        ))
+        return {"status": "updated", "message": "Transaction confirmations updated"}
+
+    # Get transaction details (from the payload, or BlockCypher)
+    tx_details = await _get_tx_details(data, tx_hash)
+    amount_satoshi = _received_satoshi(tx_details, address)
+
+    amount_btc = blockchain_service.satoshi_to_btc(amount_satoshi)
+
+    if amount_btc == 0:
+        return {"status": "ignored", "message": "No payment to this address"}
+
+    # Create transaction record
+    is_confirmed = confirmations >= settings.MIN_CONFIRMATIONS
+    transaction = models.Transaction(
+        wallet_id=wallet.id,
+        tx_hash=tx_hash,
+        amount_btc=amount_btc,
+        confirmations=confirmations,
+        status="confirmed" if is_confirmed else "pending",
+        block_height=data.get("block_height"),
+        confirmed_at=datetime.utcnow() if is_confirmed else None
+    )
+
+    db.add(transaction)
+    await credit_wallet(db, wallet.id, amount_btc, confirmed=is_confirmed)
+
+    # Update invoice status if exists: one pending invoice per address (see
+    # uq_invoices_pending_btc_address), except legacy shared-address invoices,
+    # which are paid oldest first
+    pending_invoices = (await db.scalars(
+        select(models.Invoice)
+        .where(models.Invoice.btc_address == address, models.Invoice.status == "pending")
+        .order_by(models.Invoice.id)
+    )).all()
+    invoice = _matching_invoice(pending_invoices, amount_btc)
+
+    if invoice:
+        invoice.status = "paid"
+        invoice.paid_at = datetime.utcnow()
+        transaction.invoice_id = invoice.id
+
+    await bump_data_versions(db, [wallet.user_id])
+    await db.commit()
+    await db.refresh(transaction)
+    seen_deliveries.set(delivery_key(data), True)
+    await event_broker.publish(wallet.user_id, transaction_event(
+        tx_hash, transaction.status, confirmations, transaction.invoice_id
+    ))
+    if transaction.invoice_id:
+        await event_broker.publish(wallet.user_id, invoice_event(transaction.invoice_id, "paid"))
+
+    return {
+        "status": "processed",
+        "message": "Transaction recorded",
+        "transaction_id": transaction.id
+    }
+
+def _insert(db: AsyncSession):
+    """Dialect-specific INSERT supporting ON CONFLICT."""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+def _greatest(db: AsyncSession, *values):
+    """Dialect-specific GREATEST (SQLite's multi-argument MAX is scalar)."""
+    if db.bind.dialect.name == "postgresql":
+        return func.greatest(*values)
+    return func.max(*values)
+
+async def process_batch(db: AsyncSession, events: List[dict]) -> List[Dict]:
+    """
+    Apply many webhook notifications in one DB transaction.
+
+    Notifications are folded per tx hash (keeping the highest confirmation
+    count), wallets, existing transactions and pending invoices are each
+    resolved with one `IN (...)` query, and all transaction rows are written
+    with a single `INSERT ... ON CONFLICT (tx_hash) DO NOTHING`; known
+    transactions get their confirmations raised in one executemany UPDATE.
+    Deliveries
+    whose idempotency key already exists are skipped; keys are only kept
+    for deliveries that were applied, like in `process_event`. Returns one
+    status dict per input event, in order.
+    """
+    tx = models.Transaction
+    # Deliveries already applied (by anyone) or repeated within this batch are skipped
+    fresh = await _claim_deliveries(db, (delivery_key(data) for data in events))
+    claimed_keys = set(fresh)
+    duplicates = set()
+    for position, data in enumerate(events):
+        key = delivery_key(data)
+        if key in fresh:
+            fresh.discard(key)
+        else:
+            duplicates.add(position)
+    duplicate_deliveries.inc(len(duplicates))
+
+    latest: Dict[str, dict] = {}
+    for position, data in enumerate(events):
+        if position in duplicates:
+            continue
+        tx_hash = data.get("hash") or data.get("tx_hash")
+        first = latest.setdefault(tx_hash, dict(data))
+        first["confirmations"] = max(first.get("confirmations") or 0, data.get("confirmations") or 0)
+        first["block_height"] = data.get("block_height") or first.get("block_height")
+
+    wallets = {
+        row.btc_address: row
+        for row in (await db.execute(
+            select(models.Wallet.btc_address, models.Wallet.id, models.Wallet.user_id)
+            .where(models.Wallet.btc_address.in_({data.get("address") for data in latest.values()}))
+        )).all()
+    }
+    existing = set((await db.scalars(select(tx.tx_hash).where(tx.tx_hash.in_(list(latest))))).all())
+
+    # New transactions need their outputs; fetch missing details concurrently
+    new_hashes = [h for h, data in latest.items() if h not in existing and data.get("address") in wallets]
+    details = await asyncio.gather(*(_get_tx_details(latest[h], h) for h in new_hashes))
+    amounts = {}
+    for tx_hash, tx_details in zip(new_hashes, details):
+        amount_btc = blockchain_service.satoshi_to_btc(_received_satoshi(tx_details, latest[tx_hash]["address"]))
+        if amount_btc:
+            amounts[tx_hash] = amount_btc
+
+    # Pending invoices per address, oldest first (several only for legacy shared-address invoices)
+    invoices = defaultdict(list)
+    if amounts:
+        for row in (await db.execute(
+            select(models.Invoice.id, models.Invoice.btc_address, models.Invoice.amount_btc)
+            .where(
+                models.Invoice.btc_address.in_({latest[h]["address"] for h in amounts}),
+                models.Invoice.status == "pending"
+            )
+            .order_by(models.Invoice.id)
+        )).all():
+            invoices[row.btc_address].append(row)
+
+    now = datetime.utcnow()
+    new_rows = []
+    update_hashes = []
+    for tx_hash, data in latest.items():
+        if data.get("address") not in wallets:
+            continue
+        if tx_hash in existing:
+            update_hashes.append(tx_hash)
+            continue
+        if tx_hash not in amounts:
+            continue
+        confirmations = data.get("confirmations", 0)
+        is_confirmed = confirmations >= settings.MIN_CONFIRMATIONS
+        row = {
+            "tx_hash": tx_hash,
+            "wallet_id": wallets[data["address"]].id,
+            "amount_btc": amounts[tx_hash],
+            "confirmations": confirmations,
+            "status": "confirmed" if is_confirmed else "pending",
+            "block_height": data.get("block_height"),
+            "confirmed_at": now if is_confirmed else None,
+            "invoice_id": None,
+        }
+        invoice = _matching_invoice(invoices[data["address"]], row["amount_btc"])
+        if invoice:
+            # An invoice is paid by one transaction only
+            invoices[data["address"]].remove(invoice)
+            row["invoice_id"] = invoice.id
+        new_rows.append(row)
+
+    # Only rows this batch actually inserted credit the ledger and pay their
+    # invoice; a row inserted concurrently since the SELECT above is updated
+    # like an existing one
+    inserted = set()
+    if new_rows:
+        inserted = set((await db.scalars(
+            _insert(db)(tx).values(new_rows)
+            .on_conflict_do_nothing(index_elements=[tx.tx_hash])
+            .returning(tx.tx_hash)
+        )).all())
+    deltas = defaultdict(lambda: (Decimal(0), Decimal(0)))
+    paid_invoice_ids = []
+    for row in new_rows:
+        if row["tx_hash"] not in inserted:
+            update_hashes.append(row["tx_hash"])
+            continue
+        confirmed, pending = deltas[row["wallet_id"]]
+        if row["status"] == "confirmed":
+            deltas[row["wallet_id"]] = (confirmed + row["amount_btc"], pending)
+        else:
+            deltas[row["wallet_id"]] = (confirmed, pending + row["amount_btc"])
+        if row["invoice_id"]:
+            paid_invoice_ids.append(row["invoice_id"])
+
+    updated = {}
+    if update_hashes:
+        # Confirmations only move forward: a late or retried delivery carries a lower count
+        current = tx.__table__.c
+        await db.execute(
+            update(tx.__table__)
+            .where(current.tx_hash == bindparam("b_tx_hash"))
+            .values(
+                confirmations=_greatest(db, current.confirmations, bindparam("b_confirmations", type_=current.confirmations.type)),
+                block_height=func.coalesce(bindparam("b_block_height", type_=current.block_height.type), current.block_height),
+            ),
+            [
+                {
+                    "b_tx_hash": tx_hash,
+                    "b_confirmations": latest[tx_hash].get("confirmations", 0),
+                    "b_block_height": latest[tx_hash].get("block_height"),
+                }
+                for tx_hash in update_hashes
+            ],
+        )
+        promote_hashes = [
+            tx_hash for tx_hash in update_hashes
+            if latest[tx_hash].get("confirmations", 0) >= settings.MIN_CONFIRMATIONS
+        ]
+        if promote_hashes:
+            # Promote with a conditional UPDATE so rows confirmed concurrently (e.g. by
+            # the confirmation tracker) don't move the ledger twice
+            promoted = await db.execute(
+                update(tx)
+                .where(tx.tx_hash.in_(promote_hashes), tx.status == "pending")
+                .values(status="confirmed", confirmed_at=now)
+                .returning(tx.tx_hash, tx.wallet_id, tx.amount_btc)
+                .execution_options(synchronize_session=False)
+            )
+            for tx_hash, wallet_id, amount_btc in promoted:
+                confirmed, pending = deltas[wallet_id]
+                deltas[wallet_id] = (confirmed + amount_btc, pending - amount_btc)
+        updated = {
+            row.tx_hash: row
+            for row in (await db.execute(
+                select(tx.tx_hash, tx.status, tx.confirmations, tx.invoice_id).where(tx.tx_hash.in_(update_hashes))
+            )).all()
+        }
+    if paid_invoice_ids:
+        await db.execute(
+            update(models.Invoice)
+            .where(models.Invoice.id.in_(paid_invoice_ids))
+            .values(status="paid", paid_at=now)
+        )
+    await apply_wallet_deltas(db, deltas)
+    applied_hashes = inserted | set(update_hashes)
+    await bump_data_versions(db, (wallets[latest[tx_hash]["address"]].user_id for tx_hash in applied_hashes))
+    # Ignored deliveries (unknown address, no payment found) leave no key
+    # behind, so a redelivery can still be applied
+    unapplied = [key for key in claimed_keys if key[0] not in applied_hashes]
+    if unapplied:
+        delivery = models.WebhookDelivery
+        await db.execute(
+            delete(delivery)
+            .where(tuple_(delivery.tx_hash, delivery.confirmations).in_(unapplied))
+            .execution_options(synchronize_session=False)
+        )
+    await db.commit()
+
+    for row in new_rows:
+        if row["tx_hash"] in inserted:
+            user_id = wallets[latest[row["tx_hash"]]["address"]].user_id
+            await event_broker.publish(user_id, transaction_event(
+                row["tx_hash"], row["status"], row["confirmations"], row["invoice_id"]
+            ))
+            if row["invoice_id"]:
+                await event_broker.publish(user_id, invoice_event(row["invoice_id"], "paid"))
+    for tx_hash, row in updated.items():
+        user_id = wallets[latest[tx_hash]["address"]].user_id
+        await event_broker.publish(user_id, transaction_event(tx_hash, row.status, row.confirmations, row.invoice_id))
+
+    results = []
+    seen = set()
+    for position, data in enumerate(events):
+        tx_hash = data.get("hash") or data.get("tx_hash")
+        if position in duplicates or tx_hash in applied_hashes:
+            seen_deliveries.set(delivery_key(data), True)
+        if position in duplicates:
+            results.append(DUPLICATE_RESULT)
+        elif data.get("address") not in wallets:
+            results.append({"status": "ignored", "message": "Address not found"})
+        elif tx_hash in inserted and tx_hash not in seen:
+            results.append({"status": "processed", "message": "Transaction recorded"})
+        elif tx_hash in applied_hashes:
+            results.append({"status": "updated", "message": "Transaction confirmations updated"})
+        else:
+            results.append({"status": "ignored", "message": "No payment to this address"})
+        seen.add(tx_hash)
+    return results
+
+async def enqueue_event(db: AsyncSession, payload: bytes, data: dict) -> models.WebhookEvent:
+    """Durably append a raw webhook payload (parsed as `data`) to the queue table."""
+    tx_hash, _ = delivery_key(data)
+    event = models.WebhookEvent(
+        address=data.get("address"),
+        tx_hash=tx_hash,
+        payload=payload.decode(),
+        status="queued",
+        received_at=datetime.utcnow(),  # Sub-second precision for the lag metric
+    )
+    db.add(event)
+    await db.commit()
+    # Not marked as seen here: it only counts once applied (process_batch/process_event)
+    webhook_queue.ingested.inc()
+    webhook_queue.notify()
+    return event
+
+class WebhookQueue:
+    """
+    Pool of workers draining `webhook_events`.
+
+    A dispatcher claims up to WEBHOOK_QUEUE_BATCH_SIZE queued events (oldest
+    first) and applies them with `process_batch`. If that fails it groups
+    them by address and hands each group to one worker; the next batch is
+    only claimed once the current one is finished. Any number of processes
+    may run a dispatcher against the same database (see the module
+    docstring); an event whose lease expires mid-processing may be applied
+    twice, which the webhook_deliveries idempotency keys make harmless.
+    """
+
+    # pg_advisory_xact_lock key serializing claims across dispatchers
+    CLAIM_LOCK_ID = 0x77686B71
+
+    def __init__(
+        self,
+        workers: int,
+        batch_size: int,
+        poll_interval: float,
+        lease_seconds: float,
+        retry_base: float,
+        retry_max: float,
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._claimed: Set[int] = set()  # Ids leased by this process and not finished yet
+        self.ingested = metrics.counter("webhook_events_ingested_total", "Webhook payloads appended to the queue")
+        self.processed = metrics.counter("webhook_events_processed_total", "Queued webhook events processed")
+        self.failed = metrics.counter("webhook_events_failed_total", "Queued webhook events that exhausted their attempts")
+        self.depth = metrics.gauge("webhook_queue_depth", "Queued webhook events at the last poll")
+        self.lag = metrics.histogram("webhook_processing_lag_seconds", "Time from ingest to processed")
+
+    def notify(self) -> None:
+        """Wake the dispatcher early (called after an insert in this process)."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        groups: asyncio.Queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._dispatch(groups))]
+        self._tasks += [asyncio.create_task(self._work(groups)) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Events this process claimed but did not finish go back to the queue
+        await self._release(self._claimed)
+
+    async def _dispatch(self, groups: asyncio.Queue) -> None:
+        while True:
+            try:
+                events = await self._claim()
+            except Exception:
+                logger.exception("Failed to claim webhook events")
+                events = []
+
+            if not events:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            if await self._process_batch(events):
+                continue
+
+            # The batch failed as a whole: fall back to per-address groups to isolate bad events
+            by_address: "OrderedDict[str, List[models.WebhookEvent]]" = OrderedDict()
+            for event in events:
+                by_address.setdefault(event.address, []).append(event)
+            for group in by_address.values():
+                groups.put_nowait(group)
+            await groups.join()
+
+    async def _claim(self) -> List[models.WebhookEvent]:
+        """Lease the oldest due events whose address has no earlier event in flight or backing off."""
+        event = models.WebhookEvent
+        earlier = aliased(models.WebhookEvent)
+        now = datetime.now(timezone.utc)
+        lease_cutoff = now - timedelta(seconds=self.lease_seconds)
+        claimable = or_(
+            and_(event.status == "queued", or_(event.next_attempt_at.is_(None), event.next_attempt_at <= now)),
+            and_(event.status == "processing", event.claimed_at < lease_cutoff),  # Expired lease
+        )
+        blocked = exists().where(
+            earlier.address == event.address,
+            earlier.id < event.id,
+            or_(
+                and_(earlier.status == "processing", earlier.claimed_at >= lease_cutoff),
+                and_(earlier.status == "queued", earlier.next_attempt_at > now),
+            ),
+        )
+        async with get_async_session_local()() as db:
+            if db.bind.dialect.name == "postgresql":
+                # One claim at a time, so a dispatcher sees the leases of the
+                # previous claim and no address is split across two dispatchers
+                await db.execute(select(func.pg_advisory_xact_lock(self.CLAIM_LOCK_ID)))
+            self.depth.set(await db.scalar(select(func.count()).where(event.status == "queued")))
+            ids = (await db.scalars(
+                select(event.id)
+                .where(claimable, ~blocked)
+                .order_by(event.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )).all()
+            if not ids:
+                return []
+            claimed = (await db.scalars(
+                update(event)
+                .where(event.id.in_(ids), claimable)
+                .values(status="processing", claimed_at=now, attempts=event.attempts + 1)
+                .returning(event)
+                .execution_options(synchronize_session=False)
+            )).all()
+            await db.commit()
+        self._claimed.update(e.id for e in claimed)
+        return sorted(claimed, key=lambda e: e.id)
+
+    async def _work(self, groups: asyncio.Queue) -> None:
+        while True:
+            group = await groups.get()
+            try:
+                await self._process_group(group)
+            except Exception:
+                logger.exception("Webhook worker failed")
+            finally:
+                groups.task_done()
+
+    async def _process_group(self, group: List[models.WebhookEvent]) -> None:
+        session_local = get_async_session_local()
+        for position, event in enumerate(group):
+            try:
+                async with session_local() as db:
+                    result = await process_event(db, json.loads(event.payload))
+            except Exception as e:
+                logger.warning("Webhook event %s failed: %s", event.id, e)
+                # Keep per-address order: this event and everything after it wait for a retry
+                if event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+                    await self._finish([event], "failed", str(e))
+                else:
+                    await self._finish([event], "queued", str(e), retry_in=self.retry_delay(event.attempts))
+                await self._requeue(group[position + 1:])
+                return
+            await self._finish([event], "done", result.get("status"))
+
+    async def _process_batch(self, events: List[models.WebhookEvent]) -> bool:
+        """Process all claimed events with `process_batch`; False if the batch failed."""
+        try:
+            async with get_async_session_local()() as db:
+                results = await process_batch(db, [json.loads(event.payload) for event in events])
+        except Exception as e:
+            logger.warning("Webhook batch of %d events failed, retrying per address: %s", len(events), e)
+            return False
+
+        by_result: Dict[str, List[models.WebhookEvent]] = defaultdict(list)
+        for event, result in zip(events, results):
+            by_result[result["status"]].append(event)
+        for detail, finished in by_result.items():
+            await self._finish(finished, "done", detail)
+        return True
+
+    def retry_delay(self, attempts: int) -> float:
+        """Backoff before the next attempt of an event that failed `attempts` times."""
+        return min(self.retry_base * 2 ** (attempts - 1), self.retry_max)
+
+    async def _finish(
+        self,
+        events: List[models.WebhookEvent],
+        status: str,
+        detail: Optional[str],
+        retry_in: float = 0,
+    ) -> None:
+        now = datetime.now(timezone.utc)
+        values = dict(status=status, result=detail, processed_at=now)
+        if status == "queued":
+            values.update(processed_at=None, claimed_at=None, next_attempt_at=now + timedelta(seconds=retry_in))
+        async with get_async_session_local()() as db:
+            await db.execute(
+                update(models.WebhookEvent)
+                .where(models.WebhookEvent.id.in_([event.id for event in events]))
+                .values(**values)
+            )
+            await db.commit()
+        self._claimed.difference_update(event.id for event in events)
+
+        if status == "done":
+            self.processed.inc(len(events))
+            for event in events:
+                received_at = event.received_at
+                if received_at is not None:
+                    if received_at.tzinfo is None:
+                        received_at = received_at.replace(tzinfo=timezone.utc)
+                    self.lag.observe((now - received_at).total_seconds())
+        elif status == "failed":
+            self.failed.inc(len(events))
+
+    async def _requeue(self, events: List[models.WebhookEvent]) -> None:
+        if not events:
+            return
+        event = models.WebhookEvent
+        async with get_async_session_local()() as db:
+            await db.execute(
+                update(event)
+                .where(event.id.in_([e.id for e in events]))
+                .values(status="queued", claimed_at=None, attempts=event.attempts - 1)
+            )
+            await db.commit()
+        self._claimed.difference_update(e.id for e in events)
+
+    async def _release(self, ids: Iterable[int]) -> None:
+        """Give leased events back to the queue (only ever this process's own)."""
+        ids = list(ids)
+        if not ids:
+            return
+        event = models.WebhookEvent
+        try:
+            async with get_async_session_local()() as db:
+                await db.execute(
+                    update(event)
+                    .where(event.id.in_(ids), event.status == "processing")
+                    .values(status="queued", claimed_at=None)
+                )
+                await db.commit()
+            self._claimed.difference_update(ids)
+        except Exception:
+            logger.exception("Failed to release in-flight webhook events")
+
+webhook_queue = WebhookQueue(
+    workers=settings.WEBHOOK_QUEUE_WORKERS,
+    batch_size=settings.WEBHOOK_QUEUE_BATCH_SIZE,
+    poll_interval=settings.WEBHOOK_QUEUE_POLL_INTERVAL_SECONDS,
+    lease_seconds=settings.WEBHOOK_LEASE_SECONDS,
+    retry_base=settings.WEBHOOK_RETRY_BASE_SECONDS,
+    retry_max=settings.WEBHOOK_RETRY_MAX_SECONDS,
+)
+
+events_purged = metrics.counter("webhook_events_purged_total", "Finished webhook events deleted by the retention job")
+deliveries_purged = metrics.counter("webhook_deliveries_purged_total", "Webhook idempotency keys deleted by the retention job")
+
+async def _delete_in_batches(select_rows, delete_rows) -> int:
+    """Delete what `select_rows` matches, WEBHOOK_RETENTION_BATCH_SIZE rows per transaction."""
+    batch_size = settings.WEBHOOK_RETENTION_BATCH_SIZE
+    session_local = get_async_session_local()
+    deleted = 0
+    while True:
+        async with session_local() as db:
+            rows = (await db.execute(select_rows.limit(batch_size))).all()
+            if rows:
+                await db.execute(delete_rows(rows).execution_options(synchronize_session=False))
+                await db.commit()
+        deleted += len(rows)
+        if len(rows) < batch_size:
+            return deleted
+
+async def purge_webhook_history() -> int:
+    """
+    Scheduled job: delete webhook bookkeeping that is no longer needed.
+
+    - Finished queue events older than WEBHOOK_EVENT_RETENTION_DAYS. `done`
+      and `failed` rows keep their raw payload for inspection; without this
+      they would accumulate forever in the table every dispatcher poll
+      counts and anti-joins.
+    - Delivery idempotency keys older than WEBHOOK_DELIVERY_RETENTION_HOURS,
+      and keys of transactions already past MIN_CONFIRMATIONS. Applying such
+      a delivery again changes nothing: the transaction row exists and its
+      confirmations only move forward.
+
+    Returns the number of rows deleted.
+    """
+    now = datetime.now(timezone.utc)
+    event = models.WebhookEvent
+    events = await _delete_in_batches(
+        select(event.id)
+        .where(
+            event.status.in_(("done", "failed")),
+            event.processed_at < now - timedelta(days=settings.WEBHOOK_EVENT_RETENTION_DAYS),
+        )
+        .order_by(event.id),
+        lambda rows: delete(event).where(event.id.in_([row.id for row in rows])),
+    )
+
+    delivery = models.WebhookDelivery
+    tx = models.Transaction
+    confirmed = exists().where(tx.tx_hash == delivery.tx_hash, tx.confirmations >= settings.MIN_CONFIRMATIONS)
+    keys = await _delete_in_batches(
+        select(delivery.tx_hash, delivery.confirmations).where(or_(
+            delivery.created_at < now - timedelta(hours=settings.WEBHOOK_DELIVERY_RETENTION_HOURS),
+            confirmed,
+        )),
+        lambda rows: delete(delivery).where(
+            tuple_(delivery.tx_hash, delivery.confirmations).in_([tuple(row) for row in rows])
+        ),
+    )
+
+    events_purged.inc(events)
+    deliveries_purged.inc(keys)
+    if events or keys:
+        logger.info("Deleted %d finished webhook events and %d delivery keys", events, keys)
+    return events + keys
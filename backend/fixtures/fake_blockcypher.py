@@ -0,0 +1,154 @@
+"""
+Local fake BlockCypher server for offline and load testing.
+
+Implements the subset of the BlockCypher v1 API used by
+app/services/blockchain.py, keeps everything in memory and can inject
+latency, random 5xx errors and 429 rate limiting.
+
+Run:
+    uvicorn fixtures.fake_blockcypher:app --port 9000
+    BLOCKCYPHER_BASE_URL=http://127.0.0.1:9000/v1/btc uvicorn app.main:app
+
+Environment:
+    FAKE_BLOCKCYPHER_LATENCY_MS     added latency per request (default 0)
+    FAKE_BLOCKCYPHER_ERROR_RATE     fraction of requests answered with 503 (default 0)
+    FAKE_BLOCKCYPHER_RATE_LIMIT     requests/s before answering 429 (default 0 = unlimited)
+
+Test helpers:
+    POST /_fake/txs         register a transaction (BlockCypher tx JSON, needs "hash")
+    POST /_fake/blocks      advance the chain tip by {"count": n} blocks
+    GET  /_fake/stats       request counters
+"""
+import asyncio
+import hashlib
+import os
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+LATENCY_MS = float(os.getenv("FAKE_BLOCKCYPHER_LATENCY_MS", "0"))
+ERROR_RATE = float(os.getenv("FAKE_BLOCKCYPHER_ERROR_RATE", "0"))
+RATE_LIMIT = float(os.getenv("FAKE_BLOCKCYPHER_RATE_LIMIT", "0"))
+
+app = FastAPI(title="Fake BlockCypher")
+
+state = {
+    "height": 2500000,
+    "address_counter": 0,
+    "txs": {},
+    "hooks": [],
+}
+stats: Dict[str, int] = defaultdict(int)
+_window = {"started": time.monotonic(), "count": 0}
+
+
+def _fake_address(index: int, network: str) -> str:
+    digest = hashlib.sha256(f"fake-address-{index}".encode()).hexdigest()
+    prefix = "bc1q" if network == "main" else "tb1q"
+    return prefix + digest[:38]
+
+
+@app.middleware("http")
+async def inject_faults(request: Request, call_next):
+    if request.url.path.startswith("/_fake"):
+        return await call_next(request)
+
+    stats["requests"] += 1
+    if LATENCY_MS:
+        await asyncio.sleep(LATENCY_MS / 1000)
+
+    if RATE_LIMIT:
+        now = time.monotonic()
+        if now - _window["started"] >= 1:
+            _window["started"], _window["count"] = now, 0
+        _window["count"] += 1
+        if _window["count"] > RATE_LIMIT:
+            stats["rate_limited"] += 1
+            return JSONResponse(status_code=429, content={"error": "Limits reached."}, headers={"Retry-After": "1"})
+
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        stats["errors"] += 1
+        return JSONResponse(status_code=503, content={"error": "Service unavailable"})
+
+    return await call_next(request)
+
+
+@app.get("/v1/btc/{network}")
+@app.get("/v1/btc/{network}/")
+async def chain_info(network: str):
+    return {"name": f"BTC.{network}", "height": state["height"], "hash": f"{state['height']:064x}"}
+
+
+@app.post("/v1/btc/{network}/addrs")
+async def generate_address(network: str):
+    state["address_counter"] += 1
+    address = _fake_address(state["address_counter"], network)
+    return {"address": address, "public": "", "private": "", "wif": ""}
+
+
+def _txs_for(address: str) -> List[dict]:
+    return [
+        tx for tx in state["txs"].values()
+        if any(address in (output.get("addresses") or []) for output in tx.get("outputs", []))
+    ]
+
+
+@app.get("/v1/btc/{network}/addrs/{address}/balance")
+async def address_balance(network: str, address: str):
+    received = sum(
+        output.get("value", 0)
+        for tx in _txs_for(address)
+        for output in tx.get("outputs", [])
+        if address in (output.get("addresses") or [])
+    )
+    return {"address": address, "total_received": received, "balance": received, "final_balance": received}
+
+
+@app.get("/v1/btc/{network}/addrs/{address}/full")
+async def address_full(network: str, address: str):
+    return {"address": address, "txs": [_with_confirmations(tx) for tx in _txs_for(address)]}
+
+
+def _with_confirmations(tx: dict) -> dict:
+    tx = dict(tx)
+    block_height = tx.get("block_height") or -1
+    tx["confirmations"] = state["height"] - block_height + 1 if block_height > 0 else 0
+    return tx
+
+
+@app.get("/v1/btc/{network}/txs/{tx_hash}")
+async def get_transaction(network: str, tx_hash: str):
+    tx = state["txs"].get(tx_hash)
+    if tx is None:
+        raise HTTPException(status_code=404, detail=f"Transaction {tx_hash} not found.")
+    return _with_confirmations(tx)
+
+
+@app.post("/v1/btc/{network}/hooks")
+async def create_hook(network: str, request: Request):
+    hook = await request.json()
+    hook["id"] = f"hook-{len(state['hooks']) + 1}"
+    state["hooks"].append(hook)
+    return hook
+
+
+@app.post("/_fake/txs")
+async def register_transaction(request: Request):
+    tx = await request.json()
+    state["txs"][tx["hash"]] = tx
+    return {"status": "ok"}
+
+
+@app.post("/_fake/blocks")
+async def mine_blocks(request: Request):
+    body = await request.json()
+    state["height"] += int(body.get("count", 1))
+    return {"height": state["height"]}
+
+
+@app.get("/_fake/stats")
+async def get_stats():
+    return dict(stats)
@@ -0,0 +1,163 @@
+"""
+Benchmark GET /api/wallets/balance computation as the transaction count grows.
+
+Compares the ledger read used by the endpoint (running totals on `wallets`),
+the grouped aggregate query used for reconciliation and the legacy
+per-wallet Python loop. Runs against a throwaway SQLite database unless
+--database-url is given (point it at a scratch Postgres database, the
+script creates and drops its own tables).
+
+Usage:
+    python scripts/benchmark_balance.py
+    python scripts/benchmark_balance.py --sizes 10,1000,100000 --legacy-max 10000
+"""
+import sys
+import os
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from decimal import Decimal
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000,10000,100000,1000000",
+                        help="Comma-separated transaction counts to measure")
+    parser.add_argument("--wallets", type=int, default=5, help="Number of addresses for the user")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per size (median is reported)")
+    parser.add_argument("--legacy-max", type=int, default=100000,
+                        help="Skip the legacy loop above this transaction count")
+    parser.add_argument("--database-url", default=None, help="Database to benchmark against")
+    return parser.parse_args()
+
+
+args = parse_args()
+if args.database_url:
+    os.environ["DATABASE_URL"] = args.database_url
+else:
+    _tmpdir = tempfile.mkdtemp(prefix="vertex-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from app.core.config import settings
+from app.db.database import Base, engine, dispose_async_engine, get_async_session_local
+from app.db import models
+from app.services.balance import (
+    compute_address_balances,
+    get_address_balances,
+    rebuild_balances,
+    summarize_balances,
+)
+
+
+def legacy_balance(db, user_id):
+    """The pre-aggregate implementation: one query per wallet, summed in Python (sync session)."""
+    wallets = db.query(models.Wallet).filter(models.Wallet.user_id == user_id).all()
+    total = Decimal("0")
+    confirmed = Decimal("0")
+    pending = Decimal("0")
+    for wallet in wallets:
+        transactions = db.query(models.Transaction).filter(
+            models.Transaction.wallet_id == wallet.id
+        ).all()
+        for tx in transactions:
+            total += tx.amount_btc
+            if tx.confirmations >= settings.MIN_CONFIRMATIONS:
+                confirmed += tx.amount_btc
+            else:
+                pending += tx.amount_btc
+    return total, confirmed, pending
+
+
+async def seed_user(db, wallet_count):
+    user = models.User(name="Bench User", email="bench@example.com", password_hash="x")
+    db.add(user)
+    await db.flush()
+    wallets = []
+    for i in range(wallet_count):
+        wallet = models.Wallet(user_id=user.id, btc_address=f"tb1qbench{i:040d}", address_index=i)
+        db.add(wallet)
+        wallets.append(wallet)
+    await db.commit()
+    return user.id, [w.id for w in wallets]
+
+
+async def insert_transactions(db, wallet_ids, start, stop):
+    """Insert transactions [start, stop) with executemany in chunks and rebuild the ledger."""
+    chunk = 50000
+    table = models.Transaction.__table__
+    for chunk_start in range(start, stop, chunk):
+        rows = [
+            {
+                "wallet_id": wallet_ids[i % len(wallet_ids)],
+                "tx_hash": f"{i:064x}",
+                "amount_btc": Decimal("0.00010000"),
+                "confirmations": i % 3,
+                "status": "confirmed" if i % 3 else "pending",
+            }
+            for i in range(chunk_start, min(chunk_start + chunk, stop))
+        ]
+        await db.execute(table.insert(), rows)
+    await rebuild_balances(db)
+    await db.commit()
+
+
+async def time_call(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def run():
+    sizes = sorted(int(s) for s in args.sizes.split(",") if s.strip())
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    db = get_async_session_local()()
+    try:
+        user_id, wallet_ids = await seed_user(db, args.wallets)
+
+        print("=" * 60)
+        print(f"{'transactions':>14} {'ledger ms':>12} {'aggregate ms':>14} {'legacy ms':>14}")
+        print("=" * 60)
+
+        inserted = 0
+        for size in sizes:
+            await insert_transactions(db, wallet_ids, inserted, size)
+            inserted = size
+
+            async def ledger():
+                summarize_balances(await get_address_balances(db, user_id))
+
+            async def aggregate():
+                summarize_balances(await compute_address_balances(db, user_id))
+
+            async def legacy():
+                await db.run_sync(legacy_balance, user_id)
+                db.expire_all()
+
+            ledger_ms = await time_call(ledger, args.repeat)
+            aggregate_ms = await time_call(aggregate, args.repeat)
+            if size <= args.legacy_max:
+                legacy_ms = f"{await time_call(legacy, args.repeat):14.2f}"
+            else:
+                legacy_ms = f"{'skipped':>14}"
+
+            print(f"{size:>14} {ledger_ms:12.2f} {aggregate_ms:14.2f} {legacy_ms}")
+        print("=" * 60)
+    finally:
+        await db.close()
+        await dispose_async_engine()
+        Base.metadata.drop_all(bind=engine)
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
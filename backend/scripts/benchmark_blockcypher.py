@@ -0,0 +1,103 @@
+"""
+Offline load test of the BlockCypher client.
+
+Starts fixtures/fake_blockcypher.py in-process on a local port, points the
+client at it and issues --requests concurrent get_transaction calls,
+reporting throughput, latency, retries and rate-limiter waits.
+
+Usage:
+    python scripts/benchmark_blockcypher.py --requests 2000 --concurrency 100 --rate 500
+    python scripts/benchmark_blockcypher.py --error-rate 0.1 --latency-ms 50
+"""
+import sys
+import os
+import argparse
+import asyncio
+import socket
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=1000, help="Client-side rate limit (requests/s)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Fake server latency per request")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of fake 503 responses")
+    return parser.parse_args()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+args = parse_args()
+port = free_port()
+os.environ["BLOCKCYPHER_BASE_URL"] = f"http://127.0.0.1:{port}/v1/btc"
+os.environ["BLOCKCYPHER_RATE_LIMIT_PER_SECOND"] = str(args.rate)
+os.environ["BLOCKCYPHER_RATE_LIMIT_BURST"] = str(max(1, int(args.rate)))
+os.environ["BLOCKCYPHER_BACKOFF_BASE_SECONDS"] = "0.05"
+os.environ["FAKE_BLOCKCYPHER_LATENCY_MS"] = str(args.latency_ms)
+os.environ["FAKE_BLOCKCYPHER_ERROR_RATE"] = str(args.error_rate)
+
+import uvicorn
+from app.core.metrics import metrics
+from app.services.blockchain import blockchain_service
+from fixtures import fake_blockcypher
+
+
+async def run():
+    server = uvicorn.Server(uvicorn.Config(fake_blockcypher.app, host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    for i in range(100):
+        fake_blockcypher.state["txs"][f"{i:064x}"] = {
+            "hash": f"{i:064x}",
+            "block_height": 2500000 - i,
+            "outputs": [{"addresses": ["tb1qbench"], "value": 10000}],
+        }
+
+    failures = 0
+    queue = list(range(args.requests))
+
+    async def worker():
+        nonlocal failures
+        while queue:
+            i = queue.pop()
+            try:
+                await blockchain_service.get_transaction(f"{i % 100:064x}")
+            except Exception:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    await blockchain_service.aclose()
+    server.should_exit = True
+    await server_task
+
+    snapshot = metrics.snapshot()
+    latency = snapshot["blockcypher_request_seconds"]
+    print("=" * 60)
+    print(f"{args.requests} get_transaction calls, concurrency {args.concurrency}, rate limit {args.rate}/s")
+    print("=" * 60)
+    print(f"Throughput:      {args.requests / elapsed:10.1f} calls/s")
+    print(f"Failures:        {failures:10d}")
+    print(f"HTTP requests:   {snapshot['blockcypher_requests_total']:10d}")
+    print(f"Retries:         {snapshot['blockcypher_retries_total']:10d}")
+    print(f"Latency p50:     {latency['p50'] * 1000:10.1f} ms")
+    print(f"Latency p99:     {latency['p99'] * 1000:10.1f} ms")
+    print(f"Server stats:    {dict(fake_blockcypher.stats)}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,89 @@
+"""
+Concurrency benchmark for the API.
+
+Logs in once, then fires --requests GET requests at --path from --clients
+parallel clients against a running server and reports throughput and
+latency percentiles. Run it against the same database before and after a
+change (e.g. the sync-Session build vs the AsyncSession build) to compare
+p99 latency under load.
+
+Usage:
+    uvicorn app.main:app --port 8000 --workers 1
+    python scripts/benchmark_concurrency.py --clients 200 --requests 5000
+    python scripts/benchmark_concurrency.py --path /api/transactions?limit=50
+"""
+import sys
+import os
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures.users import get_test_users
+
+
+def parse_args():
+    default_user = get_test_users()[0]
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/api/wallets/balance", help="Authenticated GET endpoint to hit")
+    parser.add_argument("--clients", type=int, default=200, help="Parallel clients")
+    parser.add_argument("--requests", type=int, default=5000, help="Total requests")
+    parser.add_argument("--email", default=default_user["email"])
+    parser.add_argument("--password", default=default_user["password"])
+    return parser.parse_args()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        response = await client.post("/api/auth/login", json={"email": args.email, "password": args.password})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        latencies = []
+        errors = 0
+        remaining = args.requests
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                try:
+                    r = await client.get(args.path, headers=headers)
+                    if r.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.clients)))
+        elapsed = time.perf_counter() - started
+
+    print("=" * 60)
+    print(f"GET {args.path} - {args.requests} requests, {args.clients} clients")
+    print("=" * 60)
+    print(f"Throughput: {len(latencies) / elapsed:10.1f} req/s")
+    print(f"Errors:     {errors:10d}")
+    print(f"p50:        {statistics.median(latencies):10.1f} ms")
+    print(f"p95:        {percentile(latencies, 95):10.1f} ms")
+    print(f"p99:        {percentile(latencies, 99):10.1f} ms")
+    print(f"max:        {max(latencies):10.1f} ms")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
@@ -0,0 +1,114 @@
+"""
+Benchmark connection pool profiles: NullPool vs. pooled.
+
+Runs --requests request-shaped units of work (open a session, read the
+user's data version and wallet balances, close) with --concurrency
+concurrent workers against an async engine built for each profile in
+app/db/pool.py, and reports requests/s plus the mean time spent getting a
+connection.
+
+Point --database-url at a local Postgres database (the script creates and
+drops its own tables); connection setup is what NullPool pays on every
+request, so the difference only shows against a real server. Without it a
+throwaway SQLite file is used, which is only a smoke test.
+
+Usage:
+    python scripts/benchmark_db_pool.py --database-url postgresql://localhost/vertex_bench
+    python scripts/benchmark_db_pool.py --database-url postgresql://localhost/vertex_bench --concurrency 50 --requests 20000
+"""
+import sys
+import os
+import argparse
+import asyncio
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--profiles", default="serverless,long-running", help="Comma-separated profiles to compare")
+    parser.add_argument("--database-url", default=None, help="Database to benchmark against")
+    return parser.parse_args()
+
+
+args = parse_args()
+if args.database_url:
+    os.environ["DATABASE_URL"] = args.database_url
+else:
+    _tmpdir = tempfile.mkdtemp(prefix="vertex-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.db.database import Base, engine, get_async_database_url
+from app.db import models
+from app.db.pool import checkout_seconds, engine_options
+
+
+def seed():
+    with engine.begin() as conn:
+        user_id = conn.execute(models.User.__table__.insert().values(
+            name="Bench User", email="bench@example.com", password_hash="x"
+        )).inserted_primary_key[0]
+        conn.execute(models.Wallet.__table__.insert(), [
+            {"user_id": user_id, "btc_address": f"tb1qbench{i:040d}", "address_index": i} for i in range(10)
+        ])
+    return user_id
+
+
+async def run_profile(profile, user_id):
+    url, connect_args = get_async_database_url()
+    options = engine_options(url, is_async=True, profile=profile)
+    options["connect_args"] = {**options.get("connect_args", {}), **connect_args}
+    async_engine = create_async_engine(url, **options)
+    session_local = async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+    remaining = iter(range(args.requests))
+
+    async def worker():
+        for _ in remaining:
+            async with session_local() as db:
+                await db.scalar(select(models.User.data_version).where(models.User.id == user_id))
+                await db.execute(
+                    select(models.Wallet.btc_address, models.Wallet.confirmed_balance_btc)
+                    .where(models.Wallet.user_id == user_id)
+                )
+
+    count, total = checkout_seconds.count, checkout_seconds.sum
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await async_engine.dispose()
+    checkouts = checkout_seconds.count - count
+    return args.requests / elapsed, (checkout_seconds.sum - total) / checkouts if checkouts else 0.0
+
+
+async def run():
+    user_id = seed()
+    results = []
+    for profile in args.profiles.split(","):
+        results.append((profile, *await run_profile(profile, user_id)))
+
+    print("=" * 60)
+    print(f"{args.requests} requests, {args.concurrency} concurrent, {engine.url.get_backend_name()}")
+    print("=" * 60)
+    for profile, rate, mean_wait in results:
+        print(f"{profile:>14}: {rate:8.0f} req/s   mean checkout {mean_wait * 1000:7.2f} ms")
+    if len(results) > 1:
+        print(f"{'speedup':>14}: {results[-1][1] / results[0][1]:8.1f}x ({results[-1][0]} vs {results[0][0]})")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    try:
+        asyncio.run(run())
+    finally:
+        Base.metadata.drop_all(bind=engine)
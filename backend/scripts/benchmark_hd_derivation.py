@@ -0,0 +1,54 @@
+"""
+Benchmark local HD address derivation.
+
+Checks the implementation against the BIP84 test vector, then derives
+--count receive addresses in one batch and reports addresses/s.
+
+Usage:
+    python scripts/benchmark_hd_derivation.py --count 10000
+    python scripts/benchmark_hd_derivation.py --xpub zpub...
+"""
+import sys
+import os
+import argparse
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import hdwallet
+
+# BIP84 test vector: account m/84'/0'/0' of the "abandon ... about" mnemonic
+BIP84_ZPUB = "zpub6rFR7y4Q2AijBEqTUquhVz398htDFrtymD9xYYfG1m4wAcvPhXNfE3EfH1r1ADqtfSdVCToUG868RvUUkgDKf31mGDtKsAYz2oz2AGutZYs"
+BIP84_EXPECTED = [
+    "bc1qcr8te4kr609gcawutmrza0j4xv80jy8z306fyu",  # m/84'/0'/0'/0/0
+    "bc1qnjg0jd8228aq7egyzacy8cys3knf9xvrerkf9g",  # m/84'/0'/0'/0/1
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--xpub", default=BIP84_ZPUB)
+    args = parser.parse_args()
+
+    vector = hdwallet.HDWallet(BIP84_ZPUB).derive_batch(0, len(BIP84_EXPECTED))
+    if vector != BIP84_EXPECTED:
+        print(f"❌ BIP84 test vector mismatch: {vector}")
+        sys.exit(1)
+
+    wallet = hdwallet.HDWallet(args.xpub)
+    started = time.perf_counter()
+    addresses = wallet.derive_batch(0, args.count)
+    elapsed = time.perf_counter() - started
+
+    print("=" * 60)
+    print(f"Derived {len(addresses)} addresses (secp256k1 backend: {'coincurve' if hdwallet.coincurve else 'pure Python'})")
+    print("=" * 60)
+    print("BIP84 test vector:  ✅ ok")
+    print(f"Elapsed:            {elapsed:10.3f} s")
+    print(f"Throughput:         {len(addresses) / elapsed:10.0f} addresses/s")
+    print(f"First / last:       {addresses[0]} / {addresses[-1]}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark bulk invoice creation.
+
+Creates --count invoices one at a time through `create_invoice` (what
+POST /api/invoices/create does per request) and then in one call to
+`create_invoices` (POST /api/invoices/batch), and reports invoices/s for
+both. Addresses are derived locally from --xpub (the BIP84 test vector by
+default), so no BlockCypher calls are made.
+
+Runs against a throwaway SQLite database unless --database-url is given
+(point it at a scratch Postgres database, the script creates and drops its
+own tables). The target (5,000 invoices in under a second) is measured on
+local Postgres.
+
+Usage:
+    python scripts/benchmark_invoice_batch.py
+    python scripts/benchmark_invoice_batch.py --database-url postgresql://localhost/vertex_bench --count 5000
+"""
+import sys
+import os
+import argparse
+import asyncio
+import tempfile
+import time
+from decimal import Decimal
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# BIP84 test vector account (see scripts/benchmark_hd_derivation.py)
+BIP84_ZPUB = "zpub6rFR7y4Q2AijBEqTUquhVz398htDFrtymD9xYYfG1m4wAcvPhXNfE3EfH1r1ADqtfSdVCToUG868RvUUkgDKf31mGDtKsAYz2oz2AGutZYs"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=5000, help="Invoices per run")
+    parser.add_argument("--xpub", default=BIP84_ZPUB)
+    parser.add_argument("--database-url", default=None, help="Database to benchmark against")
+    return parser.parse_args()
+
+
+args = parse_args()
+os.environ["HD_XPUB"] = args.xpub
+if args.database_url:
+    os.environ["DATABASE_URL"] = args.database_url
+else:
+    _tmpdir = tempfile.mkdtemp(prefix="vertex-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from sqlalchemy import func, select
+from app.db.database import Base, engine, dispose_async_engine, get_async_session_local
+from app.db import models
+from app.services.invoice import create_invoice, create_invoices
+
+
+async def seed(session_local):
+    async with session_local() as db:
+        user = models.User(name="Bench User", email="bench@example.com", password_hash="x")
+        db.add(user)
+        await db.commit()
+        return user.id
+
+
+async def run_single(session_local, user_id):
+    for i in range(args.count):
+        async with session_local() as db:
+            await create_invoice(db, user_id, Decimal("0.001"), description=f"Invoice {i}")
+
+
+async def run_batch(session_local, user_id):
+    items = [{"amount_btc": Decimal("0.001"), "description": f"Invoice {i}"} for i in range(args.count)]
+    async with session_local() as db:
+        await create_invoices(db, user_id, items)
+
+
+async def run():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session_local = get_async_session_local()
+
+    try:
+        user_id = await seed(session_local)
+        results = []
+        for name, runner in (("one by one", run_single), ("batch", run_batch)):
+            started = time.perf_counter()
+            await runner(session_local, user_id)
+            results.append((name, time.perf_counter() - started))
+
+        async with session_local() as db:
+            invoices = await db.scalar(select(func.count(models.Invoice.id)))
+            addresses = await db.scalar(select(func.count(func.distinct(models.Invoice.btc_address))))
+
+        print("=" * 60)
+        print(f"{args.count} invoices per run")
+        print("=" * 60)
+        for name, elapsed in results:
+            print(f"{name:>12}: {elapsed:8.3f} s {args.count / elapsed:10.0f} invoices/s")
+        print(f"{'speedup':>12}: {results[0][1] / results[1][1]:8.1f}x")
+        print(f"{'addresses':>12}: {'✅ all distinct' if invoices == addresses == 2 * args.count else '❌ reused'}")
+        print("=" * 60)
+    finally:
+        await dispose_async_engine()
+        Base.metadata.drop_all(bind=engine)
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
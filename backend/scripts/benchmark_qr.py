@@ -0,0 +1,69 @@
+"""
+Benchmark invoice QR rendering: cold vs. warm cache.
+
+Requests QR images for --count distinct invoices three times:
+- cold: rendered from scratch (and written to the disk cache);
+- disk: a fresh cache instance over the same directory, as after a restart
+  or in another worker;
+- memory: the same instance again.
+
+Reports images/s for each pass.
+
+Usage:
+    python scripts/benchmark_qr.py
+    python scripts/benchmark_qr.py --count 2000 --format svg --size 10
+"""
+import sys
+import os
+import argparse
+import asyncio
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.qr import FORMATS, QRCache
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=500, help="Distinct invoices")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="png")
+    parser.add_argument("--size", type=int, default=8, help="Pixels per QR module")
+    return parser.parse_args()
+
+
+async def timed(cache, invoices, args):
+    started = time.perf_counter()
+    images = [await cache.get(address, amount, args.size, args.format) for address, amount in invoices]
+    return time.perf_counter() - started, images
+
+
+async def run(args):
+    directory = tempfile.mkdtemp(prefix="vertex-qr-")
+    invoices = [(f"bc1qbench{i:030d}", Decimal("0.001") + Decimal(i) / 10**8) for i in range(args.count)]
+    try:
+        cache = QRCache(maxsize=args.count, directory=directory)
+        results = [("cold", *await timed(cache, invoices, args))]
+        results.append(("disk", *await timed(QRCache(maxsize=args.count, directory=directory), invoices, args)))
+        results.append(("memory", *await timed(cache, invoices, args)))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    cold_images = results[0][2]
+    print("=" * 60)
+    print(f"{args.count} {args.format} QR codes, {args.size} px/module, "
+          f"avg {sum(map(len, cold_images)) // len(cold_images)} bytes")
+    print("=" * 60)
+    for name, elapsed, images in results:
+        same = "✅" if images == cold_images else "❌"
+        print(f"{name:>8}: {elapsed:8.3f} s {args.count / elapsed:12.0f} images/s   identical: {same}")
+    print(f"{'speedup':>8}: {results[0][1] / results[2][1]:8.0f}x (memory vs cold)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
@@ -0,0 +1,153 @@
+"""
+Benchmark webhook processing: one event at a time vs. batched.
+
+Seeds --payments invoices (one address each), then replays the same stream
+of notifications twice: through `process_event` (the per-request path, one
+session and commit per event) and through `process_batch` in groups of
+--batch-size. Every payment produces --confirmations follow-up
+notifications, like BlockCypher's tx-confirmation hook. Payloads carry the
+transaction outputs, so no BlockCypher calls are made.
+
+Runs against a throwaway SQLite database unless --database-url is given
+(point it at a scratch Postgres database, the script creates and drops its
+own tables). The target is measured on Postgres; SQLite serialises writers
+and fsyncs every commit, so its ratio is only indicative.
+
+Usage:
+    python scripts/benchmark_webhooks.py
+    python scripts/benchmark_webhooks.py --database-url postgresql://localhost/vertex_bench --payments 5000
+"""
+import sys
+import os
+import argparse
+import asyncio
+import tempfile
+import time
+from decimal import Decimal
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payments", type=int, default=1000, help="Distinct transactions (one invoice each)")
+    parser.add_argument("--confirmations", type=int, default=3, help="Follow-up notifications per transaction")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--database-url", default=None, help="Database to benchmark against")
+    return parser.parse_args()
+
+
+args = parse_args()
+if args.database_url:
+    os.environ["DATABASE_URL"] = args.database_url
+else:
+    _tmpdir = tempfile.mkdtemp(prefix="vertex-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from sqlalchemy import delete, update
+from app.db.database import Base, engine, dispose_async_engine, get_async_session_local
+from app.db import models
+from app.services.balance import compute_address_balances, get_address_balances
+from app.services.webhook import process_batch, process_event, seen_deliveries
+
+
+def address(i):
+    return f"tb1qbench{i:040d}"
+
+
+def build_events():
+    """Arrival order: each payment's first notification, then its confirmations, interleaved."""
+    events = []
+    for conf in range(args.confirmations + 1):
+        for i in range(args.payments):
+            events.append({
+                "address": address(i),
+                "hash": f"{i:064x}",
+                "confirmations": conf,
+                "block_height": 2500000 if conf else None,
+                "outputs": [{"addresses": [address(i)], "value": 100000}],
+            })
+    return events
+
+
+async def seed(session_local):
+    async with session_local() as db:
+        user = models.User(name="Bench User", email="bench@example.com", password_hash="x")
+        db.add(user)
+        await db.flush()
+        for i in range(args.payments):
+            wallet = models.Wallet(user_id=user.id, btc_address=address(i), address_index=i)
+            db.add(wallet)
+            await db.flush()
+            db.add(models.Invoice(
+                user_id=user.id, wallet_id=wallet.id, btc_address=address(i),
+                amount_btc=Decimal("0.001"), status="pending",
+            ))
+        await db.commit()
+        return user.id
+
+
+async def reset(session_local):
+    seen_deliveries.clear()
+    async with session_local() as db:
+        await db.execute(delete(models.Transaction))
+        await db.execute(delete(models.WebhookDelivery))
+        await db.execute(update(models.Wallet).values(confirmed_balance_btc=0, pending_balance_btc=0))
+        await db.execute(update(models.Invoice).values(status="pending", paid_at=None))
+        await db.commit()
+
+
+async def check(session_local, user_id):
+    """The ledger must match the transactions table and every invoice must be paid."""
+    async with session_local() as db:
+        ledger = [(b["address"], b["confirmed"], b["pending"]) for b in await get_address_balances(db, user_id)]
+        actual = [(b["address"], b["confirmed"], b["pending"]) for b in await compute_address_balances(db, user_id)]
+        paid = (await db.execute(
+            models.Invoice.__table__.select().where(models.Invoice.status == "paid")
+        )).all()
+    return sorted(ledger) == sorted(actual) and len(paid) == args.payments
+
+
+async def run_single(session_local, events):
+    for data in events:
+        async with session_local() as db:
+            await process_event(db, data)
+
+
+async def run_batched(session_local, events):
+    for start in range(0, len(events), args.batch_size):
+        async with session_local() as db:
+            await process_batch(db, events[start:start + args.batch_size])
+
+
+async def run():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session_local = get_async_session_local()
+    events = build_events()
+
+    try:
+        user_id = await seed(session_local)
+        results = []
+        for name, runner in (("per event", run_single), (f"batch of {args.batch_size}", run_batched)):
+            await reset(session_local)
+            started = time.perf_counter()
+            await runner(session_local, events)
+            elapsed = time.perf_counter() - started
+            results.append((name, len(events) / elapsed, await check(session_local, user_id)))
+
+        print("=" * 60)
+        print(f"{len(events)} notifications for {args.payments} payments")
+        print("=" * 60)
+        for name, rate, ok in results:
+            print(f"{name:>16}: {rate:10.0f} events/s   consistent: {'✅' if ok else '❌'}")
+        print(f"{'speedup':>16}: {results[1][1] / results[0][1]:10.1f}x")
+        print("=" * 60)
+    finally:
+        await dispose_async_engine()
+        Base.metadata.drop_all(bind=engine)
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,77 @@
+"""
+Balance ledger reconciliation script.
+Rebuilds every wallet's running totals from the transactions table and
+bumps the data version (ETag) of users whose balances were corrected.
+
+Usage:
+    python scripts/reconcile_balances.py            # report drift and rebuild
+    python scripts/reconcile_balances.py --dry-run  # only report drift
+"""
+import sys
+import os
+import argparse
+import asyncio
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from app.db.database import dispose_async_engine, get_async_session_local
+from app.db import models
+from app.services.balance import compute_address_balances, rebuild_balances
+
+
+async def find_drift(db):
+    """Compare ledger columns against balances computed from transactions."""
+    result = await db.execute(
+        select(
+            models.Wallet.id,
+            models.Wallet.confirmed_balance_btc,
+            models.Wallet.pending_balance_btc,
+        )
+    )
+    ledger = {w.id: (w.confirmed_balance_btc, w.pending_balance_btc) for w in result}
+    drift = []
+    for expected in await compute_address_balances(db):
+        confirmed, pending = ledger.get(expected["wallet_id"], (0, 0))
+        if confirmed != expected["confirmed"] or pending != expected["pending"]:
+            drift.append((expected, confirmed, pending))
+    return drift
+
+
+async def reconcile(dry_run: bool = False):
+    """Report ledger drift and rebuild the ledger from scratch."""
+    print("=" * 60)
+    print("Reconciling wallet balance ledger...")
+    print("=" * 60 + "\n")
+
+    db = get_async_session_local()()
+    try:
+        drift = await find_drift(db)
+        for expected, confirmed, pending in drift:
+            print(f"  ! {expected['address']}: ledger confirmed={confirmed} pending={pending}, "
+                  f"expected confirmed={expected['confirmed']} pending={expected['pending']}")
+        print(f"Wallets with drift: {len(drift)}\n")
+
+        if dry_run:
+            print("Dry run - ledger not modified.")
+            return
+
+        corrected = await rebuild_balances(db)
+        await db.commit()
+        print(f"Ledger rebuilt: {corrected} wallets corrected.")
+    except Exception as e:
+        await db.rollback()
+        print(f"\n[ERROR] Reconciliation failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        await db.close()
+        await dispose_async_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the wallet balance ledger.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report drift, do not rebuild")
+    asyncio.run(reconcile(dry_run=parser.parse_args().dry_run))
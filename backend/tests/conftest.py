@@ -0,0 +1,69 @@
+"""
+Shared fixtures for the API tests.
+
+The app runs against a throwaway SQLite database, derives addresses from a
+test xpub and reads the BTC/USD rate from fixtures/btc_usd_rate.json, so
+the suite needs no network or Postgres. Settings are read at import time,
+hence the environment is set before anything from `app` is imported.
+"""
+import os
+import tempfile
+import uuid
+from dataclasses import dataclass
+from typing import Dict
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_tmpdir = tempfile.mkdtemp(prefix="vertex-tests-")
+
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(_tmpdir, 'test.db')}",
+    SCHEDULER_ENABLED="false",
+    HD_XPUB="vpub5Y6cjg78GGuNLsaPhmYsiw4gYX3HoQiRBiSwDaBXKUafCt9bNwWQiitDk5VZ5BVxYnQdwoTyXSs2JHRPAgjAvtbBrf8ZhDYe2jWAqvZVnsc",
+    RATE_SOURCE_FILE=os.path.join(BACKEND_DIR, "fixtures", "btc_usd_rate.json"),
+    BCRYPT_ROUNDS="4",
+    LOG_LEVEL="WARNING",
+    LOG_QUEUE="false",
+)
+
+
+@dataclass
+class TestUser:
+    id: int
+    email: str
+    password: str
+    headers: Dict[str, str]
+
+
+@pytest.fixture(scope="session")
+def client():
+    """TestClient with startup/shutdown run, on a freshly created schema."""
+    from fastapi.testclient import TestClient
+    from app.db.database import Base, engine
+    from app.db import models  # noqa: F401 - registers the tables
+    from app.main import app
+
+    Base.metadata.create_all(engine)
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def make_user(client):
+    """Register and log in a new user; returns a TestUser with auth headers."""
+    def make() -> TestUser:
+        email = f"user-{uuid.uuid4().hex[:12]}@example.com"
+        password = "password123"
+        response = client.post("/api/auth/register", json={"name": "Test User", "email": email, "password": password})
+        assert response.status_code == 201, response.text
+        response = client.post("/api/auth/login", json={"email": email, "password": password})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        return TestUser(
+            id=body["user"]["id"],
+            email=email,
+            password=password,
+            headers={"Authorization": f"Bearer {body['access_token']}"},
+        )
+    return make
@@ -0,0 +1,41 @@
+"""Token revocation through users.token_version and the version cache."""
+import time
+
+from sqlalchemy import update
+
+from app.api.v1 import dependencies
+from app.db import models
+from app.db.database import SessionLocal
+
+
+def revoke(user_id: int) -> None:
+    """Bump the user's token version, as any writer (another worker, an admin) may."""
+    with SessionLocal() as db:
+        db.execute(
+            update(models.User)
+            .where(models.User.id == user_id)
+            .values(token_version=models.User.token_version + 1)
+        )
+        db.commit()
+
+
+def test_revoked_token_rejected(client, make_user):
+    user = make_user()
+    revoke(user.id)
+
+    response = client.get("/api/transactions", headers=user.headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked"
+
+
+def test_cached_version_rejected_after_ttl(client, make_user, monkeypatch):
+    """A process that cached the old token version accepts the token until the entry expires."""
+    monkeypatch.setattr(dependencies.token_versions, "ttl", 0.5)
+    user = make_user()
+    assert client.get("/api/transactions", headers=user.headers).status_code == 200
+
+    revoke(user.id)
+    assert client.get("/api/transactions", headers=user.headers).status_code == 200
+
+    time.sleep(0.6)
+    assert client.get("/api/transactions", headers=user.headers).status_code == 401
@@ -0,0 +1,80 @@
+"""Balance ledger reconciliation (rebuild_balances)."""
+import asyncio
+import uuid
+from decimal import Decimal
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db import models
+from app.db.database import SessionLocal, get_async_database_url
+from app.services.balance import rebuild_balances
+
+
+def seed_wallet(user_id: int, ledger_pending: Decimal) -> int:
+    """A wallet holding one pending 0.001 BTC transaction, with `ledger_pending` on its ledger."""
+    with SessionLocal() as db:
+        wallet = models.Wallet(
+            user_id=user_id, btc_address=f"tb1qledger{uuid.uuid4().hex[:16]}", address_index=0,
+            pending_balance_btc=ledger_pending,
+        )
+        db.add(wallet)
+        db.flush()
+        db.add(models.Transaction(wallet_id=wallet.id, tx_hash=uuid.uuid4().hex, amount_btc=Decimal("0.001"), confirmations=0, status="pending"))
+        db.commit()
+        return wallet.id
+
+
+def run_rebuild():
+    async def run():
+        url, connect_args = get_async_database_url()
+        engine = create_async_engine(url, connect_args=connect_args)
+        try:
+            async with AsyncSession(engine) as db:
+                corrected = await rebuild_balances(db)
+                await db.commit()
+                return corrected
+        finally:
+            await engine.dispose()
+    return asyncio.run(run())
+
+
+def test_rebuild_bumps_data_version_of_corrected_users(client, make_user):
+    drifted, clean = make_user(), make_user()
+    drifted_wallet = seed_wallet(drifted.id, ledger_pending=Decimal("0"))
+    seed_wallet(clean.id, ledger_pending=Decimal("0.001"))
+    etag = client.get("/api/wallets/balance", headers=drifted.headers).headers["ETag"]
+    with SessionLocal() as db:
+        versions = dict(db.execute(select(models.User.id, models.User.data_version).where(models.User.id.in_([drifted.id, clean.id]))).all())
+
+    assert run_rebuild() >= 1
+
+    with SessionLocal() as db:
+        assert db.get(models.Wallet, drifted_wallet).pending_balance_btc == Decimal("0.001")
+        assert db.get(models.User, drifted.id).data_version == versions[drifted.id] + 1
+        assert db.get(models.User, clean.id).data_version == versions[clean.id]
+    response = client.get("/api/wallets/balance", headers={**drifted.headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_invoice_addresses_aggregated_not_listed(client, make_user):
+    user = make_user()
+    own_address = client.post("/api/wallets/generate", headers=user.headers).json()["btc_address"]
+    invoice_addresses = [
+        client.post("/api/invoices/create", json={"amount_btc": "0.001"}, headers=user.headers).json()["btc_address"]
+        for _ in range(2)
+    ]
+    with SessionLocal() as db:
+        wallet = db.scalar(select(models.Wallet).where(models.Wallet.btc_address == invoice_addresses[0]))
+        wallet.confirmed_balance_btc = Decimal("0.001")
+        db.commit()
+    # Another invoice bumps the data version, so the balance below is not a cached one
+    client.post("/api/invoices/create", json={"amount_btc": "0.001"}, headers=user.headers)
+
+    assert client.post("/api/wallets/generate", headers=user.headers).json()["btc_address"] == own_address
+    balance = client.get("/api/wallets/balance", headers=user.headers).json()
+    assert [a["address"] for a in balance["addresses"]] == [own_address]
+    assert balance["invoice_address_count"] == 3
+    assert Decimal(balance["invoice_balance_btc"]) == Decimal("0.001")
+    assert Decimal(balance["confirmed_balance_btc"]) == Decimal("0.001")
@@ -0,0 +1,110 @@
+"""
+Cold start of the serverless entry point (api/index.py).
+
+Imports `api.index` with `python -X importtime` in fresh interpreters (with
+VERCEL=1, like a new Vercel instance) and fails on a regression:
+- the import takes longer than COLD_START_BUDGET_MS (best of RUNS);
+- a module that must stay lazy is imported at startup (HTTP client, JWT,
+  password hashing, scheduler, QR rendering);
+- a database engine is created at import time.
+
+Also checks that startup skips the BTC/USD rate fetch on the serverless profile.
+"""
+import asyncio
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+from tests.conftest import BACKEND_DIR
+
+RUNS = 3
+# Measured ~1.3 s on a dev machine; override on slow CI runners
+COLD_START_BUDGET_MS = float(os.getenv("COLD_START_BUDGET_MS", "2000"))
+
+# Top-level packages only needed after startup; see the lazy imports in
+# app/services/blockchain.py, app/services/rates.py, app/core/security.py,
+# app/services/scheduler.py and app/services/qr.py
+LAZY_MODULES = ("httpx", "httpcore", "jose", "passlib", "bcrypt", "apscheduler", "qrcode", "PIL")
+
+# Reports whether importing the entry point created the (sync or async) engine
+IMPORT = "import api.index; from app.db import database; print('engine at import:', bool(database._engine or database._async_engine))"
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def profile_once():
+    """Return ([(module, cumulative_us)], stdout) of one cold import."""
+    env = dict(os.environ, VERCEL="1", PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    modules = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            modules.append((match.group(4), int(match.group(2))))
+    return modules, result.stdout
+
+
+@pytest.fixture(scope="module")
+def cold_import():
+    """Fastest of RUNS cold imports: (total_ms, modules, stdout)."""
+    runs = []
+    for _ in range(RUNS):
+        modules, stdout = profile_once()
+        total_us = next(cumulative for name, cumulative in modules if name == "api.index")
+        runs.append((total_us / 1000, modules, stdout))
+    return min(runs, key=lambda run: run[0])
+
+
+def slowest(modules, top=15):
+    return "\n".join(
+        f"{cumulative / 1000:10.1f}ms  {name}"
+        for name, cumulative in sorted(modules, key=lambda m: -m[1])[:top]
+    )
+
+
+def test_cold_import_within_budget(cold_import):
+    total_ms, modules, _ = cold_import
+    assert total_ms <= COLD_START_BUDGET_MS, (
+        f"import api.index took {total_ms:.0f} ms (budget {COLD_START_BUDGET_MS:.0f} ms); slowest:\n{slowest(modules)}"
+    )
+
+
+def test_heavy_modules_stay_lazy(cold_import):
+    _, modules, _ = cold_import
+    eager = sorted({name for name, _ in modules if name.split(".")[0] in LAZY_MODULES})
+    assert not eager, f"imported at startup but should be lazy: {', '.join(eager)}"
+
+
+def test_no_database_engine_at_import(cold_import):
+    _, _, stdout = cold_import
+    assert "engine at import: False" in stdout, stdout
+
+
+@pytest.mark.parametrize("profile, fetches", [("serverless", False), ("long-running", True)])
+def test_startup_fetches_rate_only_when_long_running(monkeypatch, profile, fetches):
+    from app import main
+
+    calls = []
+
+    async def refresh():
+        calls.append("refresh")
+
+    async def noop():
+        pass
+
+    monkeypatch.setattr(main.settings, "DB_POOL_PROFILE", profile)
+    monkeypatch.setattr(main.rate_service, "refresh", refresh)
+    monkeypatch.setattr(main.webhook_queue, "start", noop)
+    monkeypatch.setattr(main.event_broker, "start", noop)
+    monkeypatch.setattr(main, "start_scheduler", lambda: None)
+
+    asyncio.run(main.startup())
+
+    assert bool(calls) == fetches
@@ -0,0 +1,71 @@
+"""HD address derivation and index reservation (app/services/hdwallet.py)."""
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db import database, models
+from app.services.hdwallet import AddressPool, HDWallet
+
+# BIP84 test vector: account m/84'/0'/0' of the "abandon ... about" mnemonic
+BIP84_ZPUB = "zpub6rFR7y4Q2AijBEqTUquhVz398htDFrtymD9xYYfG1m4wAcvPhXNfE3EfH1r1ADqtfSdVCToUG868RvUUkgDKf31mGDtKsAYz2oz2AGutZYs"
+
+
+def test_network_follows_version_bytes():
+    wallet = HDWallet(BIP84_ZPUB)
+    assert wallet.network == "main"
+    assert wallet.derive_address(0) == "bc1qcr8te4kr609gcawutmrza0j4xv80jy8z306fyu"
+
+    with pytest.raises(ValueError):
+        # Same key material under made-up version bytes
+        HDWallet("Ltub2Z1zyGvbcEwmj1jAQcLSwfxMsZut8QS84GKVoqcbdF9snnvjrDYGoZQpbUSrpowJSNoTHdzuBq2QmScUEBUjuVRypgNwN2g3yrd5HiGRfxy")
+
+
+def run_with_fresh_engine(monkeypatch, coro_fn):
+    """Run `coro_fn()` with the pool's sessions on an engine of this event loop."""
+    async def run():
+        url, connect_args = database.get_async_database_url()
+        engine = create_async_engine(url, connect_args=connect_args)
+        monkeypatch.setattr(database, "get_async_session_local", lambda: async_sessionmaker(engine, class_=AsyncSession))
+        try:
+            return await coro_fn()
+        finally:
+            await engine.dispose()
+    return asyncio.run(run())
+
+
+def next_index(fingerprint: str) -> int:
+    with database.SessionLocal() as db:
+        return db.scalar(select(models.AddressIndexCounter.next_index).where(models.AddressIndexCounter.key == fingerprint))
+
+
+def test_release_hands_back_unused_indexes(client, monkeypatch):
+    wallet = HDWallet(BIP84_ZPUB)
+
+    async def allocate_then_release():
+        pool = AddressPool(wallet, size=5, low_watermark=1)
+        index, _ = await pool.allocate()
+        await pool.release()
+        return index
+
+    index = run_with_fresh_engine(monkeypatch, allocate_then_release)
+    assert next_index(wallet.fingerprint) == index + 1
+
+    # The next process continues right after the used index: no gap
+    index_after_restart = run_with_fresh_engine(monkeypatch, allocate_then_release)
+    assert index_after_restart == index + 1
+
+
+def test_without_prefetch_only_used_indexes_are_reserved(client, monkeypatch):
+    wallet = HDWallet(BIP84_ZPUB)
+
+    async def allocate_twice():
+        pool = AddressPool(wallet, size=1, low_watermark=0, prefetch=False)
+        indexes = [(await pool.allocate())[0] for _ in range(2)]
+        await asyncio.sleep(0)
+        return indexes
+
+    first, second = run_with_fresh_engine(monkeypatch, allocate_twice)
+    assert second == first + 1
+    assert next_index(wallet.fingerprint) == second + 1
@@ -0,0 +1,31 @@
+"""Instrumented connection pools (app/db/pool.py)."""
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.pool import checked_out, engine_options
+
+
+@pytest.mark.parametrize("profile", ["serverless", "long-running"])
+def test_usage_counted_once_after_dispose(tmp_path, profile):
+    url = make_url(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}")
+    engine = create_async_engine(url, **engine_options(url, is_async=True, profile=profile))
+
+    async def run():
+        try:
+            # dispose() replaces the pool via Pool.recreate()
+            for _ in range(2):
+                async with engine.connect() as conn:
+                    before = checked_out.value
+                    await conn.execute(text("SELECT 1"))
+                    assert checked_out.value == before
+                assert checked_out.value == before - 1
+                await engine.dispose()
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+    assert engine.pool.logger.name.startswith("sqlalchemy.pool.")
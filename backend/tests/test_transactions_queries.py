@@ -0,0 +1,71 @@
+"""GET /api/transactions runs a fixed number of SQL statements, whatever the page size."""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.db import models
+from app.db.database import SessionLocal, get_async_engine
+
+# Token version, data version (ETag), total count, page
+MAX_STATEMENTS = 4
+
+
+@contextmanager
+def count_statements():
+    """Collect the SQL statements the API's async engine executes."""
+    statements = []
+    engine = get_async_engine().sync_engine
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def seed_transactions(user_id: int, count: int, wallets: int = 10) -> None:
+    """`count` transactions spread over up to `wallets` addresses of the user."""
+    with SessionLocal() as db:
+        owned = [
+            models.Wallet(user_id=user_id, btc_address=f"tb1qtest{user_id}w{i}", address_index=100000 + user_id * 100 + i)
+            for i in range(min(wallets, count))
+        ]
+        db.add_all(owned)
+        db.flush()
+        db.add_all(
+            models.Transaction(
+                wallet_id=owned[i % len(owned)].id,
+                tx_hash=f"{user_id:08x}{i:056x}",
+                amount_btc="0.001",
+                confirmations=i % 7,
+                status="confirmed" if i % 7 else "pending",
+            )
+            for i in range(count)
+        )
+        db.commit()
+
+
+def test_transactions_page_statement_count_is_constant(client, make_user):
+    small, large = make_user(), make_user()
+    seed_transactions(small.id, 1)
+    seed_transactions(large.id, 50)
+
+    with count_statements() as one_row:
+        response = client.get("/api/transactions?limit=50", headers=small.headers)
+    assert response.status_code == 200
+    assert len(response.json()["transactions"]) == 1
+
+    with count_statements() as fifty_rows:
+        response = client.get("/api/transactions?limit=50", headers=large.headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["transactions"]) == 50
+    assert body["total"] == 50
+    assert all(tx["btc_address"].startswith(f"tb1qtest{large.id}w") for tx in body["transactions"])
+
+    # No per-row wallet lookups: 50 rows cost the same as one
+    assert len(fifty_rows) == len(one_row), fifty_rows
+    assert len(fifty_rows) <= MAX_STATEMENTS, fifty_rows
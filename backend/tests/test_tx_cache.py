@@ -0,0 +1,40 @@
+"""TransactionCache: the SQLite disk tier is used off the event loop."""
+import asyncio
+import threading
+
+from app.core.config import settings
+from app.services import tx_cache as tx_cache_module
+from app.services.tx_cache import TransactionCache
+
+
+def final_tx(tx_hash: str) -> dict:
+    return {"hash": tx_hash, "confirmations": settings.RECOMMENDED_CONFIRMATIONS}
+
+
+def test_disk_tier_runs_in_worker_thread(tmp_path, monkeypatch):
+    loop_threads, disk_threads = [], []
+    get, put_many = tx_cache_module.DiskTier.get, tx_cache_module.DiskTier.put_many
+
+    def record(method):
+        def wrapper(self, *args):
+            disk_threads.append(threading.get_ident())
+            return method(self, *args)
+        return wrapper
+
+    monkeypatch.setattr(tx_cache_module.DiskTier, "get", record(get))
+    monkeypatch.setattr(tx_cache_module.DiskTier, "put_many", record(put_many))
+    path = str(tmp_path / "tx.sqlite")
+
+    async def run():
+        loop_threads.append(threading.get_ident())
+        await TransactionCache(maxsize=10, pending_ttl=60, address_ttl=60, path=path).put_address(
+            "tb1qaddress", [final_tx("a"), final_tx("b"), {"hash": "c", "confirmations": 0}]
+        )
+        # A fresh cache (new process) reads the final transactions back from disk only
+        fresh = TransactionCache(maxsize=10, pending_ttl=60, address_ttl=60, path=path)
+        return [await fresh.get(h) for h in ("a", "b", "c")]
+
+    assert asyncio.run(run()) == [final_tx("a"), final_tx("b"), None]
+    # One write for the whole address, one read per hash
+    assert len(disk_threads) == 4
+    assert loop_threads[0] not in disk_threads
@@ -0,0 +1,135 @@
+"""process_batch: set-based application of queued webhook notifications."""
+import asyncio
+import uuid
+from decimal import Decimal
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db import models
+from app.db.database import SessionLocal, get_async_database_url
+from app.services import webhook
+from app.services.balance import credit_wallet
+
+SATOSHI_PER_INVOICE = 100000  # 0.001 BTC
+
+
+def seed_invoice(user_id: int):
+    """A wallet address of the user with one pending 0.001 BTC invoice; returns (address, invoice id)."""
+    address = f"tb1qbatch{uuid.uuid4().hex[:16]}"
+    with SessionLocal() as db:
+        wallet = models.Wallet(user_id=user_id, btc_address=address, address_index=300000 + user_id)
+        db.add(wallet)
+        db.flush()
+        invoice = models.Invoice(user_id=user_id, wallet_id=wallet.id, btc_address=address, amount_btc=Decimal("0.001"))
+        db.add(invoice)
+        db.commit()
+        return address, invoice.id
+
+
+def delivery(address: str, tx_hash: str, confirmations: int = 0) -> dict:
+    return {
+        "address": address,
+        "hash": tx_hash,
+        "confirmations": confirmations,
+        "outputs": [{"value": SATOSHI_PER_INVOICE, "addresses": [address]}],
+    }
+
+
+def run_batch(events, session_opened=None):
+    """process_batch on its own engine (the TestClient's loop owns the app's engine)."""
+    async def run():
+        url, connect_args = get_async_database_url()
+        engine = create_async_engine(url, connect_args=connect_args)
+        try:
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                if session_opened:
+                    session_opened(db)
+                return await webhook.process_batch(db, events)
+        finally:
+            await engine.dispose()
+    return asyncio.run(run())
+
+
+def load(address: str):
+    with SessionLocal() as db:
+        wallet = db.scalar(select(models.Wallet).where(models.Wallet.btc_address == address))
+        txs = db.scalars(select(models.Transaction).where(models.Transaction.wallet_id == wallet.id)).all()
+        invoice = db.scalar(select(models.Invoice).where(models.Invoice.btc_address == address))
+        return wallet, {tx.tx_hash: tx for tx in txs}, invoice
+
+
+def test_invoice_matched_once_per_batch(client, make_user):
+    address, invoice_id = seed_invoice(make_user().id)
+    first, second = uuid.uuid4().hex, uuid.uuid4().hex
+
+    results = run_batch([delivery(address, first), delivery(address, second)])
+
+    assert [r["status"] for r in results] == ["processed", "processed"]
+    wallet, txs, invoice = load(address)
+    assert invoice.status == "paid"
+    assert [tx.invoice_id for tx in (txs[first], txs[second])] == [invoice_id, None]
+    assert wallet.pending_balance_btc == Decimal("0.002")
+
+
+def test_row_inserted_concurrently_is_not_credited_twice(client, make_user, monkeypatch):
+    address, _ = seed_invoice(make_user().id)
+    tx_hash = uuid.uuid4().hex
+    fetch_details = webhook._get_tx_details
+    sessions = []
+
+    async def insert_meanwhile(data, tx_hash):
+        # Another writer records the transaction after process_batch's SELECT
+        # (through the batch's own connection: SQLite has a single writer)
+        wallet_id = await sessions[0].scalar(select(models.Wallet.id).where(models.Wallet.btc_address == address))
+        await sessions[0].execute(insert(models.Transaction).values(
+            wallet_id=wallet_id, tx_hash=tx_hash, amount_btc=Decimal("0.001"), confirmations=0, status="pending"
+        ))
+        await credit_wallet(sessions[0], wallet_id, Decimal("0.001"), confirmed=False)
+        return await fetch_details(data, tx_hash)
+
+    monkeypatch.setattr(webhook, "_get_tx_details", insert_meanwhile)
+    results = run_batch([delivery(address, tx_hash, confirmations=2)], session_opened=sessions.append)
+
+    assert results[0]["status"] == "updated"
+    wallet, txs, invoice = load(address)
+    # Credited once (by the other writer), then moved to confirmed
+    assert (wallet.pending_balance_btc, wallet.confirmed_balance_btc) == (0, Decimal("0.001"))
+    assert invoice.status == "pending"
+    assert txs[tx_hash].confirmations == 2
+    assert txs[tx_hash].status == "confirmed"
+
+
+def test_confirmations_never_move_backwards(client, make_user):
+    address, _ = seed_invoice(make_user().id)
+    tx_hash = uuid.uuid4().hex
+
+    run_batch([delivery(address, tx_hash, confirmations=3)])
+    results = run_batch([delivery(address, tx_hash, confirmations=1)])
+
+    assert results[0]["status"] == "updated"
+    _, txs, _ = load(address)
+    assert txs[tx_hash].confirmations == 3
+
+
+def test_legacy_shared_address_invoices_paid_oldest_first(client, make_user):
+    address, older_id = seed_invoice(make_user().id)
+    with SessionLocal() as db:
+        older = db.get(models.Invoice, older_id)
+        older.shared_address = True
+        newer = models.Invoice(
+            user_id=older.user_id, wallet_id=older.wallet_id, btc_address=address,
+            amount_btc=Decimal("0.001"), shared_address=True,
+        )
+        db.add(newer)
+        db.commit()
+        newer_id = newer.id
+    first, second = uuid.uuid4().hex, uuid.uuid4().hex
+
+    run_batch([delivery(address, first)])
+    with SessionLocal() as db:
+        assert [db.get(models.Invoice, i).status for i in (older_id, newer_id)] == ["paid", "pending"]
+
+    run_batch([delivery(address, second)])
+    _, txs, _ = load(address)
+    assert [txs[h].invoice_id for h in (first, second)] == [older_id, newer_id]
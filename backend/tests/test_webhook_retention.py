@@ -0,0 +1,78 @@
+"""Retention of webhook queue events and delivery keys (purge_webhook_history)."""
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.db import models
+from app.db.database import SessionLocal, get_async_database_url
+from app.services import webhook
+
+
+def run_purge(monkeypatch):
+    """purge_webhook_history on its own engine (the TestClient's loop owns the app's engine)."""
+    async def run():
+        url, connect_args = get_async_database_url()
+        engine = create_async_engine(url, connect_args=connect_args)
+        monkeypatch.setattr(webhook, "get_async_session_local", lambda: async_sessionmaker(engine, class_=AsyncSession))
+        try:
+            return await webhook.purge_webhook_history()
+        finally:
+            await engine.dispose()
+    return asyncio.run(run())
+
+
+def test_purge_deletes_only_old_finished_events(client, monkeypatch):
+    monkeypatch.setattr(settings, "WEBHOOK_RETENTION_BATCH_SIZE", 2)
+    now = datetime.now(timezone.utc)
+    old = now - timedelta(days=settings.WEBHOOK_EVENT_RETENTION_DAYS, hours=1)
+    rows = {
+        "old done": ("done", old),
+        "old done 2": ("done", old),
+        "old failed": ("failed", old),
+        "recent done": ("done", now),
+        "old queued": ("queued", None),
+        "old processing": ("processing", None),
+    }
+    address = f"tb1qretention{uuid.uuid4().hex[:12]}"
+    with SessionLocal() as db:
+        events = {
+            name: models.WebhookEvent(address=address, tx_hash=name, payload="{}", status=status, received_at=old, processed_at=processed_at)
+            for name, (status, processed_at) in rows.items()
+        }
+        db.add_all(events.values())
+        db.commit()
+
+    run_purge(monkeypatch)
+
+    with SessionLocal() as db:
+        left = set(db.scalars(select(models.WebhookEvent.tx_hash).where(models.WebhookEvent.address == address)))
+    assert left == {"recent done", "old queued", "old processing"}
+
+
+def test_purge_deletes_expired_and_confirmed_delivery_keys(client, make_user, monkeypatch):
+    now = datetime.now(timezone.utc)
+    old = now - timedelta(hours=settings.WEBHOOK_DELIVERY_RETENTION_HOURS, minutes=1)
+    prefix = uuid.uuid4().hex[:16]
+    confirmed, pending = f"{prefix}-confirmed", f"{prefix}-pending"
+    with SessionLocal() as db:
+        wallet = models.Wallet(user_id=make_user().id, btc_address=f"tb1qretention{prefix}", address_index=0)
+        db.add(wallet)
+        db.flush()
+        db.add_all([
+            models.Transaction(wallet_id=wallet.id, tx_hash=confirmed, amount_btc="0.001", confirmations=settings.MIN_CONFIRMATIONS, status="confirmed"),
+            models.Transaction(wallet_id=wallet.id, tx_hash=pending, amount_btc="0.001", confirmations=0, status="pending"),
+            models.WebhookDelivery(tx_hash=confirmed, confirmations=0, created_at=now),
+            models.WebhookDelivery(tx_hash=pending, confirmations=0, created_at=now),
+            models.WebhookDelivery(tx_hash=f"{prefix}-expired", confirmations=0, created_at=old),
+        ])
+        db.commit()
+
+    run_purge(monkeypatch)
+
+    with SessionLocal() as db:
+        left = set(db.scalars(select(models.WebhookDelivery.tx_hash).where(models.WebhookDelivery.tx_hash.startswith(prefix))))
+    assert left == {pending}
@@ -10,6 +10,7 @@ import Skeleton from '../ui/Skeleton'
 import { formatBTC, formatDate } from '../../utils/format'
 import { useState } from 'react'
 import { useToast } from '../../hooks/useToast'
+import { useRefetchInterval } from '../../context/EventsContext'
 
 const InvoiceDetail = () => {
   const { id } = useParams<{ id: string }>()
@@ -20,7 +21,7 @@ const InvoiceDetail = () => {
   const { data: invoice, isLoading } = useQuery(
     ['invoice', invoiceId],
     () => invoiceService.getById(invoiceId),
-    { refetchInterval: 10000 }
+    { refetchInterval: useRefetchInterval(10000) }
   )
 
   const copyAddress = () => {
@@ -8,6 +8,7 @@ import Button from '../ui/Button'
 import Badge from '../ui/Badge'
 import Skeleton from '../ui/Skeleton'
 import { formatBTC, formatDate } from '../../utils/format'
+import { useRefetchInterval } from '../../context/EventsContext'
 
 const InvoiceList = () => {
   const [statusFilter, setStatusFilter] = useState<string>('')
@@ -17,7 +18,7 @@ const InvoiceList = () => {
   const { data, isLoading } = useQuery(
     ['invoices', statusFilter, page],
     () => invoiceService.list(statusFilter || undefined, limit, page * limit),
-    { refetchInterval: 30000 }
+    { refetchInterval: useRefetchInterval(30000) }
   )
 
   if (isLoading) {
@@ -7,6 +7,7 @@ import Badge from '../ui/Badge'
 import Button from '../ui/Button'
 import Skeleton from '../ui/Skeleton'
 import { formatBTC, formatDate } from '../../utils/format'
+import { useRefetchInterval } from '../../context/EventsContext'
 
 const TransactionList = () => {
   const [statusFilter, setStatusFilter] = useState<string>('')
@@ -16,7 +17,7 @@ const TransactionList = () => {
   const { data, isLoading } = useQuery(
     ['transactions', statusFilter, page],
     () => transactionService.list(statusFilter || undefined, limit, page * limit),
-    { refetchInterval: 30000 }
+    { refetchInterval: useRefetchInterval(30000) }
   )
 
   if (isLoading) {
@@ -10,18 +10,19 @@ import Button from '../ui/Button'
 import Badge from '../ui/Badge'
 import Skeleton from '../ui/Skeleton'
 import { formatBTC, formatDate } from '../../utils/format'
+import { useRefetchInterval } from '../../context/EventsContext'
 
 const WalletDashboard = () => {
   const { data: balance, isLoading: balanceLoading } = useQuery<WalletBalance>(
     'wallet-balance',
     walletService.getBalance,
-    { refetchInterval: 30000 }
+    { refetchInterval: useRefetchInterval(30000) }
   )
 
   const { data: transactions, isLoading: transactionsLoading } = useQuery(
     'recent-transactions',
     () => transactionService.list(undefined, 5, 0),
-    { refetchInterval: 30000 }
+    { refetchInterval: useRefetchInterval(30000) }
   )
 
   const containerVariants = {
@@ -0,0 +1,19 @@
+import React, { createContext, useContext, ReactNode } from 'react'
+import { useEvents, FALLBACK_REFETCH_INTERVAL } from '../hooks/useEvents'
+
+const EventsContext = createContext<boolean>(false)
+
+export const EventsProvider: React.FC<{ children: ReactNode }> = ({ children }) => {
+  const live = useEvents()
+
+  return <EventsContext.Provider value={live}>{children}</EventsContext.Provider>
+}
+
+/**
+ * refetchInterval for a view: `pollInterval` without live updates, the slow
+ * fallback while the event stream is open.
+ */
+export const useRefetchInterval = (pollInterval: number): number => {
+  const live = useContext(EventsContext)
+  return live ? Math.max(pollInterval, FALLBACK_REFETCH_INTERVAL) : pollInterval
+}
@@ -0,0 +1,94 @@
+import { useEffect, useState } from 'react'
+import { useQueryClient } from 'react-query'
+import { API_URL } from '../services/api'
+import { eventsService, EventTicket } from '../services/events'
+import { logger } from '../utils/logger'
+
+// Polling interval for views while they get live updates from /api/events
+export const FALLBACK_REFETCH_INTERVAL = 60000
+
+// Wait before asking for a new ticket after the stream was closed
+const RECONNECT_DELAY = 5000
+
+/**
+ * Subscribes to the server-sent event stream and refreshes the affected
+ * queries when an invoice or transaction changes. Returns whether the
+ * stream is open; while it isn't, views keep their regular polling.
+ *
+ * The stream is only opened if the backend issues a ticket (it reports
+ * enabled=false on deployments that cannot stream). EventSource reconnects
+ * on its own after network errors; once the server rejects the stream
+ * (e.g. the ticket expired) a new ticket is requested.
+ */
+export const useEvents = (): boolean => {
+  const queryClient = useQueryClient()
+  const [live, setLive] = useState(false)
+
+  useEffect(() => {
+    if (!localStorage.getItem('token') || typeof EventSource === 'undefined') return
+
+    let source: EventSource | null = null
+    let reconnectTimer: ReturnType<typeof setTimeout> | undefined
+    let stopped = false
+    let opened = false
+
+    const refreshLists = () => {
+      queryClient.invalidateQueries('invoices')
+      queryClient.invalidateQueries('transactions')
+      queryClient.invalidateQueries('wallet-balance')
+      queryClient.invalidateQueries('recent-transactions')
+    }
+
+    const refresh = (event: MessageEvent) => {
+      try {
+        const data = JSON.parse(event.data)
+        if (data.invoice_id) {
+          queryClient.invalidateQueries(['invoice', data.invoice_id])
+        }
+      } catch (error) {
+        logger.warn('Ignoring malformed event', error)
+      }
+      refreshLists()
+    }
+
+    const connect = async () => {
+      let ticket: EventTicket
+      try {
+        ticket = await eventsService.getTicket()
+      } catch (error) {
+        logger.warn('Live updates unavailable, polling instead', error)
+        return
+      }
+      if (stopped || !ticket.enabled || !ticket.ticket) return
+
+      source = new EventSource(`${API_URL}/api/events?ticket=${encodeURIComponent(ticket.ticket)}`)
+      source.onopen = () => {
+        // After a reconnect (or a new ticket), catch up on events missed while disconnected
+        if (opened) {
+          queryClient.invalidateQueries('invoice')
+          refreshLists()
+        }
+        opened = true
+        setLive(true)
+      }
+      source.onerror = () => {
+        setLive(false)
+        if (source?.readyState === EventSource.CLOSED && !stopped) {
+          reconnectTimer = setTimeout(connect, RECONNECT_DELAY)
+        }
+      }
+      source.addEventListener('invoice', refresh as EventListener)
+      source.addEventListener('transaction', refresh as EventListener)
+    }
+
+    connect()
+    return () => {
+      stopped = true
+      clearTimeout(reconnectTimer)
+      source?.close()
+      setLive(false)
+    }
+  }, [queryClient])
+
+  return live
+}
@@ -2,7 +2,7 @@ import axios from 'axios'
 
 // Production backend URL: https://vertex-wallet-etwf.vercel.app
 // Development: http://localhost:8000
-const API_URL = import.meta.env.VITE_API_URL || 
+export const API_URL = import.meta.env.VITE_API_URL || 
   (import.meta.env.PROD 
     ? 'https://vertex-wallet-etwf.vercel.app' 
     : 'http://localhost:8000')
@@ -0,0 +1,15 @@
+import api from './api'
+
+export interface EventTicket {
+  enabled: boolean
+  ticket?: string | null
+  expires_in?: number | null
+}
+
+export const eventsService = {
+  // Short-lived credential for the event stream; enabled=false where the backend can't stream
+  getTicket: async (): Promise<EventTicket> => {
+    const response = await api.post('/api/events/ticket')
+    return response.data
+  },
+}
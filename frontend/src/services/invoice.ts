@@ -18,6 +18,7 @@ export interface InvoiceListResponse {
   total: number
   limit: number
   offset: number
+  next_cursor?: string | null
 }
 
 export interface CreateInvoiceRequest {
@@ -16,6 +16,7 @@ export interface TransactionListResponse {
   total: number
   limit: number
   offset: number
+  next_cursor?: string | null
 }
 
 export const transactionService = {
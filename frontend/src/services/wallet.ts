@@ -15,6 +15,8 @@ export interface WalletBalance {
     address: string
     balance: string
   }>
+  invoice_balance_btc: string
+  invoice_address_count: number
 }
 
 export const walletService = {